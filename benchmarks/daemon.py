@@ -0,0 +1,88 @@
+"""
+常驻转换服务的往返延迟
+
+用法: python benchmarks/daemon.py [--chapters 4] [--repeat 10]
+
+在临时缓存目录中启动 `main.py serve`，对同一篇合成论文分别计时 (取中位数)：
+  cli convert     每次新起解释器本地转换 (内容未变化，命中缓存)
+  client convert  每次新起解释器，经守护进程转换 (命中缓存)
+  request convert 进程内直接发请求 (不含解释器启动，即常驻编辑器插件看到的延迟)
+  request render  进程内发送 Markdown 字节、取回 docx 字节 (小文档，不使用缓存)
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from format_modes import synthetic_markdown  # noqa: E402
+
+SMALL_MARKDOWN = "# 引言\n\n这是一段用于测量往返延迟的正文。\n\n- 列表项一\n- 列表项二\n".encode('utf-8')
+
+
+def median_seconds(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['NJUST_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        from njust import daemon
+
+        md_path = os.path.join(tmp, 'thesis.md')
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write(synthetic_markdown(args.chapters))
+
+        main_py = os.path.join(ROOT, 'main.py')
+        server = subprocess.Popen([sys.executable, main_py, 'serve'], stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    daemon.request({'op': 'ping'}, timeout=daemon.CONNECT_TIMEOUT)
+                    break
+                except daemon.DaemonUnavailable:
+                    if time.monotonic() > deadline or server.poll() is not None:
+                        raise
+                    time.sleep(0.1)
+
+            daemon.convert_path(md_path)  # 首次转换并写入缓存，不计入耗时
+
+            def run(*cli_args):
+                subprocess.run([sys.executable, main_py, *cli_args, '-q', md_path],
+                               check=True, stdout=subprocess.DEVNULL)
+
+            rows = [
+                ('cli convert', lambda: run('convert')),
+                ('client convert', lambda: run('client', 'convert')),
+                ('request convert', lambda: daemon.convert_path(md_path)),
+                ('request render', lambda: daemon.render_bytes(SMALL_MARKDOWN, tmp, use_cache=False)),
+            ]
+            for name, fn in rows:
+                print(f"{name:<16} {median_seconds(fn, args.repeat) * 1000:8.1f} ms")
+        finally:
+            try:
+                daemon.request({'op': 'shutdown'}, timeout=daemon.CONNECT_TIMEOUT)
+            except daemon.DaemonUnavailable:
+                pass
+            server.wait(timeout=30)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+格式化模式对比：direct (逐 run 写入格式) vs style (样式级格式)
+
+用法: python benchmarks/format_modes.py [--chapters 20] [--repeat 3] [--json out.json]
+
+生成一份合成 Markdown 论文，分别用内置引擎与 Pandoc 引擎 (若可用) 在两种模式下转换，
+报告转换耗时 (多次运行取中位数)、docx 文件大小与 word/document.xml 大小。
+Pandoc 引擎额外给出使用 NJUST reference.docx 的结果作对照。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from njust.formatter import NJUST_Formatter  # noqa: E402
+
+
+def synthetic_markdown(chapters):
+    parts = []
+    for c in range(1, chapters + 1):
+        parts.append(f"# 第{c}章 研究内容 {c}\n")
+        for s in range(1, 4):
+            parts.append(f"## {c}.{s} 小节标题\n")
+            for k in range(6):
+                parts.append(
+                    f"这是第 {c} 章第 {s} 节的第 {k} 段正文，包含 **加粗文字**、*斜体文字* 与 `inline_code()`，"
+                    "以及中英文混排 Times New Roman text。" * 3 + "\n")
+            parts.append("```python\nfor i in range(10):\n    print(i)\n```\n")
+            parts.append("| 参数 | 取值 | 说明 |\n|---|---|---|\n" +
+                         "".join(f"| p{r} | {r * 3} | 说明文字 {r} |\n" for r in range(8)))
+    parts.append("# 参考文献\n")
+    parts.extend(f"[{i}] 作者{i}. 文献标题{i}[J]. 期刊, 2020.\n" for i in range(1, 31))
+    return "\n".join(parts)
+
+
+def _sizes(path):
+    with zipfile.ZipFile(path) as zf:
+        document_xml = zf.getinfo('word/document.xml').file_size
+    return os.path.getsize(path), document_xml
+
+
+def run_case(md_path, engine, mode, use_reference_doc, repeat):
+    timings = []
+    output = None
+    for _ in range(repeat):
+        formatter = NJUST_Formatter(md_path, format_mode=mode)
+        start = time.perf_counter()
+        if engine == 'pandoc':
+            output = formatter.convert_with_pandoc(use_reference_doc=use_reference_doc)
+        else:
+            output = formatter.convert_internal()
+        timings.append(time.perf_counter() - start)
+        os.replace(output, output + '.keep')
+    docx_size, xml_size = _sizes(output + '.keep')
+    os.remove(output + '.keep')
+    return {
+        'engine': engine,
+        'mode': 'reference' if use_reference_doc else mode,
+        'seconds_median': round(statistics.median(timings), 4),
+        'docx_bytes': docx_size,
+        'document_xml_bytes': xml_size,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    cases = [('internal', 'direct', False), ('internal', 'style', False)]
+    if shutil.which('pandoc'):
+        cases += [('pandoc', 'direct', False), ('pandoc', 'style', False), ('pandoc', 'direct', True)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        md_path = os.path.join(tmp, 'thesis.md')
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write(synthetic_markdown(args.chapters))
+        for engine, mode, use_reference_doc in cases:
+            results.append(run_case(md_path, engine, mode, use_reference_doc, args.repeat))
+
+    print(f"{'engine':<10}{'mode':<11}{'time(s)':>10}{'docx':>12}{'document.xml':>15}")
+    for r in results:
+        print(f"{r['engine']:<10}{r['mode']:<11}{r['seconds_median']:>10.3f}"
+              f"{r['docx_bytes']:>12}{r['document_xml_bytes']:>15}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
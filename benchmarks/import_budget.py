@@ -0,0 +1,70 @@
+"""
+无界面路径的导入耗时预算检查
+
+用法: python benchmarks/import_budget.py [--budget-ms 60] [--repeat 5]
+
+在全新解释器中导入 `njust.cli` 并解析 `--help` 所需的参数表，
+统计 -X importtime 报告的累计耗时 (取多次运行的最小值)，
+同时确认 PyQt6 / python-docx / markdown / bs4 没有被提前加载。
+超出预算或加载了重型依赖时以非零状态退出，可直接用于 CI。
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADLESS_SNIPPET = (
+    "import sys, njust.cli; njust.cli.build_parser(); "
+    "print('MODULES=' + ','.join(sorted(sys.modules)))"
+)
+FORBIDDEN = ('PyQt6', 'docx', 'markdown', 'bs4', 'lxml', 'watchdog')
+
+
+def measure_once(snippet):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', snippet],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        m = re.match(r'import time:\s+\d+\s+\|\s+(\d+)\s+\| (\S+)$', line)
+        if m:  # 仅统计顶层 (缩进为一个空格) 的导入
+            total_us += int(m.group(1))
+    modules = []
+    for line in proc.stdout.splitlines():
+        if line.startswith('MODULES='):
+            modules = line[len('MODULES='):].split(',')
+    return total_us / 1000.0, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=60.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    timings = []
+    modules = []
+    for _ in range(args.repeat):
+        ms, modules = measure_once(HEADLESS_SNIPPET)
+        timings.append(ms)
+
+    leaked = sorted({m.split('.')[0] for m in modules if m.split('.')[0] in FORBIDDEN})
+    best = min(timings)
+    result = {
+        'import_ms_min': round(best, 2),
+        'import_ms_all': [round(t, 2) for t in timings],
+        'budget_ms': args.budget_ms,
+        'leaked_modules': leaked,
+        'ok': best <= args.budget_ms and not leaked,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if result['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+按章增量转换基准：模拟“改一个错字 -> 保存 -> 转换”的循环
+
+用法: python benchmarks/incremental.py [--chapters 12] [--edits 3]
+
+生成合成论文后依次计时：
+  full        整篇 Pandoc 转换 (convert_with_pandoc)
+  cold        按章转换，缓存为空 (每章都要转换)
+  edit        修改其中一章的一个字后再次转换 (只有该章重新转换)，取多次中位数
+  unchanged   内容未变化，命中整篇转换缓存
+缓存目录使用临时目录，不影响用户缓存。
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from format_modes import synthetic_markdown  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=12)
+    parser.add_argument('--edits', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['NJUST_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        from njust.formatter import NJUST_Formatter, convert_file
+
+        md_path = os.path.join(tmp, 'thesis.md')
+        md_text = synthetic_markdown(args.chapters)
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write(md_text)
+
+        start = time.perf_counter()
+        NJUST_Formatter(md_path).convert_with_pandoc()
+        print(f"full       {time.perf_counter() - start:7.3f}s")
+
+        start = time.perf_counter()
+        convert_file(md_path, engine='pandoc')
+        print(f"cold       {time.perf_counter() - start:7.3f}s")
+
+        timings = []
+        for i in range(args.edits):
+            chapter = (i * 5) % args.chapters + 1
+            md_text = md_text.replace(f"这是第 {chapter} 章第 1 节的第 0 段正文",
+                                      f"这是第 {chapter} 章第 1 节的第 0 段正文 (修订 {i})", 1)
+            with open(md_path, 'w', encoding='utf-8') as f:
+                f.write(md_text)
+            start = time.perf_counter()
+            convert_file(md_path, engine='pandoc')
+            timings.append(time.perf_counter() - start)
+        print(f"edit       {statistics.median(timings):7.3f}s  (改动 1 章，{args.edits} 次中位数)")
+
+        start = time.perf_counter()
+        convert_file(md_path, engine='pandoc')
+        print(f"unchanged  {time.perf_counter() - start:7.3f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+内置引擎基准：原生解析器对比旧的 markdown + BeautifulSoup 实现与 Pandoc
+
+用法: python benchmarks/internal_engine.py [--chapters 20] [--repeat 3]
+
+对同一篇合成论文分别计时 (取中位数，含保存 docx)，并用 tracemalloc 统计 Python 堆的峰值内存：
+  native   NJUST_Formatter.convert_internal (逐行解析，直接生成 WordprocessingML，正文分批流式写入 zip)
+  tree     build_internal_document + Document.save (同一解析器，先建完整元素树再整体保存)
+  legacy   build_html_document + save (markdown -> HTML -> BeautifulSoup -> python-docx 对象)
+  pandoc   convert_with_pandoc (已安装 Pandoc 时)
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from format_modes import synthetic_markdown  # noqa: E402
+from njust.formatter import NJUST_Formatter  # noqa: E402
+
+
+def convert_legacy(md_path, mode):
+    formatter = NJUST_Formatter(md_path, format_mode=mode)
+    with open(md_path, 'r', encoding='utf-8') as f:
+        doc = formatter.build_html_document(f.read())
+    doc.save(formatter.default_output_path('internal'))
+
+
+def convert_tree(md_path, mode):
+    formatter = NJUST_Formatter(md_path, format_mode=mode)
+    with open(md_path, 'r', encoding='utf-8') as f:
+        doc = formatter.build_internal_document(f)
+    doc.save(formatter.default_output_path('internal'))
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['NJUST_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        md_path = os.path.join(tmp, 'thesis.md')
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write(synthetic_markdown(args.chapters))
+        print(f"Markdown {os.path.getsize(md_path) / 1024:.0f} KB")
+
+        cases = []
+        for mode in ('direct', 'style'):
+            cases.append((f'native  {mode}', lambda mode=mode: NJUST_Formatter(md_path, mode).convert_internal()))
+            cases.append((f'tree    {mode}', lambda mode=mode: convert_tree(md_path, mode)))
+            cases.append((f'legacy  {mode}', lambda mode=mode: convert_legacy(md_path, mode)))
+        if shutil.which('pandoc'):
+            cases.append(('pandoc  direct', lambda: NJUST_Formatter(md_path).convert_with_pandoc()))
+
+        print(f"{'case':<15} {'seconds':>8} {'peak MB':>8}")
+        for name, fn in cases:
+            seconds, peak = measure(fn, args.repeat)
+            print(f"{name:<15} {seconds:8.3f} {peak / 1e6:8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
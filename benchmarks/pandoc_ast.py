@@ -0,0 +1,82 @@
+"""
+Pandoc 引擎基准：docx + post_process_doc 二次格式化 vs JSON 语法树一次生成
+
+用法: python benchmarks/pandoc_ast.py [--chapters 20] [--repeat 3] [--math]
+
+对同一篇合成论文 (format_modes.synthetic_markdown) 在两种格式化模式下分别计时 (取中位数，含写出 docx)：
+  pandoc  convert_with_pandoc (Pandoc 写出 docx -> python-docx 打开 -> 逐段重新格式化 -> 保存)
+  ast     convert_with_ast (pandoc -t json -> 按语法树直接生成 NJUST 格式，正文流式写出)
+另给出 AST 引擎中 Pandoc 解析 (-t json) 本身的耗时。--math 在每节追加行内与独立公式。
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from format_modes import synthetic_markdown  # noqa: E402
+from njust.formatter import NJUST_Formatter  # noqa: E402
+from njust.pandoc import markdown_to_ast  # noqa: E402
+
+MATH_PARAGRAPHS = (
+    "由能量守恒可知 $E = mc^2$，且当 $\\alpha \\to 0$ 时 $\\sin\\alpha \\approx \\alpha$。\n",
+    "$$\\int_0^{\\infty} e^{-x^2} \\, dx = \\frac{\\sqrt{\\pi}}{2}$$\n",
+    "$$\\mathbf{A} = \\begin{pmatrix} a_{11} & a_{12} \\\\ a_{21} & a_{22} \\end{pmatrix}$$\n",
+)
+
+
+def corpus(chapters, math):
+    md = synthetic_markdown(chapters)
+    if not math:
+        return md
+    # 每个小节标题之后插入公式段落
+    return md.replace('小节标题\n', '小节标题\n\n' + '\n'.join(MATH_PARAGRAPHS))
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--math', action='store_true', help='在语料中加入公式')
+    args = parser.parse_args(argv)
+
+    if not shutil.which('pandoc'):
+        print("未安装 Pandoc，跳过")
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['NJUST_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        md_path = os.path.join(tmp, 'thesis.md')
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write(corpus(args.chapters, args.math))
+        with open(md_path, 'rb') as f:
+            md_bytes = f.read()
+        print(f"Markdown {len(md_bytes) / 1024:.0f} KB")
+
+        cases = []
+        for mode in ('direct', 'style'):
+            cases.append((f'pandoc {mode}', lambda mode=mode: NJUST_Formatter(md_path, mode).convert_with_pandoc()))
+            cases.append((f'ast    {mode}', lambda mode=mode: NJUST_Formatter(md_path, mode).convert_with_ast()))
+        cases.append(('ast    parse', lambda: markdown_to_ast(md_bytes)))
+
+        print(f"{'case':<14} {'seconds':>8}")
+        for name, fn in cases:
+            print(f"{name:<14} {measure(fn, args.repeat):8.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+按章并行转换的加速曲线
+
+用法: python benchmarks/parallel.py [--chapters 16] [--max-workers 8] [--repeat 1]
+
+生成合成论文，不使用缓存，分别以 1..N 个工作进程按章转换 (Pandoc 引擎)，
+输出耗时与相对 1 个进程的加速比。另给出整篇转换 (不分章) 的耗时作对照。
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from format_modes import synthetic_markdown  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=16)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['NJUST_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        from njust.formatter import NJUST_Formatter
+        from njust.chapters import convert_incremental
+        from njust.reference_doc import reference_docx_path
+
+        md_path = os.path.join(tmp, 'thesis.md')
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write(synthetic_markdown(args.chapters))
+        reference_docx_path()  # 预先生成模板，不计入耗时
+
+        def timed(fn):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            return statistics.median(timings)
+
+        whole = timed(lambda: NJUST_Formatter(md_path).convert_with_pandoc())
+        print(f"整篇转换      {whole:7.3f}s")
+
+        base = None
+        print(f"{'workers':>7}  {'seconds':>8}  speedup   (CPU 核心数 {os.cpu_count()})")
+        for workers in range(1, args.max_workers + 1):
+            seconds = timed(lambda: convert_incremental(NJUST_Formatter(md_path), workers=workers,
+                                                        use_cache=False))
+            base = base or seconds
+            print(f"{workers:>7}  {seconds:8.3f}  {base / seconds:6.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
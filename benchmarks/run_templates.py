@@ -0,0 +1,108 @@
+"""
+rPr 模板微基准：逐属性写入 (旧实现) vs 复制预编译模板
+
+用法: python benchmarks/run_templates.py [--runs 100000] [--runs-per-paragraph 10]
+
+构造包含指定数量 run 的文档，分别用旧版 _apply_composite_font 的逐属性写法
+与当前基于模板的实现处理全部 run，报告总耗时与每个 run 的平均耗时。
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document  # noqa: E402
+from docx.shared import Pt, RGBColor  # noqa: E402
+from docx.oxml.ns import qn  # noqa: E402
+from docx.oxml import OxmlElement  # noqa: E402
+
+from njust.config import NJUST_Config  # noqa: E402
+from njust.formatter import NJUST_Formatter  # noqa: E402
+
+
+def legacy_apply_composite_font(run, size_pt, bold=False, italic=False, force_black=True, is_code=False):
+    """模板化之前的实现 (仅保留 Run 对象分支)，作为对照组"""
+    rPr = run._element.get_or_add_rPr()
+    font_size_val = int(size_pt.pt * 2)
+    ascii_font = NJUST_Config.FONT_CODE if is_code else NJUST_Config.FONT_EN
+    run.font.name = ascii_font
+    run.font.size = Pt(font_size_val / 2)
+    run.font.bold = bold
+    run.font.italic = italic
+    if force_black:
+        run.font.color.rgb = RGBColor(0, 0, 0)
+        run.font.underline = False
+    color = rPr.get_or_add_color()
+    if force_black:
+        color.set(qn('w:val'), '000000')
+        u = rPr.get_or_add_u()
+        u.set(qn('w:val'), 'none')
+    fonts = rPr.get_or_add_rFonts()
+    for attr in ['asciiTheme', 'eastAsiaTheme', 'hAnsiTheme', 'cstheme']:
+        attr_name = qn('w:' + attr)
+        if attr_name in fonts.attrib:
+            del fonts.attrib[attr_name]
+    fonts.set(qn('w:ascii'), ascii_font)
+    fonts.set(qn('w:hAnsi'), ascii_font)
+    fonts.set(qn('w:eastAsia'), NJUST_Config.FONT_CN)
+    fonts.set(qn('w:cs'), ascii_font)
+    fonts.set(qn('w:hint'), 'eastAsia')
+    sz = rPr.get_or_add_sz()
+    sz.set(qn('w:val'), str(font_size_val))
+    szCs = rPr.find(qn('w:szCs'))
+    if szCs is None:
+        szCs = OxmlElement('w:szCs')
+        rPr.append(szCs)
+    szCs.set(qn('w:val'), str(font_size_val))
+    if bold:
+        bCs = rPr.find(qn('w:bCs'))
+        if bCs is None:
+            bCs = OxmlElement('w:bCs')
+            rPr.append(bCs)
+        bCs.set(qn('w:val'), '1')
+
+
+def build_runs(total, per_paragraph):
+    doc = Document()
+    runs = []
+    for _ in range(total // per_paragraph):
+        p = doc.add_paragraph()
+        for k in range(per_paragraph):
+            runs.append(p.add_run(f"文本 text {k}"))
+    return runs
+
+
+def time_it(fn, runs):
+    start = time.perf_counter()
+    for i, run in enumerate(runs):
+        fn(run, NJUST_Config.SIZE_BODY, bold=(i % 7 == 0), italic=(i % 11 == 0))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=100000)
+    parser.add_argument('--runs-per-paragraph', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    formatter = NJUST_Formatter(None)
+    results = {}
+    # 每组都在全新文档上测两遍：首遍 run 没有 rPr，次遍覆盖已有 rPr
+    for name, fn in (('legacy', legacy_apply_composite_font), ('template', formatter._apply_composite_font)):
+        runs = build_runs(args.runs, args.runs_per_paragraph)
+        results[name] = (time_it(fn, runs), time_it(fn, runs))
+
+    n = (args.runs // args.runs_per_paragraph) * args.runs_per_paragraph
+    print(f"runs: {n}")
+    for name, (fresh, again) in results.items():
+        print(f"{name:<9} fresh {fresh:7.3f}s ({fresh / n * 1e6:6.2f} us/run)   "
+              f"reapply {again:7.3f}s ({again / n * 1e6:6.2f} us/run)")
+    speedup = sum(results['legacy']) / sum(results['template'])
+    print(f"speedup: {speedup:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+分阶段基准测试套件：合成论文 x 引擎，结果写入 JSON，可与上次结果对比并在变慢时失败
+
+用法: python benchmarks/suite.py [--sizes 10,100,500] [--profiles mixed,math,...] [--engines pandoc,ast,internal]
+                                 [--modes direct] [--repeat 3] [--json out.json]
+                                 [--baseline old.json] [--tolerance 0.25] [--min-delta 0.05]
+
+语料由 thesis.py 生成 (同样参数内容相同)。每次转换都把阶段耗时分开记录 (秒，多次运行取中位数)：
+  pandoc    pandoc (子进程) / load (python-docx 打开) / post_process (不含插图与表格) / images / tables / save
+  ast       pandoc (-t json 子进程) / render (不含插图与表格) / images / tables / save
+  internal  scan (图片引用扫描) / parse / render (不含解析、插图与表格) / images / tables / save
+streaming 引擎 (ast / internal) 边生成边写出，render 为生成正文元素的时间，save 为其余写出时间；
+images 为缩图 (或等待后台缩图) 与嵌入图片的时间。
+每次运行前清空插图与公式缓存 (NJUST 模板只生成一次)，结果反映转换一篇新文档的耗时。
+
+--baseline 给出上次的 JSON 时逐项对比：某阶段比基线慢超过 tolerance (比例) 且超过 min-delta 秒即为退化，
+脚本以退出码 1 结束。
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from thesis import PROFILES, SIZES, write_thesis  # noqa: E402
+from docx import Document  # noqa: E402
+from njust import omml  # noqa: E402
+from njust.paths import cache_dir  # noqa: E402
+from njust.formatter import NJUST_Formatter  # noqa: E402
+from njust.images import ImagePipeline, scan_images  # noqa: E402
+from njust.native import NativeRenderer, iter_blocks  # noqa: E402
+from njust.pandoc import markdown_to_ast  # noqa: E402
+from njust.streaming import write_streaming_docx  # noqa: E402
+
+ENGINES = ('pandoc', 'ast', 'internal')
+
+
+class StageTimer:
+    """按阶段累计耗时"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def wrap(self, name, fn):
+        """计时普通函数"""
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return timed
+
+    def wrap_generator(self, name, fn):
+        """计时生成器函数 (只统计生成各元素的时间)"""
+        def timed(*args, **kwargs):
+            return self.iterate(name, fn(*args, **kwargs))
+        return timed
+
+    def iterate(self, name, iterable):
+        it = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start)
+                return
+            self.add(name, time.perf_counter() - start)
+            yield item
+
+
+def _exclusive(stages, outer, *inner):
+    """outer 阶段的计时包含 inner 阶段，改为只计其自身"""
+    stages[outer] = max(0.0, stages.get(outer, 0.0) - sum(stages.get(name, 0.0) for name in inner))
+
+
+def _time_methods(obj, timer, stage, names, generator=False):
+    """把 obj 的方法替换为计入 stage 的计时版本 (只影响该实例)"""
+    for name in names:
+        fn = getattr(obj, name)
+        setattr(obj, name, timer.wrap_generator(stage, fn) if generator else timer.wrap(stage, fn))
+
+
+def run_pandoc(md_path, mode, out):
+    """同 convert_with_pandoc，逐步计时"""
+    timer = StageTimer()
+    formatter = NJUST_Formatter(md_path, format_mode=mode)
+    with open(md_path, 'rb') as f:
+        md_bytes = f.read()
+    with timer.stage('pandoc'):
+        docx_bytes, styled = formatter._pandoc_docx(md_bytes)
+    with timer.stage('load'):
+        doc = Document(io.BytesIO(docx_bytes))
+    _time_methods(formatter, timer, 'tables', ('_apply_table_style', '_apply_table_style_by_style'))
+    # 缩图流水线在 post_process_doc 内部创建，临时替换类上的方法
+    shrink_package = ImagePipeline.shrink_package
+    ImagePipeline.shrink_package = timer.wrap('images', shrink_package)
+    try:
+        with timer.stage('post_process'):
+            formatter.post_process_doc(doc, styled=styled)
+    finally:
+        ImagePipeline.shrink_package = shrink_package
+    with timer.stage('save'):
+        doc.save(out)
+    _exclusive(timer.stages, 'post_process', 'images', 'tables')
+    return timer.stages
+
+
+def run_ast(md_path, mode, out):
+    """同 convert_with_ast，逐步计时"""
+    from njust.pandoc_ast import AstRenderer
+    timer = StageTimer()
+    formatter = NJUST_Formatter(md_path, format_mode=mode)
+    with open(md_path, 'rb') as f:
+        md_bytes = f.read()
+    with timer.stage('pandoc'):
+        document = markdown_to_ast(md_bytes)
+    formatter._new_internal_document()
+
+    with ImagePipeline() as pipeline:
+        renderer = AstRenderer(formatter, pipeline)
+        _time_methods(renderer, timer, 'tables', ('_ast_table',), generator=True)
+        _time_methods(renderer, timer, 'images', ('_pic_inline',))
+        pipeline.prefetch(renderer.image_paths(document))
+        with timer.stage('save'):
+            write_streaming_docx(formatter.doc, timer.iterate('render', renderer.iter_elements(document)), out)
+    _exclusive(timer.stages, 'save', 'render')
+    _exclusive(timer.stages, 'render', 'images', 'tables')
+    return timer.stages
+
+
+def run_internal(md_path, mode, out):
+    """同 convert_internal，逐步计时 (解析与生成交替进行，分别累计)"""
+    timer = StageTimer()
+    formatter = NJUST_Formatter(md_path, format_mode=mode)
+    with open(md_path, 'r', encoding='utf-8') as f:
+        with timer.stage('scan'):
+            images = scan_images(f, formatter._base_dir())
+        f.seek(0)
+        formatter._new_internal_document()
+
+        with ImagePipeline() as pipeline:
+            pipeline.prefetch(images)
+            renderer = NativeRenderer(formatter, pipeline)
+            _time_methods(renderer, timer, 'tables', ('_block_table',), generator=True)
+            _time_methods(renderer, timer, 'images', ('_pic_inline',))
+
+            def elements():
+                for block in timer.iterate('parse', iter_blocks(f)):
+                    yield from getattr(renderer, '_block_' + block[0])(*block[1:])
+
+            with timer.stage('save'):
+                write_streaming_docx(formatter.doc, timer.iterate('render', elements()), out)
+    _exclusive(timer.stages, 'save', 'render')
+    _exclusive(timer.stages, 'render', 'parse', 'images', 'tables')
+    return timer.stages
+
+
+RUNNERS = {'pandoc': run_pandoc, 'ast': run_ast, 'internal': run_internal}
+
+
+def _reset_caches():
+    """清空插图 / 公式缓存，使每次运行都从头转换"""
+    for name in ('images', 'math'):
+        shutil.rmtree(cache_dir(name), ignore_errors=True)
+    omml._default_cache = None
+
+
+def run_case(md_path, engine, mode, repeat):
+    runs = []
+    docx_bytes = 0
+    for _ in range(repeat):
+        _reset_caches()
+        out = io.BytesIO()
+        start = time.perf_counter()
+        stages = RUNNERS[engine](md_path, mode, out)
+        stages['total'] = time.perf_counter() - start
+        runs.append(stages)
+        docx_bytes = len(out.getvalue())
+    names = list(runs[0])
+    return {
+        'engine': engine,
+        'mode': mode,
+        'stages': {name: round(statistics.median(run.get(name, 0.0) for run in runs), 4) for name in names},
+        'docx_bytes': docx_bytes,
+    }
+
+
+def _environment():
+    from njust.cache import pandoc_signature
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pandoc': pandoc_signature(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def _key(result):
+    return result['corpus'], result['engine'], result['mode']
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """返回退化列表 [(语料, 引擎, 模式, 阶段, 基线秒数, 本次秒数)]"""
+    old = {_key(r): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = old.get(_key(result))
+        if before is None:
+            continue
+        for stage, seconds in result['stages'].items():
+            previous = before['stages'].get(stage)
+            if previous is None:
+                continue
+            if seconds > previous * (1 + tolerance) and seconds - previous > min_delta:
+                regressions.append(_key(result) + (stage, previous, seconds))
+    return regressions
+
+
+def _print_results(results):
+    for result in results:
+        stages = '  '.join(f"{name} {seconds:.3f}" for name, seconds in result['stages'].items())
+        print(f"{result['corpus']:<16}{result['engine']:<10}{result['mode']:<8}{stages}")
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)), help='页数，逗号分隔')
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='语料类型，逗号分隔')
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    parser.add_argument('--modes', default='direct')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    parser.add_argument('--baseline', help='上次运行的 JSON 结果')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许变慢的比例 (默认 0.25)')
+    parser.add_argument('--min-delta', type=float, default=0.05, help='忽略小于该秒数的变化 (默认 0.05)')
+    args = parser.parse_args(argv)
+
+    engines = _split(args.engines)
+    for engine in engines:
+        if engine not in RUNNERS:
+            parser.error(f"未知引擎: {engine}")
+    if not shutil.which('pandoc'):
+        skipped = [e for e in engines if e != 'internal']
+        if skipped:
+            print(f"未安装 Pandoc，跳过: {', '.join(skipped)}")
+        engines = [e for e in engines if e == 'internal']
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['NJUST_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        for pages in map(int, _split(args.sizes)):
+            for profile in _split(args.profiles):
+                corpus = f"{profile}-{pages}"
+                folder = os.path.join(tmp, corpus)
+                os.makedirs(folder)
+                md_path = write_thesis(folder, pages, profile, args.seed)
+                for engine in engines:
+                    for mode in _split(args.modes):
+                        result = run_case(md_path, engine, mode, args.repeat)
+                        result['corpus'] = corpus
+                        results.append(result)
+                        _print_results([result])
+
+    report = {'environment': _environment(), 'seed': args.seed, 'repeat': args.repeat, 'results': results}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for corpus, engine, mode, stage, before, after in regressions:
+            print(f"退化: {corpus} {engine} {mode} {stage}: {before:.3f}s -> {after:.3f}s "
+                  f"(+{(after / before - 1) * 100 if before else float('inf'):.0f}%)")
+        if regressions:
+            return 1
+        print(f"与基线相比无退化 (容差 {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
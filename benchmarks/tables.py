@@ -0,0 +1,126 @@
+"""
+三线表引擎基准：10×5000 与 50×2000 的大表
+
+用法: python benchmarks/tables.py [--shapes 10x5000,50x2000] [--legacy-rows 300]
+
+对每种表格尺寸分别计时：
+  build         直接生成 w:tbl (内置引擎的 add_table_internal 路径)
+  format        对未格式化的表格 (相当于 Pandoc 输出) 执行直接格式模式的三线表处理
+  format_style  同上，样式模式
+  save          保存 docx
+--legacy-rows 用较小的行数运行旧实现 (python-docx 的 add_table / table.cell / rows.cells)，
+并与新实现在相同行数下对比，用于观察旧实现的平方级增长。
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document  # noqa: E402
+from docx.shared import Length, Pt  # noqa: E402
+from docx.enum.text import WD_ALIGN_PARAGRAPH  # noqa: E402
+from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT  # noqa: E402
+
+from njust.config import NJUST_Config  # noqa: E402
+from njust.formatter import NJUST_Formatter  # noqa: E402
+from njust.styles import apply_njust_styles  # noqa: E402
+from njust.tables import build_table_element  # noqa: E402
+from njust.templates import run_template, paragraph_template, half_points  # noqa: E402
+
+from run_templates import legacy_apply_composite_font  # noqa: E402
+
+
+def table_data(cols, rows):
+    return [[f"r{r}c{c} 数据" for c in range(cols)] for r in range(rows)]
+
+
+def col_width(doc, cols):
+    section = doc.sections[-1]
+    return Length(section.page_width - section.left_margin - section.right_margin).twips // cols
+
+
+def bench_new(cols, rows):
+    data = table_data(cols, rows)
+    result = {}
+
+    formatter = NJUST_Formatter(None)
+    formatter.doc = Document()
+    start = time.perf_counter()
+    tbl = build_table_element(data, cols, col_width(formatter.doc, cols),
+                              para_template=formatter._paragraph_template('center'),
+                              run_template=run_template(half_points(NJUST_Config.SIZE_CAPTION)))
+    formatter.doc.element.body._insert_tbl(tbl)
+    result['build'] = time.perf_counter() - start
+
+    # 未格式化的表格：与 Pandoc 输出一样只有文本
+    raw = Document()
+    raw_tbl = build_table_element(data, cols, col_width(raw, cols),
+                                  para_template=paragraph_template(), run_template=None)
+    raw.element.body._insert_tbl(raw_tbl)
+    table = raw.tables[0]
+    start = time.perf_counter()
+    formatter.doc = raw
+    formatter._apply_table_style(table)
+    result['format'] = time.perf_counter() - start
+
+    apply_njust_styles(raw)
+    start = time.perf_counter()
+    formatter._apply_table_style_by_style(table)
+    result['format_style'] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        raw.save(os.path.join(tmp, 'table.docx'))
+        result['save'] = time.perf_counter() - start
+    return result
+
+
+def bench_legacy(cols, rows):
+    """旧实现：python-docx 逐格构建 + rows/cells 逐格格式化"""
+    data = table_data(cols, rows)
+    doc = Document()
+    start = time.perf_counter()
+    table = doc.add_table(rows=rows, cols=cols)
+    for i, row in enumerate(data):
+        for j, text in enumerate(row):
+            cell = table.cell(i, j)
+            cell.text = ""
+            cell.paragraphs[0].add_run(text)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for row in table.rows:
+        for cell in row.cells:
+            cell.vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
+            for p in cell.paragraphs:
+                p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                p.paragraph_format.first_line_indent = Pt(0)
+                for run in p.runs:
+                    legacy_apply_composite_font(run, NJUST_Config.SIZE_CAPTION)
+    return {'build': build, 'format': time.perf_counter() - start}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--shapes', default='10x5000,50x2000', help='列x行，逗号分隔')
+    parser.add_argument('--legacy-rows', type=int, default=300, help='旧实现对照的行数 (0 表示跳过)')
+    args = parser.parse_args(argv)
+
+    for shape in args.shapes.split(','):
+        cols, rows = (int(x) for x in shape.lower().split('x'))
+        r = bench_new(cols, rows)
+        print(f"{cols:>3} x {rows:<6} build {r['build']:7.3f}s  format {r['format']:7.3f}s  "
+              f"format_style {r['format_style']:7.3f}s  save {r['save']:7.3f}s")
+        if args.legacy_rows:
+            n = min(rows, args.legacy_rows)
+            old = bench_legacy(cols, n)
+            new = bench_new(cols, n)
+            print(f"    @{n} rows  legacy build {old['build']:7.3f}s format {old['format']:7.3f}s | "
+                  f"new build {new['build']:7.3f}s format {new['format']:7.3f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
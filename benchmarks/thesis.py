@@ -0,0 +1,212 @@
+"""
+合成 NJUST 学位论文生成器 (基准测试语料)
+
+用法: python benchmarks/thesis.py 输出目录 [--pages 100] [--profile mixed] [--seed 0]
+
+按页数估算生成章节、正文、公式、三线表、插图、代码块与参考文献；同样的参数总是生成相同的内容。
+插图为只用标准库写出的 PNG (宽度超过 160 mm @ 300 dpi，会触发缩图)，按页数生成并在文中循环引用。
+"""
+import os
+import sys
+import zlib
+import random
+import struct
+import argparse
+
+# 各类块的相对权重：正文段落 / 独立公式 / 表格 / 插图 / 代码块
+PROFILES = {
+    'mixed': dict(paragraph=70, math=6, table=6, image=4, code=6),
+    'math': dict(paragraph=40, math=45, table=4, image=1, code=2),
+    'tables': dict(paragraph=35, math=2, table=45, image=2, code=2),
+    'images': dict(paragraph=40, math=2, table=4, image=40, code=2),
+    'code': dict(paragraph=35, math=2, table=4, image=1, code=45),
+    'references': dict(paragraph=70, math=6, table=6, image=4, code=6),
+}
+SIZES = (10, 100, 500)
+
+# 各类块约占的页数 (A4、小四正文、固定 20 磅行距：每页约 34 行 x 37 字)
+_PAGE_COST = {'heading': 0.07, 'paragraph': 0.15, 'math': 0.08, 'table': 0.3, 'image': 0.45, 'code': 0.22,
+              'reference': 0.04}
+_PAGES_PER_CHAPTER = 12
+_PAGES_PER_SECTION = 3
+# 参考文献条数：references 语料约三分之一篇幅为参考文献
+_REFERENCES = 30
+_MAX_IMAGES = 24
+_IMAGE_SIZE = (2200, 1500)
+
+_WORDS = ('本文', '研究', '方法', '模型', '实验', '结果', '表明', '系统', '数据', '分析', '提出', '一种',
+          '基于', '优化', '算法', '性能', '显著', '提升', '误差', '收敛', '网络', '结构', '参数', '训练',
+          '特征', '样本', '精度', '验证', '对比', '设计', '实现', '测试', '稳定', '鲁棒', '框架', '过程')
+_TERMS = ('Transformer', 'ResNet-50', 'Adam', 'GPU', 'F1-score', 'Python', 'PyTorch', 'RMSE', 'SVM', 'LSTM')
+_FORMULAS = (
+    r'\frac{{a_{i}}}{{b_{j}}} + \sqrt{{x_{k}}}',
+    r'\sum_{{i=1}}^{{{n}}} w_i x_i + b',
+    r'\int_0^{{{n}}} f(x) \, dx = F({n}) - F(0)',
+    r'\mathbf{{W}}^{{({k})}} = \mathbf{{W}}^{{({j})}} - \eta \nabla L',
+    r'\lim_{{n \to \infty}} \left( 1 + \frac{{1}}{{n}} \right)^{{n}} = e',
+    r'P(y = {i} \mid x) = \frac{{e^{{z_{i}}}}}{{\sum_{{j}} e^{{z_j}}}}',
+    r'\begin{{pmatrix}} a_{{{i}{j}}} & b \\ c & d_{{{k}}} \end{{pmatrix}}',
+    r'f(x) = \begin{{cases}} x^{{{n}}}, & x \ge 0 \\ 0, & x < 0 \end{{cases}}',
+)
+_INLINE_FORMULAS = (r'x_{i}', r'\alpha_{j}', r'O(n^{k})', r'\theta \in \mathbb{{R}}^{n}', r'\lambda = 0.{k}')
+
+
+class _Writer:
+    def __init__(self, pages, profile, seed):
+        self.rng = random.Random(f"{profile}-{pages}-{seed}")
+        self.pages = pages
+        self.profile = profile
+        self.weights = PROFILES[profile]
+        self.used = 0.0
+        self.parts = []
+        self.images = []
+        self.counters = {'table': 0, 'image': 0}
+
+    def sentence(self, inline_math=False):
+        rng = self.rng
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 16))]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), f" {rng.choice(_TERMS)} ")
+        if inline_math:
+            words.insert(rng.randrange(len(words)), f" ${self.formula(_INLINE_FORMULAS)}$ ")
+        return ''.join(words) + rng.choice('，。；')
+
+    def formula(self, templates):
+        rng = self.rng
+        return rng.choice(templates).format(i=rng.randint(1, 4), j=rng.randint(1, 4), k=rng.randint(1, 4),
+                                            n=rng.randint(2, 9))
+
+    def add(self, kind, text):
+        self.parts.append(text)
+        self.used += _PAGE_COST[kind]
+
+    def paragraph(self):
+        rng = self.rng
+        math_rate = 0.5 if self.profile == 'math' else 0.1
+        sentences = [self.sentence(rng.random() < math_rate) for _ in range(rng.randint(5, 9))]
+        if rng.random() < 0.3:
+            i = rng.randrange(len(sentences))
+            sentences[i] = f"**{sentences[i][:-1]}**{sentences[i][-1]}"
+        if rng.random() < 0.2:
+            sentences.append(f"调用 `{rng.choice(_TERMS).lower()}_fit()` 完成训练。")
+        self.add('paragraph', ''.join(sentences) + '\n')
+
+    def math(self):
+        self.add('math', f"$${self.formula(_FORMULAS)}$$\n")
+
+    def table(self):
+        rng = self.rng
+        self.counters['table'] += 1
+        cols = rng.randint(3, 6)
+        rows = rng.randint(5, 14)
+        lines = [f": 实验结果对比 {self.counters['table']}\n",
+                 '| ' + ' | '.join(['方法'] + [f'指标{c}' for c in range(1, cols)]) + ' |',
+                 '|' + '---|' * cols]
+        for r in range(rows):
+            cells = [rng.choice(_TERMS)] + [f"{rng.uniform(0, 100):.2f}" for _ in range(cols - 1)]
+            lines.append('| ' + ' | '.join(cells) + ' |')
+        self.parts.append('\n'.join(lines[1:]) + '\n\n' + lines[0])
+        self.used += _PAGE_COST['table'] * rows / 8
+
+    def image(self):
+        self.counters['image'] += 1
+        n = self.counters['image']
+        limit = min(_MAX_IMAGES, max(1, self.pages // 4))
+        name = f"figures/fig{(n - 1) % limit + 1:02d}.png"
+        if name not in self.images:
+            self.images.append(name)
+        self.add('image', f"![系统结构示意图 {n}]({name})\n")
+
+    def code(self):
+        rng = self.rng
+        body = [f"def step_{rng.randint(1, 99)}(model, batch):"]
+        for _ in range(rng.randint(6, 14)):
+            body.append(f"    loss = model.{rng.choice(('forward', 'loss', 'update'))}(batch[{rng.randint(0, 9)}])")
+        body.append("    return loss")
+        self.add('code', "```python\n" + '\n'.join(body) + "\n```\n")
+
+    def generate(self):
+        rng = self.rng
+        kinds = list(self.weights)
+        weights = [self.weights[k] for k in kinds]
+        references = _REFERENCES
+        body_pages = self.pages
+        if self.profile == 'references':
+            references = max(_REFERENCES, int(self.pages / 3 / _PAGE_COST['reference']))
+            body_pages = self.pages * 2 / 3
+
+        chapter = section = 0
+        while self.used < body_pages:
+            if chapter == 0 or self.used >= chapter * _PAGES_PER_CHAPTER:
+                chapter += 1
+                section = 0
+                self.add('heading', f"# 第{chapter}章 {''.join(rng.choice(_WORDS) for _ in range(4))}\n")
+            if section == 0 or self.used >= ((chapter - 1) * _PAGES_PER_CHAPTER + section * _PAGES_PER_SECTION):
+                section += 1
+                self.add('heading', f"## {chapter}.{section} {''.join(rng.choice(_WORDS) for _ in range(3))}\n")
+            getattr(self, rng.choices(kinds, weights)[0])()
+
+        self.add('heading', "# 参考文献\n")
+        for i in range(1, references + 1):
+            authors = ', '.join(f"作者{rng.randint(1, 500)}" for _ in range(rng.randint(1, 3)))
+            self.add('reference', f"[{i}] {authors}. {''.join(rng.choice(_WORDS) for _ in range(6))}[J]. "
+                                  f"期刊{rng.randint(1, 40)}, {rng.randint(1990, 2024)}, {rng.randint(1, 60)}"
+                                  f"({rng.randint(1, 12)}): {rng.randint(1, 200)}-{rng.randint(201, 400)}.\n")
+        return '\n'.join(self.parts)
+
+
+def generate_markdown(pages=100, profile='mixed', seed=0):
+    """生成约 pages 页的论文 Markdown，返回 (文本, 引用的图片相对路径列表)"""
+    if profile not in PROFILES:
+        raise ValueError(f"未知语料类型: {profile}")
+    writer = _Writer(pages, profile, seed)
+    return writer.generate(), writer.images
+
+
+def write_png(path, width, height, seed):
+    """只用标准库写出一张 RGB PNG (随机像素行逐行错位，压缩率接近真实截图)"""
+    rng = random.Random(seed)
+    row = bytes(rng.getrandbits(8) for _ in range(width * 3))
+    raw = bytearray()
+    for y in range(height):
+        k = (y * 3 * rng.randint(1, 4)) % len(row)
+        raw += b'\x00' + row[k:] + row[:k]
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(bytes(raw), 6)))
+        f.write(chunk(b'IEND', b''))
+
+
+def write_thesis(folder, pages=100, profile='mixed', seed=0):
+    """在 folder 中写出 thesis.md 与其引用的插图，返回 Markdown 路径"""
+    text, images = generate_markdown(pages, profile, seed)
+    for i, name in enumerate(images):
+        path = os.path.join(folder, name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_png(path, *_IMAGE_SIZE, seed=f"{seed}-{i}")
+    md_path = os.path.join(folder, 'thesis.md')
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return md_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('folder')
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='mixed')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    os.makedirs(args.folder, exist_ok=True)
+    print(write_thesis(args.folder, args.pages, args.profile, args.seed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""
+NJUST Thesis Formatter
+Description: 将 Markdown 转换为符合 NJUST 规范的 Word 文档。
+
+作为库使用时：
+    from njust import NJUST_Formatter, convert_file
+    convert_file("thesis.md")
+
+包本身不导入任何第三方依赖，访问对应名称时才加载
+(python-docx 在首次使用格式化器时加载，PyQt6 只在启动界面时加载)。
+"""
+
+_LAZY_EXPORTS = {
+    'NJUST_Config': 'config',
+    'NJUST_Formatter': 'formatter',
+    'convert_file': 'formatter',
+    'validate_docx': 'validate',
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,191 @@
+import os
+import threading
+import re
+import json
+import shutil
+import filecmp
+import hashlib
+from functools import lru_cache
+from urllib.parse import unquote
+
+from .config import config_fingerprint
+from .paths import cache_dir
+
+# ==========================================
+# 转换结果缓存：内容未变化时直接复用上次的输出
+# ==========================================
+# 缓存键 = Markdown 字节 + 引用图片的内容 + NJUST_Config + 引擎 / 格式模式 / Pandoc 版本。
+# 编辑器与 AI 工具经常原样重复保存文件，命中缓存时无需再跑 Pandoc 与后处理。
+
+# 转换 / 后处理逻辑变化时递增，使旧缓存失效
+CONVERSION_CACHE_REVISION = 6
+# 缓存总大小上限，超出后按最近使用时间淘汰
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 引擎实际产出的文件类型 (决定输出文件名后缀)
+OUTPUT_KINDS = ('pandoc', 'internal')
+
+# Markdown 图片 ![alt](path "title") 与 HTML <img src="path">
+_MD_IMAGE = re.compile(r'!\[[^\]]*\]\(\s*<?([^)\s>]+)')
+_HTML_IMAGE = re.compile(r'<img\b[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+
+def referenced_images(md_text, base_dir):
+    """列出 Markdown 中引用的本地图片 (绝对路径，按出现顺序去重；网络图片忽略)"""
+    seen = []
+    for match in _MD_IMAGE.finditer(md_text):
+        seen.append(match.group(1))
+    for match in _HTML_IMAGE.finditer(md_text):
+        seen.append(match.group(1))
+    paths = []
+    for src in seen:
+        if re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*://', src) or src.startswith('data:'):
+            continue
+        path = os.path.normpath(os.path.join(base_dir, src))
+        if not os.path.exists(path):
+            decoded = os.path.normpath(os.path.join(base_dir, unquote(src)))
+            if os.path.exists(decoded):
+                path = decoded
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+
+@lru_cache(maxsize=1024)
+def _file_digest(path, size, mtime_ns):
+    """文件内容哈希；按 (路径, 大小, 修改时间) 记忆，同一张图片在进程内只读一次"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_digest(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 'missing'
+    return _file_digest(path, st.st_size, st.st_mtime_ns)
+
+
+def pandoc_signature():
+    """当前 Pandoc 的版本号，未安装时返回 None (见 pandoc.pandoc_info，每个进程只启动一次 pandoc --version)"""
+    from .pandoc import pandoc_info
+    try:
+        return pandoc_info()[1]
+    except Exception:
+        return None
+
+
+def conversion_key(md_bytes, base_dir, engine, format_mode):
+    """计算一次转换的缓存键"""
+    from .reference_doc import REFERENCE_DOC_REVISION
+
+    md_text = md_bytes.decode('utf-8', errors='replace')
+    payload = {
+        'revision': CONVERSION_CACHE_REVISION,
+        'reference_revision': REFERENCE_DOC_REVISION,
+        'config': config_fingerprint(),
+        'engine': engine,
+        'format_mode': format_mode,
+        'pandoc': pandoc_signature() if engine != 'internal' else None,
+        'markdown': hashlib.sha256(md_bytes).hexdigest(),
+        'images': [(os.path.relpath(p, base_dir), file_digest(p))
+                   for p in referenced_images(md_text, base_dir)],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ConversionCache:
+    """
+    磁盘上的转换结果缓存，每个条目为一个 docx 文件: <key>.<kind>.docx。
+
+    文件修改时间即最近使用时间 (命中时刷新)，总大小超过 max_bytes 时淘汰最久未用的条目。
+    """
+
+    def __init__(self, folder=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.folder = folder or cache_dir('conversions')
+        self.max_bytes = max_bytes
+
+    def _entry(self, key, kind):
+        return os.path.join(self.folder, f"{key}.{kind}.docx")
+
+    def lookup(self, key):
+        """返回 (kind, 缓存文件路径)，未命中时返回 None"""
+        for kind in OUTPUT_KINDS:
+            path = self._entry(key, kind)
+            try:
+                os.utime(path)
+            except OSError:
+                continue
+            return kind, path
+        return None
+
+    def store(self, key, kind, output_path):
+        """把转换结果复制进缓存 (先写临时文件再原子替换)，随后按容量淘汰"""
+        return self._store(key, kind, lambda tmp_path: shutil.copyfile(output_path, tmp_path))
+
+    def store_bytes(self, key, kind, data):
+        """同 store，内容直接以字节给出"""
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        return self._store(key, kind, write)
+
+    def _store(self, key, kind, write):
+        path = self._entry(key, kind)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
+        return path
+
+    def evict(self):
+        evict_lru(self.folder, self.max_bytes, '.docx')
+
+    def clear(self):
+        for name in os.listdir(self.folder):
+            if name.endswith('.docx'):
+                os.remove(os.path.join(self.folder, name))
+
+
+def evict_lru(folder, max_bytes, suffix):
+    """目录中以 suffix (字符串或元组) 结尾的文件总大小超过 max_bytes 时，按修改时间 (最近使用时间) 从旧到新删除"""
+    entries = []
+    total = 0
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.name.endswith(suffix):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry.path))
+            total += st.st_size
+    entries.sort()
+    for _mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def restore_output(cached_path, output_path):
+    """
+    把缓存条目恢复为输出文件。
+
+    输出文件已存在且内容相同时不重写 (避免 Word / 网盘同步把它当作新文件)。
+    """
+    if os.path.exists(output_path) and filecmp.cmp(cached_path, output_path, shallow=False):
+        return output_path
+    shutil.copyfile(cached_path, output_path)
+    return output_path
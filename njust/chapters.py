@@ -0,0 +1,443 @@
+import io
+import os
+import re
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn, nsmap
+from lxml import etree
+
+from .cache import ConversionCache, conversion_key
+from .paths import cache_dir
+from .pandoc import markdown_to_docx_bytes
+from .reference_doc import reference_docx_path
+
+# ==========================================
+# 按章增量转换：一级标题切分 -> 逐章转换并缓存 -> 拼接为一个文档
+# ==========================================
+# 修改第五章的一个错字时，只有第五章需要重新经过 Pandoc 与后处理，
+# 其余章节直接取缓存的 docx 片段。拼接时合并图片、超链接、编号、脚注与样式，
+# 并重新分配书签 / 图片 docPr 的 id，保证合并后的文档与整篇转换等价。
+
+_LEVEL1_HEADING = re.compile(r'^#(?!#)\s')
+_FENCE = re.compile(r'^\s{0,3}(`{3,}|~{3,})')
+# 链接引用定义 [label]: url 与脚注定义 [^label]: text
+_DEFINITION = re.compile(r'^\s{0,3}\[([^\]]+)\]:')
+# LaTeX 宏定义 (Pandoc 的 latex_macros 扩展在之后的公式中展开)
+_MACRO = re.compile(r'^\s{0,3}\\(newcommand|renewcommand|providecommand|def|DeclareMathOperator)\b')
+_FRONT_MATTER_END = re.compile(r'^(---|\.\.\.)\s*$')
+# Pandoc 为重复标识符追加的 -N 后缀
+_NUMBERED_NAME = re.compile(r'^(.+)-(\d+)$')
+
+W_SECTPR = qn('w:sectPr')
+W_ID = qn('w:id')
+W_VAL = qn('w:val')
+W_NUM = qn('w:num')
+W_NUM_ID = qn('w:numId')
+W_ABSTRACT_NUM = qn('w:abstractNum')
+W_ABSTRACT_NUM_ID = qn('w:abstractNumId')
+W_STYLE = qn('w:style')
+W_STYLE_ID = qn('w:styleId')
+W_FOOTNOTE = qn('w:footnote')
+W_FOOTNOTE_REFERENCE = qn('w:footnoteReference')
+W_BOOKMARK_START = qn('w:bookmarkStart')
+W_BOOKMARK_END = qn('w:bookmarkEnd')
+W_NAME = qn('w:name')
+WP_DOC_PR = qn('wp:docPr')
+R_NS = '{%s}' % nsmap['r']
+# 带有关系引用 (r:id / r:embed / r:link ...) 的元素
+_HAS_REL = etree.XPath('descendant-or-self::*[@r:*]', namespaces=nsmap)
+_STYLE_REFS = frozenset([qn('w:pStyle'), qn('w:rStyle'), qn('w:tblStyle')])
+_STYLE_LINKS = (qn('w:basedOn'), qn('w:link'), qn('w:next'))
+
+
+def _scan_lines(md_text):
+    """逐行产出 (行, 是否位于代码围栏内)"""
+    fence = None
+    for line in md_text.splitlines(keepends=True):
+        m = _FENCE.match(line)
+        if m:
+            marker = m.group(1)
+            if fence is None:
+                fence = marker[0] * 3
+                yield line, True
+                continue
+            if marker.startswith(fence):
+                fence = None
+                yield line, True
+                continue
+        yield line, fence is not None
+
+
+def split_chapters(md_text):
+    """在一级标题 (# 标题) 处切分 Markdown，代码块中的 # 不视为标题；一级标题之前的内容单独成段"""
+    chapters = [[]]
+    for line, in_code in _scan_lines(md_text):
+        if not in_code and _LEVEL1_HEADING.match(line) and chapters[-1]:
+            chapters.append([])
+        chapters[-1].append(line)
+    return [''.join(lines) for lines in chapters if ''.join(lines).strip()]
+
+
+def _split_definitions(md_text):
+    """
+    分离链接引用定义与脚注定义。
+
+    返回 (去掉定义后的正文, {小写标签: 定义文本})。链接定义到第一个空行为止，
+    只有紧接其后的缩进行 (换行书写的标题) 属于定义；脚注定义与 Pandoc 一致，包含空行后缩进的续段。
+    """
+    body = []
+    found = {}
+    label = None
+    for line, in_code in _scan_lines(md_text):
+        m = None if in_code else _DEFINITION.match(line)
+        if m:
+            label = m.group(1).lower()
+            found.setdefault(label, []).append(line)
+            continue
+        if label is not None:
+            indented = line[:1] in (' ', '\t') and line.strip()
+            if indented or (label.startswith('^') and not line.strip()):
+                found[label].append(line)
+                continue
+        label = None
+        body.append(line)
+    return ''.join(body), {k: ''.join(v).rstrip() + '\n' for k, v in found.items()}
+
+
+def _has_front_matter(md_text):
+    lines = md_text.lstrip('\ufeff').splitlines()
+    return bool(lines) and lines[0].rstrip() == '---' and any(_FRONT_MATTER_END.match(l) for l in lines[1:])
+
+
+def _macro_definitions(md_text):
+    """章节中的 LaTeX 宏定义 (代码块之外；跨行的定义按花括号配对取完整)"""
+    found = []
+    depth = 0
+    for line, in_code in _scan_lines(md_text):
+        if depth > 0 or (not in_code and _MACRO.match(line)):
+            found.append(line)
+            depth = max(0, depth + line.count('{') - line.count('}'))
+    return ''.join(found)
+
+
+def chapter_sources(md_text):
+    """
+    切分后的各章 Markdown。
+
+    链接 / 脚注定义可能写在任意章节 (常见于全文末尾)：先从全文中取出所有定义，
+    再给每章补上本章实际引用的定义；前面各章的 LaTeX 宏定义补在每章开头，使每章都能独立转换。
+    带 YAML 元数据的文档不切分 (元数据对全文生效，且标题块只能出现一次)。
+    """
+    if _has_front_matter(md_text):
+        return [md_text]
+    body, definitions = _split_definitions(md_text)
+    chapters = split_chapters(body)
+    sources = []
+    macros = ''
+    for chapter in chapters:
+        source = macros + '\n' + chapter if macros else chapter
+        macros += _macro_definitions(chapter)
+        if definitions:
+            lowered = chapter.lower()
+            used = [text for label, text in definitions.items() if f'[{label}]' in lowered]
+            if used:
+                source = source.rstrip('\n') + '\n\n' + '\n'.join(used)
+        sources.append(source)
+    return sources
+
+
+def _related_part(part, reltype):
+    for rel in part.rels.values():
+        if rel.reltype == reltype and not rel.is_external:
+            return rel.target_part
+    return None
+
+
+def _max_id(elements, attr):
+    ids = [int(el.get(attr)) for el in elements if (el.get(attr) or '').lstrip('-').isdigit()]
+    return max(ids, default=0)
+
+
+class DocumentSplicer:
+    """把多个由同一 reference.docx 生成的文档依次追加到第一个文档之后"""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.body = doc.element.body
+        self.sect_pr = self.body.find(W_SECTPR)
+        self.numbering = doc.part.numbering_part.element
+        self.styles = doc.styles.element
+        self.style_ids = {s.get(W_STYLE_ID) for s in self.styles.iterchildren(W_STYLE)}
+        self.footnotes_part = _related_part(doc.part, RT.FOOTNOTES)
+        self.footnotes = parse_xml(self.footnotes_part.blob) if self.footnotes_part is not None else None
+
+        self.abstract_ids = {el.get(W_ABSTRACT_NUM_ID) for el in self.numbering.iterchildren(W_ABSTRACT_NUM)}
+        self.next_num_id = _max_id(self.numbering.iterchildren(W_NUM), W_NUM_ID) + 1
+        self.next_bookmark = _max_id(self.body.iter(W_BOOKMARK_START), W_ID) + 1
+        self.bookmark_names = {b.get(W_NAME) for b in self.body.iter(W_BOOKMARK_START)}
+        self.next_doc_pr = _max_id(self.body.iter(WP_DOC_PR), 'id') + 1
+        self.next_footnote = _max_id(self.footnotes.iterchildren(W_FOOTNOTE), W_ID) + 1 \
+            if self.footnotes is not None else 1
+
+    def append(self, src):
+        """追加 src 文档的正文 (不含其 sectPr)"""
+        fragment = [child for child in src.element.body if child.tag != W_SECTPR]
+        rel_map = {}
+        num_map = {}
+        bookmark_map = {}
+        chapter_names = set()
+        for el in fragment:
+            self._remap_rels(el, src.part, self.doc.part, rel_map)
+            self._remap_numbering(el, src, num_map)
+            self._remap_bookmarks(el, bookmark_map, chapter_names)
+            self._remap_drawings(el)
+            self._copy_styles(el, src)
+            self._copy_footnotes(el, src)
+        for el in fragment:
+            if self.sect_pr is not None:
+                self.sect_pr.addprevious(el)
+            else:
+                self.body.append(el)
+
+    def finish(self):
+        """写回脚注部件 (python-docx 只把它当作二进制部件处理)"""
+        if self.footnotes is not None:
+            self.footnotes_part._blob = etree.tostring(self.footnotes, xml_declaration=True,
+                                                       encoding='UTF-8', standalone=True)
+        return self.doc
+
+    # ---- 关系 (图片 / 超链接) ----
+    def _remap_rels(self, el, src_part, dst_part, rel_map):
+        for node in _HAS_REL(el):
+            for attr, value in node.attrib.items():
+                if attr.startswith(R_NS) and value in src_part.rels:
+                    if value not in rel_map:
+                        rel_map[value] = self._copy_rel(src_part.rels[value], dst_part)
+                    node.set(attr, rel_map[value])
+
+    @staticmethod
+    def _copy_rel(rel, dst_part):
+        if rel.is_external:
+            return dst_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        if rel.reltype == RT.IMAGE:
+            # 按内容去重，不同章节引用同一张图片时只保存一份
+            image_part = dst_part.package.get_or_add_image_part(io.BytesIO(rel.target_part.blob))
+            return dst_part.relate_to(image_part, RT.IMAGE)
+        return dst_part.relate_to(rel.target_part, rel.reltype)
+
+    # ---- 列表编号 ----
+    def _remap_numbering(self, el, src, num_map):
+        for num_id in el.iter(W_NUM_ID):
+            old = num_id.get(W_VAL)
+            if old not in num_map:
+                num_map[old] = self._copy_num(src, old)
+            if num_map[old] is not None:
+                num_id.set(W_VAL, num_map[old])
+
+    def _copy_num(self, src, old_num_id):
+        src_numbering = src.part.numbering_part.element
+        src_num = next((n for n in src_numbering.iterchildren(W_NUM) if n.get(W_NUM_ID) == old_num_id), None)
+        if src_num is None:
+            return None
+        abstract_id = src_num.find(W_ABSTRACT_NUM_ID).get(W_VAL)
+        if abstract_id not in self.abstract_ids:
+            src_abstract = next(a for a in src_numbering.iterchildren(W_ABSTRACT_NUM)
+                                if a.get(W_ABSTRACT_NUM_ID) == abstract_id)
+            # abstractNum 必须位于所有 num 之前
+            first_num = self.numbering.find(W_NUM)
+            if first_num is not None:
+                first_num.addprevious(copy.deepcopy(src_abstract))
+            else:
+                self.numbering.append(copy.deepcopy(src_abstract))
+            self.abstract_ids.add(abstract_id)
+        new_num = copy.deepcopy(src_num)
+        new_id = str(self.next_num_id)
+        self.next_num_id += 1
+        new_num.set(W_NUM_ID, new_id)
+        self.numbering.append(new_num)
+        return new_id
+
+    # ---- 书签与图片 id ----
+    def _remap_bookmarks(self, el, bookmark_map, chapter_names):
+        for node in el.iter(W_BOOKMARK_START, W_BOOKMARK_END):
+            old = node.get(W_ID)
+            if old not in bookmark_map:
+                bookmark_map[old] = str(self.next_bookmark)
+                self.next_bookmark += 1
+            node.set(W_ID, bookmark_map[old])
+            if node.tag == W_BOOKMARK_START:
+                node.set(W_NAME, self._unique_name(node.get(W_NAME), chapter_names))
+
+    def _unique_name(self, name, chapter_names):
+        """
+        按 Pandoc 的规则为书签名去重 (已存在时依次尝试 名称-1、名称-2 ...)，得到与整篇转换相同的名称。
+
+        单章转换时 Pandoc 已在章内把第二个「小结」命名为「小结-1」，这里按章内的原名「小结」重新编号。
+        超链接 w:anchor 与域代码中的目标是 Markdown 中按整篇文档书写的标识符，不需要改写。
+        """
+        if name is None:
+            return name
+        base = name
+        match = _NUMBERED_NAME.match(name)
+        if match and match.group(1) in chapter_names:
+            base = match.group(1)
+        chapter_names.add(name)
+        unique, n = base, 0
+        while unique in self.bookmark_names:
+            n += 1
+            unique = f"{base}-{n}"
+        self.bookmark_names.add(unique)
+        return unique
+
+    def _remap_drawings(self, el):
+        for doc_pr in el.iter(WP_DOC_PR):
+            doc_pr.set('id', str(self.next_doc_pr))
+            self.next_doc_pr += 1
+
+    # ---- 样式 (例如只在某一章出现的代码高亮字符样式) ----
+    def _copy_styles(self, el, src):
+        missing = {node.get(W_VAL) for node in el.iter(*_STYLE_REFS)} - self.style_ids
+        if not missing:
+            return
+        src_styles = {s.get(W_STYLE_ID): s for s in src.styles.element.iterchildren(W_STYLE)}
+        while missing:
+            style_id = missing.pop()
+            style = src_styles.get(style_id)
+            self.style_ids.add(style_id)
+            if style is None:
+                continue
+            self.styles.append(copy.deepcopy(style))
+            for link in _STYLE_LINKS:
+                ref = style.find(link)
+                if ref is not None and ref.get(W_VAL) not in self.style_ids:
+                    missing.add(ref.get(W_VAL))
+
+    # ---- 脚注 ----
+    def _copy_footnotes(self, el, src):
+        refs = list(el.iter(W_FOOTNOTE_REFERENCE))
+        if not refs:
+            return
+        src_part = _related_part(src.part, RT.FOOTNOTES)
+        if self.footnotes is None or src_part is None:
+            raise ValueError("脚注部件缺失，无法按章拼接")
+        src_notes = {n.get(W_ID): n for n in parse_xml(src_part.blob).iterchildren(W_FOOTNOTE)}
+        rel_map = {}
+        for ref in refs:
+            note = copy.deepcopy(src_notes[ref.get(W_ID)])
+            new_id = str(self.next_footnote)
+            self.next_footnote += 1
+            note.set(W_ID, new_id)
+            self._remap_rels(note, src_part, self.footnotes_part, rel_map)
+            self.footnotes.append(note)
+            ref.set(W_ID, new_id)
+
+
+def render_chapter(formatter, chapter_md, resource_dir, reference_doc):
+    """单章：Pandoc 转换 + 后处理，返回 (docx 字节, Pandoc 警告列表)"""
+    warnings = []
+    docx_bytes = markdown_to_docx_bytes(chapter_md.encode('utf-8'), resource_dir=resource_dir,
+                                        extra_args=['--reference-doc', reference_doc], warnings=warnings)
+    doc = Document(io.BytesIO(docx_bytes))
+    formatter.post_process_doc(doc, styled=True)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue(), warnings
+
+
+def _render_chapter_job(input_path, format_mode, chapter_md, resource_dir, reference_doc):
+    """进程池任务：在子进程中转换单章 (参数与返回值均可 pickle)"""
+    from .formatter import NJUST_Formatter
+    formatter = NJUST_Formatter(input_path, format_mode=format_mode)
+    return render_chapter(formatter, chapter_md, resource_dir, reference_doc)
+
+
+def render_chapters(formatter, sources, resource_dir, reference_doc, workers=1):
+    """
+    转换多个章节，按输入顺序返回 (docx 字节, Pandoc 警告列表) 的列表。
+
+    workers > 1 且待转换章节不止一个时分发到进程池 (Pandoc 与后处理都是单线程的)。
+    每完成一章向 formatter.metrics 报告一次进度。
+    """
+    metrics = formatter.metrics
+    rendered = []
+    if workers <= 1 or len(sources) < 2:
+        for md in sources:
+            rendered.append(render_chapter(formatter, md, resource_dir, reference_doc))
+            metrics.advance(len(rendered), len(sources))
+        return rendered
+    with ProcessPoolExecutor(max_workers=min(workers, len(sources))) as pool:
+        futures = [pool.submit(_render_chapter_job, formatter.input_path, formatter.format_mode,
+                               md, resource_dir, reference_doc) for md in sources]
+        for future in futures:
+            rendered.append(future.result())
+            metrics.advance(len(rendered), len(sources))
+        return rendered
+
+
+def convert_incremental(formatter, on_info=None, cache=None, workers=1, use_cache=True):
+    """
+    按章转换 formatter.input_path，返回输出路径。
+
+    少于两章时返回 None (由调用方走整篇转换)。use_cache=True 时每章的转换结果以章节内容哈希缓存，
+    未修改的章节直接复用；需要转换的章节按 workers 并行。
+    任一章转换时 Pandoc 给出警告 (例如章节单独转换时缺少全文范围的定义) 也返回 None，改为整篇转换。
+    """
+    info = on_info or (lambda msg: None)
+    with open(formatter.input_path, 'r', encoding='utf-8') as f:
+        md_text = f.read()
+    sources = chapter_sources(md_text)
+    if len(sources) < 2:
+        return None
+
+    if use_cache:
+        cache = cache or ConversionCache(cache_dir('chapters'))
+    resource_dir = os.path.abspath(os.path.dirname(formatter.input_path) or '.')
+    reference_doc = reference_docx_path()
+
+    metrics = formatter.metrics
+    chapters = [None] * len(sources)
+    pending = []
+    with metrics.stage('chapters'):
+        for i, chapter_md in enumerate(sources):
+            key = None
+            if use_cache:
+                key = conversion_key(chapter_md.encode('utf-8'), resource_dir, 'pandoc-chapter',
+                                     formatter.format_mode)
+                hit = cache.lookup(key)
+                if hit:
+                    with open(hit[1], 'rb') as f:
+                        chapters[i] = f.read()
+                    continue
+            pending.append((i, key))
+
+        rendered = render_chapters(formatter, [sources[i] for i, _key in pending], resource_dir, reference_doc,
+                                   workers=workers)
+        warned = []
+        for (i, key), (data, warnings) in zip(pending, rendered):
+            if warnings:
+                warned.append(i + 1)
+                continue
+            if use_cache:
+                cache.store_bytes(key, 'pandoc', data)
+            chapters[i] = data
+    if warned:
+        info(f"第 {', '.join(map(str, warned))} 章单独转换时 Pandoc 给出警告，改为整篇转换...")
+        metrics.fallback('chapters', f"Pandoc 警告 (第 {', '.join(map(str, warned))} 章)")
+        return None
+    info(f"按章转换：共 {len(sources)} 章，重新转换 {len(pending)} 章")
+
+    with metrics.stage('splice'):
+        splicer = DocumentSplicer(Document(io.BytesIO(chapters[0])))
+        for data in chapters[1:]:
+            splicer.append(Document(io.BytesIO(data)))
+        doc = splicer.finish()
+    metrics.count_elements(doc.element.body)
+
+    output_path = formatter.get_safe_output_path(formatter.default_output_path('pandoc'))
+    with metrics.stage('save'):
+        doc.save(output_path)
+    return output_path
@@ -0,0 +1,326 @@
+"""
+命令行入口 (无界面模式)
+
+本模块只依赖标准库，转换引擎在执行子命令时才被导入，
+因此 `python main.py --help` 与 watch 启动都不会加载 PyQt6 / python-docx。
+"""
+import os
+import sys
+import argparse
+from functools import partial
+
+ENGINE_CHOICES = ('auto', 'pandoc', 'ast', 'internal')
+FORMAT_MODE_CHOICES = ('direct', 'style')
+
+
+def _log(msg):
+    print(msg, file=sys.stderr)
+
+
+def _jobs(args):
+    return args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+
+def _scheduler(args, by_file=True, index=None):
+    """
+    按命令行参数创建转换调度器。
+
+    by_file=True：-j 个文件同时转换 (多进程)；否则文件逐个转换、每个文件按章并行；
+    index (WatchIndex) 用于记录监控模式下已完成的转换。
+    """
+    from .scheduler import ConversionScheduler
+    jobs = _jobs(args)
+    return ConversionScheduler(
+        max_workers=jobs if by_file else 1,
+        processes=by_file and jobs > 1,
+        on_event=partial(_on_job_event, args, index),
+        engine=args.engine,
+        format_mode=args.format_mode,
+        use_cache=not args.no_cache,
+        workers=1 if by_file else jobs,
+        update=getattr(args, 'update', False),
+    )
+
+
+def _on_job_event(args, index, job):
+    from .scheduler import RUNNING, DONE, FAILED, CANCELLED
+    if job.status == DONE:
+        if index is not None:
+            index.record(job.path, job.output_path)
+        print(job.output_path, flush=True)
+        if job.metrics is not None and not args.quiet:
+            _log(f"{os.path.basename(job.path)}: {job.metrics.summary()}")
+    elif job.status == FAILED:
+        _log(f"转换失败: {job.path}: {job.error}")
+    elif job.status == CANCELLED:
+        _log(f"已取消: {job.path}")
+    elif job.status == RUNNING and not args.quiet:
+        _log(job.message or f"正在转换: {job.path}")
+
+
+def _convert_many(paths, args):
+    """通过调度器转换多个文件，返回失败数量"""
+    from .scheduler import FAILED
+    paths = list(paths)
+    scheduler = _scheduler(args, by_file=len(paths) > 1)
+    jobs = {}
+    try:
+        for path in paths:
+            jobs[path] = scheduler.submit(path, origin='batch')
+        scheduler.wait()
+    except KeyboardInterrupt:
+        _log(f"已中断，取消 {scheduler.cancel_all(running=True)} 个排队任务")
+        scheduler.shutdown(wait=False)
+        return len(paths)
+    scheduler.shutdown()
+    return sum(1 for job in jobs.values() if job.status == FAILED)
+
+
+def cmd_convert(args):
+    return 1 if _convert_many(args.files, args) else 0
+
+
+def cmd_batch(args):
+    if not os.path.isdir(args.folder):
+        _log(f"文件夹不存在: {args.folder}")
+        return 2
+    from .scheduler import iter_markdown
+    return 1 if _convert_many(iter_markdown(args.folder, args.recursive), args) else 0
+
+
+def cmd_watch(args):
+    from .watcher import FolderWatcher, DEFAULT_INCLUDE, DEFAULT_EXCLUDE
+    from .watch_index import WatchIndex
+
+    if not os.path.isdir(args.folder):
+        _log(f"文件夹不存在: {args.folder}")
+        return 2
+
+    index = None if args.no_index else WatchIndex(args.folder)
+    scheduler = _scheduler(args, index=index)
+    watcher = FolderWatcher(args.folder, recursive=not args.no_recursive,
+                            include=args.include or DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE + tuple(args.exclude),
+                            quiet_period=args.quiet_period, index=index)
+    _log(f"正在监控: {args.folder} (Ctrl+C 退出)")
+    try:
+        watcher.run(lambda path: scheduler.submit(path, origin='watch'))
+    except KeyboardInterrupt:
+        watcher.stop()
+    scheduler.shutdown(cancel_pending=True, cancel_running=True)
+    if index is not None:
+        index.close()
+    return 0
+
+
+def cmd_serve(args):
+    from .daemon import serve
+
+    def ready(state):
+        address = state.get('socket') or f"{state['host']}:{state['port']}"
+        _log(f"守护进程已启动: {address} (Ctrl+C 或 client stop 退出)")
+    try:
+        return serve(args.host, args.port, args.socket, max_workers=_jobs(args), on_ready=ready)
+    except (RuntimeError, OSError) as e:
+        _log(f"无法启动守护进程: {e}")
+        return 2
+
+
+def cmd_validate(args):
+    import json
+    from .validate import iter_docx, validate_many
+
+    paths = list(iter_docx(args.paths, args.recursive))
+    if not paths:
+        _log("没有找到 docx 文件")
+        return 2
+    failed = 0
+    for report in validate_many(paths, jobs=_jobs(args), max_per_rule=args.max_per_rule):
+        if not report.ok:
+            failed += 1
+        if args.json:
+            print(json.dumps(report.to_dict(), ensure_ascii=False), flush=True)
+        elif not (args.quiet and report.ok):
+            print(report.format(), flush=True)
+    if not args.quiet and not args.json:
+        _log(f"共检查 {len(paths)} 个文件，{failed} 个不符合规范或无法检查")
+    return 1 if failed else 0
+
+
+def _client_options(args):
+    return {'engine': args.engine, 'format_mode': args.format_mode, 'use_cache': not args.no_cache}
+
+
+def cmd_client(args):
+    from . import daemon
+
+    try:
+        if args.action == 'ping':
+            response, _data = daemon.request({'op': 'stats'}, timeout=daemon.CONNECT_TIMEOUT)
+            print(f"pid {response['pid']}  运行 {response['uptime']:.0f}s  已处理 {response['requests']} 个请求  "
+                  f"排队 {response['pending']}  转换中 {response['running']}")
+        elif args.action == 'stop':
+            daemon.request({'op': 'shutdown'}, timeout=daemon.CONNECT_TIMEOUT)
+        elif args.action == 'convert':
+            return _client_convert(args, daemon)
+        elif args.action == 'render':
+            return _client_render(args, daemon)
+    except daemon.DaemonUnavailable as e:
+        _log(str(e))
+        return 3
+    return 0
+
+
+def _client_convert(args, daemon):
+    failed = 0
+    for i, path in enumerate(args.files):
+        try:
+            print(daemon.convert_path(path, **_client_options(args)), flush=True)
+        except daemon.DaemonUnavailable as e:
+            if args.no_fallback:
+                raise
+            if not args.quiet:
+                _log(f"{e}，改为本地转换")
+            failed += _convert_many(args.files[i:], args)
+            break
+        except daemon.DaemonError as e:
+            _log(f"转换失败: {path}: {e}")
+            failed += 1
+    return 1 if failed else 0
+
+
+def _client_render(args, daemon):
+    if args.input == '-':
+        md_bytes = sys.stdin.buffer.read()
+        base_dir = args.base_dir or os.getcwd()
+    else:
+        with open(args.input, 'rb') as f:
+            md_bytes = f.read()
+        base_dir = args.base_dir or os.path.dirname(os.path.abspath(args.input))
+    try:
+        data = daemon.render_bytes(md_bytes, base_dir, **_client_options(args))
+    except daemon.DaemonUnavailable as e:
+        if args.no_fallback:
+            raise
+        if not args.quiet:
+            _log(f"{e}，改为本地转换")
+        from .formatter import render_markdown
+        data, _kind = render_markdown(md_bytes, base_dir, **_client_options(args))
+    except daemon.DaemonError as e:
+        _log(f"转换失败: {e}")
+        return 1
+    if args.output == '-':
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.output, 'wb') as f:
+            f.write(data)
+        print(args.output, flush=True)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='将 Markdown 转换为符合 NJUST 规范的 Word 文档 (无参数运行时启动图形界面)')
+    sub = parser.add_subparsers(dest='command')
+
+    def add_common(p):
+        p.add_argument('-e', '--engine', choices=ENGINE_CHOICES, default='auto',
+                       help='转换引擎 (默认 auto：优先 Pandoc，失败回退内置引擎；ast：由 Pandoc 语法树一次生成文档)')
+        p.add_argument('--format-mode', choices=FORMAT_MODE_CHOICES, default='direct',
+                       help='direct：逐个 run 写入字体格式；style：格式写入样式定义，文档更小、更快')
+        p.add_argument('-j', '--jobs', type=int, default=1,
+                       help='并行进程数 (0 表示使用全部 CPU 核心)；多个文件按文件并行，只转换一个文件时按章并行')
+        p.add_argument('--no-cache', action='store_true', help='忽略转换缓存，强制重新转换')
+        p.add_argument('--pandoc-timeout', type=float, metavar='SECONDS',
+                       help='单次 Pandoc 调用的超时 (默认 300 秒，0 表示不限)；超时后 auto 引擎回退到内置引擎')
+        p.add_argument('-q', '--quiet', action='store_true', help='不输出进度信息')
+        add_metrics(p)
+
+    def add_metrics(p):
+        p.add_argument('--metrics-log', metavar='PATH',
+                       help="每次转换追加一行 JSON 记录 (阶段耗时、元素计数、引擎与回退原因)，'-' 表示标准错误")
+        p.add_argument('--profile-dir', metavar='DIR', help='每次转换在该目录写出 cProfile 与内存分配统计')
+
+    def add_update(p):
+        p.add_argument('--update', action='store_true',
+                       help='ast / internal 引擎：与已有的输出逐块比较，只重新生成修改过的部分并原地更新')
+
+    p = sub.add_parser('convert', help='转换一个或多个 Markdown 文件')
+    p.add_argument('files', nargs='+', help='Markdown 文件路径')
+    add_common(p)
+    add_update(p)
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser('batch', help='转换文件夹中的全部 Markdown 文件')
+    p.add_argument('folder', help='文件夹路径')
+    p.add_argument('-r', '--recursive', action='store_true', help='包含子文件夹')
+    add_common(p)
+    add_update(p)
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser('watch', help='监控文件夹并自动转换新增或修改的 Markdown 文件')
+    p.add_argument('folder', help='文件夹路径')
+    p.add_argument('--no-recursive', action='store_true', help='不监控子文件夹')
+    p.add_argument('--include', action='append', default=[], metavar='GLOB',
+                   help="只处理匹配的文件 (可多次指定，默认 '*.md')")
+    p.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                   help='忽略匹配的文件或目录 (可多次指定；隐藏文件、编辑器临时文件总是忽略)')
+    p.add_argument('--quiet-period', type=float, default=0.5, metavar='SECONDS',
+                   help='文件最后一次变化后等待多久再转换 (默认 0.5 秒)')
+    p.add_argument('--no-index', action='store_true',
+                   help='不使用监控索引：启动时不补转换离线期间修改的文件，也不跳过内容未变化的文件')
+    add_common(p)
+    add_update(p)
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('serve', help='启动常驻转换服务 (守护进程)，配合 client 子命令降低每次转换的延迟')
+    p.add_argument('--host', default='127.0.0.1', help='监听地址 (默认只接受本机连接)')
+    p.add_argument('--port', type=int, default=0, help='监听端口 (默认由系统分配，客户端从状态文件读取)')
+    p.add_argument('--socket', help='改用 Unix 套接字 (仅 POSIX)')
+    p.add_argument('-j', '--jobs', type=int, default=2, help='同时进行的转换数 (0 表示 CPU 核心数)')
+    add_metrics(p)
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser('client', help='通过常驻转换服务转换 (服务未运行时默认回退为本地转换)')
+    actions = p.add_subparsers(dest='action', required=True)
+    a = actions.add_parser('convert', help='转换 Markdown 文件，输出文件写在源文件旁')
+    a.add_argument('files', nargs='+', help='Markdown 文件路径')
+    add_common(a)
+    a = actions.add_parser('render', help='转换 Markdown 内容，直接得到 docx (不写源文件旁的输出)')
+    a.add_argument('input', help="Markdown 文件路径，'-' 表示标准输入")
+    a.add_argument('-o', '--output', required=True, help="输出 docx 路径，'-' 表示标准输出")
+    a.add_argument('--base-dir', help='解析相对图片路径的目录 (默认为输入文件所在目录 / 当前目录)')
+    add_common(a)
+    for action in ('convert', 'render'):
+        actions.choices[action].add_argument('--no-fallback', action='store_true',
+                                             help='服务未运行时报错退出，而不是本地转换')
+    actions.add_parser('ping', help='查看服务状态')
+    actions.add_parser('stop', help='停止服务')
+    p.set_defaults(func=cmd_client)
+
+    p = sub.add_parser('validate', help='检查 docx 是否符合 NJUST 格式规范 (页面、字体、字号、行距、对齐、三线表)')
+    p.add_argument('paths', nargs='+', help='docx 文件或文件夹路径')
+    p.add_argument('-r', '--recursive', action='store_true', help='包含子文件夹')
+    p.add_argument('-j', '--jobs', type=int, default=0, help='并行进程数 (默认 0，表示使用全部 CPU 核心)')
+    p.add_argument('--json', action='store_true', help='每个文件输出一行 JSON')
+    p.add_argument('--max-per-rule', type=int, default=20, metavar='N',
+                   help='每条规则最多列出的位置数 (默认 20，总数照常统计)')
+    p.add_argument('-q', '--quiet', action='store_true', help='只输出不符合规范的文件')
+    p.set_defaults(func=cmd_validate)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.command:
+        from .gui import run_gui
+        return run_gui()
+    # 通过环境变量传递，进程池中的子进程同样生效 (见 metrics.py)
+    if getattr(args, 'metrics_log', None):
+        os.environ['NJUST_METRICS_LOG'] = os.path.abspath(args.metrics_log) if args.metrics_log != '-' else '-'
+    if getattr(args, 'profile_dir', None):
+        os.environ['NJUST_PROFILE_DIR'] = os.path.abspath(args.profile_dir)
+    if getattr(args, 'pandoc_timeout', None) is not None:
+        os.environ['NJUST_PANDOC_TIMEOUT'] = str(args.pandoc_timeout)
+    return args.func(args)
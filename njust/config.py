@@ -0,0 +1,55 @@
+import json
+import hashlib
+from docx.shared import Pt, Mm
+
+# ==========================================
+# 配置与常量：严格映射NJUST规范
+# ==========================================
+class NJUST_Config:
+    # 纸张与页边距
+    PAGE_WIDTH = Mm(210)
+    PAGE_HEIGHT = Mm(297)
+    MARGIN_TOP = Mm(30)
+    MARGIN_BOTTOM = Mm(24)
+    MARGIN_LEFT = Mm(25)
+    MARGIN_RIGHT = Mm(25)
+    HEADER_DIST = Mm(20)
+    FOOTER_DIST = Mm(20)
+
+    # 字体名称
+    FONT_CN = "SimSun"  # 宋体
+    FONT_EN = "Times New Roman"
+    FONT_CODE = "Consolas" # 代码块专用字体
+
+    # 字号映射 (Points)
+    SIZE_TITLE_1 = Pt(15)   # 小三
+    SIZE_TITLE_2 = Pt(14)   # 四号
+    SIZE_TITLE_3 = Pt(12)   # 小四
+    SIZE_TITLE_4 = Pt(12)   # 小四
+    SIZE_BODY = Pt(12)      # 小四
+    SIZE_CAPTION = Pt(10.5) # 五号
+    SIZE_CODE = Pt(10.5)    # 五号 (代码)
+    SIZE_HEADER = Pt(9)     # 小五
+
+    # 间距规则
+    LINE_SPACING_BODY = Pt(20) # 固定值20磅
+
+    # 插图
+    IMAGE_WIDTH = Mm(160)   # 插图宽度 (版心宽度)
+    IMAGE_DPI = 300         # 按此分辨率把插图缩小到 IMAGE_WIDTH 所需的像素数 (0 表示嵌入原图)
+
+
+def config_values():
+    """以可序列化的形式导出 NJUST_Config 的全部取值 (长度统一为 EMU 整数)"""
+    values = {}
+    for name in sorted(vars(NJUST_Config)):
+        if name.isupper():
+            value = getattr(NJUST_Config, name)
+            values[name] = int(value) if isinstance(value, int) else str(value)
+    return values
+
+
+def config_fingerprint():
+    """NJUST_Config 的内容哈希，用作各类磁盘缓存的键"""
+    payload = json.dumps(config_values(), sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
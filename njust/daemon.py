@@ -0,0 +1,378 @@
+"""
+常驻转换服务 (守护进程) 与命令行瘦客户端
+
+`python main.py serve` 启动后常驻：python-docx / lxml / Pandoc 版本信息与 NJUST 模板 (reference.docx)
+只加载一次，之后每个请求都省去解释器启动与导入的开销；内容未变化时往返只需几十毫秒。
+`python main.py client ...` 只依赖标准库，通过本地套接字发送请求。
+
+协议：每条消息 = 4 字节大端长度 + UTF-8 JSON 头 + 可选二进制负载 (长度为头中的 payload_length)，
+每个连接一问一答。服务只监听 127.0.0.1 (POSIX 下也可用 Unix 套接字)，请求须携带启动时生成的令牌；
+地址与令牌写在缓存目录的 daemon/daemon.json 中，仅当前用户可读。
+"""
+import os
+import json
+import time
+import hmac
+import importlib
+import socket
+import struct
+import secrets
+import threading
+import socketserver
+
+from .paths import cache_dir
+
+DEFAULT_HOST = '127.0.0.1'
+# JSON 头与负载的大小上限，防止异常请求耗尽内存
+MAX_HEADER_BYTES = 1 << 20
+MAX_PAYLOAD_BYTES = 512 * 1024 * 1024
+CONNECT_TIMEOUT = 2.0
+
+_LENGTH = struct.Struct('>I')
+
+
+class DaemonUnavailable(ConnectionError):
+    """守护进程未运行或无法连接"""
+
+
+class DaemonError(RuntimeError):
+    """守护进程返回的错误 (例如转换失败)"""
+
+
+# ==========================================
+# 消息编解码
+# ==========================================
+def send_message(sock, header, payload=b''):
+    data = json.dumps(dict(header, payload_length=len(payload)), ensure_ascii=False).encode('utf-8')
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("连接在消息结束前关闭")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock):
+    """读取一条消息，返回 (头, 负载字节)"""
+    (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    if length > MAX_HEADER_BYTES:
+        raise ValueError(f"消息头过大: {length} 字节")
+    header = json.loads(_recv_exact(sock, length).decode('utf-8'))
+    if not isinstance(header, dict):
+        raise ValueError("消息头必须是 JSON 对象")
+    payload_length = header.pop('payload_length', 0)
+    if not isinstance(payload_length, int) or not 0 <= payload_length <= MAX_PAYLOAD_BYTES:
+        raise ValueError(f"负载长度无效: {payload_length}")
+    return header, _recv_exact(sock, payload_length) if payload_length else b''
+
+
+# ==========================================
+# 状态文件：记录地址与令牌
+# ==========================================
+def state_path():
+    return os.path.join(cache_dir('daemon'), 'daemon.json')
+
+
+def read_state():
+    """读取守护进程的地址与令牌，未运行时返回 None"""
+    try:
+        with open(state_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(state):
+    path = state_path()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _remove_state(pid):
+    """删除状态文件 (仅当它仍属于本进程，避免误删新启动的守护进程的记录)"""
+    state = read_state()
+    if state and state.get('pid') == pid:
+        try:
+            os.remove(state_path())
+        except OSError:
+            pass
+
+
+# ==========================================
+# 客户端
+# ==========================================
+def _connect(state, timeout):
+    if state.get('socket'):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise DaemonUnavailable("当前系统不支持 Unix 套接字")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = state['socket']
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        address = (state.get('host', DEFAULT_HOST), state['port'])
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(address)
+    except OSError as e:
+        sock.close()
+        raise DaemonUnavailable(f"无法连接守护进程: {e}") from e
+    sock.settimeout(timeout)
+    return sock
+
+
+def request(header, payload=b'', timeout=None, state=None):
+    """
+    向守护进程发送一个请求，返回 (响应头, 响应负载)。
+
+    未运行时抛出 DaemonUnavailable，服务端处理失败时抛出 DaemonError。
+    timeout 为等待响应的秒数 (None 表示一直等待，转换大文件可能需要较长时间)。
+    """
+    state = state or read_state()
+    if not state:
+        raise DaemonUnavailable("守护进程未运行 (先执行 python main.py serve)")
+    with _connect(state, timeout) as sock:
+        send_message(sock, dict(header, token=state.get('token', '')), payload)
+        response, data = recv_message(sock)
+    if not response.get('ok'):
+        raise DaemonError(response.get('error') or "未知错误")
+    return response, data
+
+
+def convert_path(path, timeout=None, **options):
+    """请守护进程转换文件，返回输出路径 (options: engine / format_mode / use_cache)"""
+    response, _data = request(dict(options, op='convert', path=os.path.abspath(path)), timeout=timeout)
+    return response['output_path']
+
+
+def render_bytes(md_bytes, base_dir='.', timeout=None, **options):
+    """请守护进程在内存中转换 Markdown 字节，返回 docx 字节"""
+    _response, data = request(dict(options, op='render', base_dir=os.path.abspath(base_dir)),
+                              md_bytes, timeout=timeout)
+    return data
+
+
+# ==========================================
+# 服务端
+# ==========================================
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        service = self.server.service
+        try:
+            header, payload = recv_message(self.request)
+        except (OSError, ValueError) as e:
+            print(f"Daemon: bad request: {e}")
+            return
+        if not hmac.compare_digest(str(header.pop('token', '')), service.token):
+            response, data = {'ok': False, 'error': "令牌无效"}, b''
+        else:
+            try:
+                response, data = service.dispatch(header, payload)
+            except Exception as e:
+                response, data = {'ok': False, 'error': str(e)}, b''
+        try:
+            send_message(self.request, response, data)
+        except OSError:
+            pass  # 客户端已断开
+        if response.get('ok') and header.get('op') == 'shutdown':
+            # 响应发出后再停止 (本线程不是 serve_forever 所在线程，可以直接等待其退出)
+            service.stop()
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class ConversionDaemon:
+    """
+    常驻转换服务。
+
+    支持的请求 (op)：
+      ping      存活检查
+      stats     运行时长、已处理请求数与队列状态
+      convert   转换磁盘上的文件 (path 为绝对路径)，返回 output_path；经 ConversionScheduler 排队，
+                同一文件的重复请求合并
+      render    负载为 Markdown 字节，返回 docx 字节 (不读写用户文件，base_dir 用于解析图片)
+      shutdown  停止服务
+
+    各选项组合的调度器与 render 请求共用 _slots，同时进行的转换合计不超过 max_workers。
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=0, socket_path=None, max_workers=2):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.max_workers = max(1, max_workers)
+        self.token = secrets.token_hex(16)
+        self.started_at = time.time()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._schedulers = {}  # (engine, format_mode, use_cache) -> ConversionScheduler
+        self._server = None
+
+    def warm_up(self):
+        """预先导入转换模块并生成 NJUST 模板，使第一个请求也不必等待"""
+        importlib.import_module('.formatter', __package__)  # python-docx / lxml
+        from .cache import pandoc_signature
+        from .reference_doc import reference_docx_path
+        pandoc_signature()
+        importlib.import_module('.native', __package__)  # 内置引擎
+        try:
+            reference_docx_path()
+        except Exception as e:
+            print(f"Reference docx unavailable: {e}")
+
+    # ---- 请求处理 ----
+    def dispatch(self, header, payload):
+        """处理一个请求，返回 (响应头, 响应负载)"""
+        with self._lock:
+            self.requests += 1
+        op = header.get('op')
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid()}, b''
+        if op == 'stats':
+            return self._stats(), b''
+        if op == 'convert':
+            return self._convert(header), b''
+        if op == 'render':
+            return self._render(header, payload)
+        if op == 'shutdown':
+            return {'ok': True}, b''  # 由 _Handler 在发出响应后停止服务
+        raise ValueError(f"未知请求: {op}")
+
+    @staticmethod
+    def _options(header):
+        from .formatter import ENGINES, FORMAT_MODES
+        engine = header.get('engine', 'auto')
+        format_mode = header.get('format_mode', 'direct')
+        if engine not in ENGINES:
+            raise ValueError(f"未知引擎: {engine}")
+        if format_mode not in FORMAT_MODES:
+            raise ValueError(f"未知格式模式: {format_mode}")
+        return engine, format_mode, bool(header.get('use_cache', True))
+
+    def _scheduler(self, options):
+        from .scheduler import ConversionScheduler
+        with self._lock:
+            scheduler = self._schedulers.get(options)
+            if scheduler is None:
+                engine, format_mode, use_cache = options
+                scheduler = ConversionScheduler(max_workers=self.max_workers, slots=self._slots, engine=engine,
+                                                format_mode=format_mode, use_cache=use_cache)
+                self._schedulers[options] = scheduler
+            return scheduler
+
+    def _convert(self, header):
+        from .scheduler import DONE
+        path = header.get('path')
+        if not path or not os.path.isabs(path):
+            raise ValueError("convert 请求需要 Markdown 文件的绝对路径")
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"文件不存在: {path}")
+        job = self._scheduler(self._options(header)).submit(path, origin='daemon')
+        job.wait()
+        if job.status != DONE:
+            raise DaemonError(job.error or f"任务{job.status}")
+        return {'ok': True, 'output_path': job.output_path}
+
+    def _render(self, header, payload):
+        from .formatter import render_markdown
+        engine, format_mode, use_cache = self._options(header)
+        base_dir = header.get('base_dir') or os.getcwd()
+        with self._slots:
+            data, kind = render_markdown(payload, base_dir, engine=engine, format_mode=format_mode,
+                                         use_cache=use_cache)
+        return {'ok': True, 'kind': kind}, data
+
+    def _stats(self):
+        with self._lock:
+            schedulers = list(self._schedulers.values())
+        return {
+            'ok': True,
+            'pid': os.getpid(),
+            'uptime': time.time() - self.started_at,
+            'requests': self.requests,
+            'pending': sum(s.pending_count for s in schedulers),
+            'running': sum(s.running_count for s in schedulers),
+        }
+
+    # ---- 生命周期 ----
+    def start(self):
+        """绑定地址并写入状态文件 (端口为 0 时由系统分配)"""
+        if self.socket_path:
+            if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+                raise OSError("当前系统不支持 Unix 套接字")
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self._server = _UnixServer(self.socket_path, _Handler)
+            os.chmod(self.socket_path, 0o600)
+            state = {'socket': self.socket_path}
+        else:
+            self._server = _TCPServer((self.host, self.port), _Handler)
+            self.host, self.port = self._server.server_address[:2]
+            state = {'host': self.host, 'port': self.port}
+        self._server.service = self
+        _write_state(dict(state, pid=os.getpid(), token=self.token))
+        return state
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._close()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _close(self):
+        self._server.server_close()
+        with self._lock:
+            schedulers = list(self._schedulers.values())
+        for scheduler in schedulers:
+            scheduler.shutdown(cancel_pending=True)
+        _remove_state(os.getpid())
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def serve(host=DEFAULT_HOST, port=0, socket_path=None, max_workers=2, on_ready=None):
+    """启动守护进程并阻塞，直到收到 shutdown 请求或 Ctrl+C"""
+    state = read_state()
+    if state:
+        try:
+            request({'op': 'ping'}, timeout=CONNECT_TIMEOUT, state=state)
+        except (DaemonUnavailable, DaemonError, OSError, ValueError):
+            pass  # 残留的状态文件，直接覆盖
+        else:
+            raise RuntimeError(f"守护进程已在运行 (pid {state.get('pid')})")
+
+    service = ConversionDaemon(host, port, socket_path, max_workers)
+    service.warm_up()
+    state = service.start()
+    if on_ready:
+        on_ready(state)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
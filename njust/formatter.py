@@ -0,0 +1,981 @@
+import io
+import os
+import re
+import tempfile
+import subprocess
+from functools import partial
+from docx import Document
+from docx.shared import Pt, RGBColor, Length
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn, nsmap
+from docx.oxml.xmlchemy import BaseOxmlElement
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from lxml import etree
+
+from .config import NJUST_Config
+from .images import ImagePipeline, scan_images
+from .metrics import ConversionMetrics, profiled
+from .pandoc import markdown_to_docx_bytes, PandocCancelled
+from .reference_doc import reference_docx_path
+from .styles import apply_njust_styles, set_style_size, NJUST_PARAGRAPH_STYLES
+from .tables import format_table_element, format_table_by_style, build_table_element
+from .templates import (run_template, paragraph_template, apply_run_template, apply_paragraph_template,
+                        half_points, has_picture)
+
+W_R = qn('w:r')
+W_P = qn('w:p')
+W_TBL = qn('w:tbl')
+W_VAL = qn('w:val')
+W_HYPERLINK = qn('w:hyperlink')
+PSTYLE_PATH = f"{qn('w:pPr')}/{qn('w:pStyle')}"
+
+# 正文遍历用的预编译 XPath
+PARAGRAPH_TEXT = etree.XPath('./w:r/w:t/text() | ./w:hyperlink/w:r/w:t/text()', namespaces=nsmap)
+PARAGRAPH_HAS_PICTURE = etree.XPath('boolean(./w:r/w:drawing | ./w:r/w:pict)', namespaces=nsmap)
+
+REFERENCE_TITLES = frozenset(['参考文献', 'References', '参考资料', '主要参考文献'])
+REFERENCE_ENTRY = re.compile(r'^(\[\d+\]|\d+\.)')
+
+# 格式化模式：direct = 每个 run 写入完整字体格式 (原有方式)；style = 格式写入样式定义，run 只保留差异
+FORMAT_MODES = ('direct', 'style')
+
+# ==========================================
+# 核心逻辑：格式化器
+# ==========================================
+class NJUST_Formatter:
+    def __init__(self, input_path, format_mode='direct', metrics=None):
+        if format_mode not in FORMAT_MODES:
+            raise ValueError(f"未知格式化模式: {format_mode}")
+        self.input_path = input_path
+        self.format_mode = format_mode
+        self.metrics = metrics or ConversionMetrics(input_path)  # 分阶段耗时与进度 (见 metrics.py)
+        self.doc = None 
+        self.manifest = None  # 内置 / AST 引擎输出的块清单 (见 update.py)
+
+    @property
+    def style_mode(self):
+        return self.format_mode == 'style'
+        
+    def setup_page_layout(self):
+        """配置页面几何参数"""
+        if not self.doc: return
+        
+        if not self.doc.sections:
+            self.doc.add_section()
+            
+        section = self.doc.sections[0]
+        section.page_width = NJUST_Config.PAGE_WIDTH
+        section.page_height = NJUST_Config.PAGE_HEIGHT
+        section.top_margin = NJUST_Config.MARGIN_TOP
+        section.bottom_margin = NJUST_Config.MARGIN_BOTTOM
+        section.left_margin = NJUST_Config.MARGIN_LEFT
+        section.right_margin = NJUST_Config.MARGIN_RIGHT
+        section.header_distance = NJUST_Config.HEADER_DIST
+        section.footer_distance = NJUST_Config.FOOTER_DIST
+        
+        sectPr = section._sectPr
+        titlePg = sectPr.get_or_add_titlePg()
+        titlePg.val = False 
+
+    def _apply_composite_font(self, run_or_element, size_pt, bold=False, italic=False, force_black=True, is_code=False):
+        """应用中西文复合字体 (复制预编译的 rPr 模板，见 templates.run_template)"""
+        if run_or_element is None: return
+        
+        # Run 对象同时设置加粗/斜体；直接传入的 w:r 元素保留其原有的加粗/斜体
+        is_element = isinstance(run_or_element, BaseOxmlElement)
+        r = run_or_element if is_element else run_or_element._r
+        template = run_template(half_points(size_pt), bold, italic, force_black, is_code, not is_element)
+        apply_run_template(r, template)
+
+    @staticmethod
+    def _twips(length):
+        return str(int(length.twips))
+
+    def _paragraph_template(self, kind):
+        """段落格式模板：body / image / heading1-3 / reference / code / center"""
+        t = self._twips
+        if kind == 'body':
+            return paragraph_template(jc='both', line=t(NJUST_Config.LINE_SPACING_BODY), line_rule='exact',
+                                      first_line=t(Pt(24)), left='0')
+        if kind == 'image':
+            return paragraph_template(jc='center', line=t(NJUST_Config.LINE_SPACING_BODY), line_rule='exact',
+                                      first_line='0', left='0')
+        if kind.startswith('heading'):
+            space = {1: Pt(18), 2: Pt(12)}.get(int(kind[-1]), Pt(6))
+            return paragraph_template(jc='left', line='240', line_rule='auto', first_line='0',
+                                      before=t(space), after=t(space))
+        if kind == 'reference':
+            return paragraph_template(jc='both', line=t(NJUST_Config.LINE_SPACING_BODY), line_rule='exact',
+                                      left=t(Pt(21)), hanging=t(Pt(21)), before='0', after='0')
+        if kind == 'code':
+            return paragraph_template(jc='left', line='240', line_rule='auto', first_line='0', left='0',
+                                      before=t(Pt(2)), after=t(Pt(2)), shading='F5F5F5')
+        if kind == 'center':
+            return paragraph_template(jc='center', first_line='0')
+        raise ValueError(kind)
+
+    def _format_paragraph(self, p, level=0):
+        """对普通段落应用格式"""
+        p_el = p._p
+        if level == 0: 
+            has_image = False
+            template = run_template(half_points(NJUST_Config.SIZE_BODY))
+            for r in p_el.r_lst:
+                if has_picture(r):
+                    has_image = True
+                else:
+                    apply_run_template(r, template)
+            apply_paragraph_template(p_el, self._paragraph_template('image' if has_image else 'body'))
+            return
+
+        size = {1: NJUST_Config.SIZE_TITLE_1, 2: NJUST_Config.SIZE_TITLE_2}.get(level, NJUST_Config.SIZE_TITLE_3)
+        apply_paragraph_template(p_el, self._paragraph_template(f'heading{min(level, 3)}'))
+        template = run_template(half_points(size), bold=True)
+        for r in p_el.r_lst:
+            apply_run_template(r, template)
+
+    def _format_reference_paragraph(self, p):
+        """参考文献专用格式"""
+        p_el = p._p
+        apply_paragraph_template(p_el, self._paragraph_template('reference'))
+
+        template = run_template(half_points(NJUST_Config.SIZE_BODY), set_bold_italic=False)
+        for child in p_el:
+            # 注意 w:pPr 的标签同样以 'r' 结尾，必须精确比较
+            if child.tag == W_R:
+                apply_run_template(child, template)
+            elif child.tag == W_HYPERLINK:
+                for sub_child in child:
+                    if sub_child.tag == W_R:
+                        apply_run_template(sub_child, template)
+
+    def _format_code_block(self, p):
+        """[新增] 代码块专用格式 (单倍行距 + 浅灰色背景 + Consolas)"""
+        p_el = p._p
+        apply_paragraph_template(p_el, self._paragraph_template('code'))
+        template = run_template(half_points(NJUST_Config.SIZE_CODE), is_code=True)
+        for r in p_el.r_lst:
+            apply_run_template(r, template)
+
+    def _apply_table_style(self, table):
+        """应用三线表格式 & 内容居中"""
+        format_table_element(table._tbl, self._paragraph_template('center'),
+                             run_template(half_points(NJUST_Config.SIZE_CAPTION)))
+
+    def _update_style_font(self, style_name):
+        """更新样式定义的默认字体"""
+        if style_name in self.doc.styles:
+            style = self.doc.styles[style_name]
+            if hasattr(style, '_element') and style._element is not None:
+                rPr = style._element.get_or_add_rPr()
+                fonts = rPr.get_or_add_rFonts()
+                fonts.set(qn('w:ascii'), NJUST_Config.FONT_EN)
+                fonts.set(qn('w:hAnsi'), NJUST_Config.FONT_EN)
+                fonts.set(qn('w:eastAsia'), NJUST_Config.FONT_CN)
+                fonts.set(qn('w:cs'), NJUST_Config.FONT_EN)
+                    
+    def post_process_doc(self, doc, styled=False):
+        """对已有的 Docx 对象进行全量格式清洗
+
+        styled=True 表示文档已通过 NJUST reference.docx 生成；样式模式下会先把 NJUST 样式写入文档。
+        这两种情况下标题/正文/题注/代码的格式都由样式定义承担，这里只给段落指定样式，
+        并处理样式无法表达的部分 (含图段落、表格)。
+
+        只对 w:body 做一次顺序遍历：段落样式通过预先建立的 styleId 映射判定角色，
+        表格在遍历到时就地处理，不再单独遍历 doc.tables。
+        """
+        self.doc = doc
+        self.setup_page_layout()
+        # Pandoc 原样嵌入相机照片 / 截图，按 IMAGE_DPI 缩小
+        with ImagePipeline() as pipeline:
+            pipeline.shrink_package(self.doc.part.package)
+        
+        use_styles = styled or self.style_mode
+        if use_styles:
+            if not styled:
+                apply_njust_styles(self.doc)
+            self._neutralize_highlight_styles()
+        else:
+            for style_id in ['Normal', 'Body Text', 'List Paragraph', 'Heading 1', 'Heading 2', 'Heading 3']:
+                self._update_style_font(style_id)
+        
+        roles, default_role, style_ids = self._style_roles()
+        is_reference_section = False
+        body = self.doc.element.body
+        total = len(body)
+        
+        for i, child in enumerate(body.iterchildren(W_P, W_TBL)):
+            self.metrics.advance(i, total, 'post_process')
+            if child.tag == W_TBL:
+                table = Table(child, self.doc._body)
+                if use_styles:
+                    self._apply_table_style_by_style(table)
+                else:
+                    self._apply_table_style(table)
+                continue
+
+            pStyle = child.find(PSTYLE_PATH)
+            role, style_name = roles.get(pStyle.get(W_VAL), default_role) if pStyle is not None else default_role
+            p = Paragraph(child, self.doc._body)
+            
+            # [新增] 识别 Pandoc 生成的代码块
+            if role == 'code':
+                if use_styles:
+                    self._set_style_id(child, style_ids['Source Code'])
+                else:
+                    self._format_code_block(p)
+                continue
+
+            text = ''.join(PARAGRAPH_TEXT(child)).strip()
+            clean_text = text.replace(' ', '')
+
+            # 参考文献识别
+            if clean_text in REFERENCE_TITLES:
+                is_reference_section = True
+                if use_styles:
+                    if not style_name.startswith('Heading'):
+                        self._set_style_id(child, style_ids['Heading 1'])
+                else:
+                    self._format_paragraph(p, level=1)
+                continue
+            
+            if is_reference_section and clean_text:
+                if REFERENCE_ENTRY.match(text):
+                    if use_styles:
+                        self._set_style_id(child, style_ids['Bibliography'])
+                    else:
+                        self._format_reference_paragraph(p)
+                elif use_styles:
+                    self._set_body_style(child, style_name, style_ids)
+                else:
+                    self._format_paragraph(p, level=0)
+                continue
+
+            if use_styles:
+                self._set_body_style(child, style_name, style_ids)
+            elif role == 'heading1':
+                self._format_paragraph(p, level=1)
+            elif role == 'heading2':
+                self._format_paragraph(p, level=2)
+            elif role == 'heading3':
+                self._format_paragraph(p, level=3)
+            elif role == 'caption':
+                apply_paragraph_template(child, self._paragraph_template('center'))
+                template = run_template(half_points(NJUST_Config.SIZE_CAPTION))
+                for r in child.r_lst:
+                    apply_run_template(r, template)
+            else:
+                self._format_paragraph(p, level=0)
+
+    @staticmethod
+    def _classify_style(style_name):
+        """由样式名判定段落角色：code / heading1-3 / caption / body"""
+        if 'Source Code' in style_name or 'Code' in style_name:
+            return 'code'
+        for level in (1, 2, 3):
+            if style_name.startswith(f'Heading {level}') or style_name.startswith(f'标题 {level}'):
+                return f'heading{level}'
+        if style_name.startswith('Caption') or style_name.startswith('Image Caption') or '题注' in style_name:
+            return 'caption'
+        return 'body'
+
+    def _style_roles(self):
+        """
+        一次性建立段落样式映射。
+
+        返回 (styleId → (角色, 样式名), 默认段落样式的 (角色, 样式名), 样式名 → styleId)。
+        """
+        roles = {}
+        style_ids = {}
+        default_role = ('body', 'Normal')
+        for style in self.doc.styles:
+            if style.type != WD_STYLE_TYPE.PARAGRAPH:
+                continue
+            name = style.name
+            roles[style.style_id] = (self._classify_style(name), name)
+            style_ids[name] = style.style_id
+            if style.element.default:
+                default_role = roles[style.style_id]
+        return roles, default_role, style_ids
+
+    @staticmethod
+    def _set_style_id(p_el, style_id):
+        """为段落元素指定样式 (已是该样式时不做任何修改)"""
+        pStyle = p_el.get_or_add_pPr().get_or_add_pStyle()
+        if pStyle.val != style_id:
+            pStyle.val = style_id
+
+    def _set_body_style(self, p_el, style_name, style_ids):
+        """样式模式下的普通段落：非 NJUST 样式的段落归入正文，夹带图片的段落居中"""
+        if style_name not in NJUST_PARAGRAPH_STYLES and not style_name.startswith('Heading'):
+            self._set_style_id(p_el, style_ids['Body Text'])
+        if PARAGRAPH_HAS_PICTURE(p_el):
+            apply_paragraph_template(p_el, paragraph_template(jc='center', first_line='0'))
+
+    def _apply_table_style_by_style(self, table):
+        """样式模式下的三线表：边框与垂直居中来自表格样式，单元格段落使用 Table Text 样式"""
+        format_table_by_style(table._tbl, self.doc.styles['Table'].style_id,
+                              self.doc.styles['Table Text'].style_id)
+
+    def _neutralize_highlight_styles(self):
+        """
+        Pandoc 语法高亮生成的 *Tok 字符样式统一改为黑色 (代码块不使用彩色)。
+
+        *Tok 基于 Verbatim Char (行内代码，与正文同为小四)，只出现在代码块中，字号改为代码字号。
+        """
+        for style in self.doc.styles:
+            if style.type == WD_STYLE_TYPE.CHARACTER and style.style_id.endswith('Tok'):
+                style.font.color.rgb = RGBColor(0, 0, 0)
+                set_style_size(style, NJUST_Config.SIZE_CODE)
+
+    def get_safe_output_path(self, base_path):
+        """如果文件被占用，自动生成 v1, v2, v3... 后缀"""
+        if not os.path.exists(base_path):
+            return base_path
+            
+        try:
+            with open(base_path, 'a+'): pass
+            return base_path 
+        except IOError:
+            pass 
+            
+        folder = os.path.dirname(base_path)
+        filename = os.path.basename(base_path)
+        name, ext = os.path.splitext(filename)
+        
+        counter = 1
+        while True:
+            new_name = f"{name}_v{counter}{ext}"
+            new_path = os.path.join(folder, new_name)
+            if not os.path.exists(new_path):
+                return new_path
+            try:
+                with open(new_path, 'a+'): pass
+                return new_path 
+            except IOError:
+                counter += 1 
+
+    def default_output_path(self, kind='pandoc'):
+        """输出文件的默认路径：Pandoc 引擎为 *_NJUST.docx，内置引擎为 *_NJUST_Internal.docx"""
+        output_dir = os.path.dirname(self.input_path)
+        filename = os.path.basename(self.input_path).rsplit('.', 1)[0]
+        suffix = '_NJUST_Internal' if kind == 'internal' else '_NJUST'
+        return os.path.join(output_dir, f"{filename}{suffix}.docx")
+
+    def _pandoc_docx(self, md_bytes, use_reference_doc=True):
+        """调用 Pandoc，返回 (docx 字节, 是否套用了 NJUST 模板)"""
+        output_dir = os.path.dirname(self.input_path)
+
+        # 使用按配置生成的 NJUST 模板，让 Pandoc 直接输出带样式的文档
+        extra_args = []
+        if use_reference_doc:
+            try:
+                extra_args = ['--reference-doc', reference_docx_path()]
+            except Exception as e:
+                print(f"Reference docx unavailable, falling back to full post-processing: {e}")
+
+        # Pandoc 通过 stdin/stdout 交换数据，全程不落盘临时文件
+        docx_bytes = markdown_to_docx_bytes(md_bytes, resource_dir=os.path.abspath(output_dir or '.'),
+                                            extra_args=extra_args)
+        return docx_bytes, bool(extra_args)
+
+    def convert_with_pandoc(self, use_reference_doc=True):
+        final_docx = self.get_safe_output_path(self.default_output_path('pandoc'))
+
+        with open(self.input_path, 'rb') as f:
+            md_bytes = f.read()
+
+        with self.metrics.stage('pandoc'):
+            docx_bytes, styled = self._pandoc_docx(md_bytes, use_reference_doc)
+        
+        try:
+            doc = self._load_and_format(docx_bytes, styled)
+            with self.metrics.stage('save'):
+                doc.save(final_docx)
+        except Exception as e:
+            print(f"Post-processing failed: {e}")
+            with open(final_docx, 'wb') as f:
+                f.write(docx_bytes)
+            raise e
+            
+        return final_docx
+
+    def render_with_pandoc(self, md_bytes, use_reference_doc=True):
+        """[新增] 同 convert_with_pandoc，但输入输出都在内存中 (返回 docx 字节)"""
+        with self.metrics.stage('pandoc'):
+            docx_bytes, styled = self._pandoc_docx(md_bytes, use_reference_doc)
+        doc = self._load_and_format(docx_bytes, styled)
+        buf = io.BytesIO()
+        with self.metrics.stage('save'):
+            doc.save(buf)
+        return buf.getvalue()
+
+    def _load_and_format(self, docx_bytes, styled):
+        with self.metrics.stage('load'):
+            doc = Document(io.BytesIO(docx_bytes))
+        with self.metrics.stage('post_process'):
+            self.post_process_doc(doc, styled=styled)
+        self.metrics.count_elements(doc.element.body)
+        return doc
+
+    def convert_with_ast(self, update=False):
+        """[新增] AST 引擎：Pandoc 只做解析 (-t json)，由语法树一次生成 NJUST 格式的文档 (见 pandoc_ast.py)
+
+        update=True 时与上次的输出逐块比较，只重新生成变化的块 (见 _write_output)。
+        文档含超链接或脚注时抛出 pandoc_ast.UnsupportedContent (不写出任何文件)，由调用方改用 Pandoc 引擎。
+        """
+        from .pandoc import markdown_to_ast
+        from .pandoc_ast import check_supported
+        with open(self.input_path, 'rb') as f:
+            md_bytes = f.read()
+        with self.metrics.stage('pandoc'):
+            document = markdown_to_ast(md_bytes)
+        check_supported(document)
+        return self._write_output('pandoc', partial(self.write_ast_document, document), update)
+
+    def render_with_ast(self, md_bytes):
+        """[新增] 同 convert_with_ast，但输入输出都在内存中 (返回 docx 字节)"""
+        from .pandoc import markdown_to_ast
+        from .pandoc_ast import check_supported
+        with self.metrics.stage('pandoc'):
+            document = markdown_to_ast(md_bytes)
+        check_supported(document)
+        buf = io.BytesIO()
+        self.write_ast_document(document, buf)
+        return buf.getvalue()
+
+    def write_ast_document(self, document, target, previous=None):
+        """[新增] 把 Pandoc JSON 语法树写为 docx，正文流式写入 target (路径或二进制文件对象)
+
+        previous 为上次输出的路径时，未变化的顶层块直接复用其中的元素 (见 update.py)。
+        """
+        from .pandoc_ast import AstRenderer
+        self._new_internal_document()
+        with self.metrics.stage('render'), ImagePipeline() as pipeline:
+            renderer = AstRenderer(self, pipeline)
+            self._write_blocks(renderer, renderer.keyed_blocks(document), target, 'ast', previous,
+                               prefetch=lambda: pipeline.prefetch(renderer.image_paths(document)))
+        return target
+
+    def convert_internal(self, update=False):
+        """update=True 时与上次的输出逐块比较，只重新生成变化的块 (见 _write_output)"""
+        def write(target, previous):
+            # 逐行读取、边生成边写出，Markdown 全文与正文元素树都不会整体进入内存；
+            # 先扫描一遍图片引用，让插图在后台线程中缩图，与正文生成并行
+            with open(self.input_path, 'r', encoding='utf-8') as f:
+                with self.metrics.stage('scan'):
+                    size = [0]
+                    images = scan_images(self._counted_lines(f, size), self._base_dir())
+                f.seek(0)
+                self.write_internal_document(self._tracked_lines(f, size[0]), target, images, previous)
+
+        return self._write_output('internal', write, update)
+
+    def _write_output(self, kind, write, update=False):
+        """[新增] 调用 write(目标路径, 上次的输出) 写出 kind 类型的输出文件，返回输出路径
+
+        update=True 且上次的输出存在时，先写入同目录的临时文件再替换原文件；
+        原文件被占用 (例如正在 Word 中打开) 时改存为 _v1, _v2... 文件。
+        """
+        base_path = self.default_output_path(kind)
+        if not (update and os.path.exists(base_path)):
+            output_path = self.get_safe_output_path(base_path)
+            write(output_path, None)
+            return output_path
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', prefix='~$', dir=os.path.dirname(os.path.abspath(base_path)))
+        os.close(fd)
+        try:
+            write(tmp_path, base_path)
+            try:
+                os.replace(tmp_path, base_path)
+                return base_path
+            except PermissionError:
+                output_path = self.get_safe_output_path(base_path)
+                os.replace(tmp_path, output_path)
+                return output_path
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def render_internal(self, md_text):
+        """[新增] 内置引擎转换 Markdown 文本，返回 docx 字节"""
+        buf = io.BytesIO()
+        lines = md_text.splitlines()
+        with self.metrics.stage('scan'):
+            images = scan_images(lines, self._base_dir())
+        self.write_internal_document(self._tracked_lines(lines, len(md_text)), buf, images)
+        return buf.getvalue()
+
+    @staticmethod
+    def _counted_lines(lines, counter):
+        """逐行传递，同时把字符数累加到 counter[0]"""
+        for line in lines:
+            counter[0] += len(line)
+            yield line
+
+    def _tracked_lines(self, lines, total):
+        """逐行传递，同时按已读取的字符数报告进度 (total 为全文字符数)"""
+        done = 0
+        for line in lines:
+            done += len(line)
+            self.metrics.advance(done, total)
+            yield line
+
+    def _base_dir(self):
+        return os.path.dirname(os.path.abspath(self.input_path))
+
+    def _new_internal_document(self):
+        self.doc = Document()
+        self.setup_page_layout()
+        if self.style_mode:
+            apply_njust_styles(self.doc)
+        return self.doc
+
+    def build_internal_document(self, lines):
+        """内置引擎：Markdown 文本行 -> Document (原生解析，直接生成 WordprocessingML，见 native.py)
+
+        lines 为可迭代的文本行 (文件对象或 str.splitlines())；图片相对 input_path 所在目录解析。
+        """
+        from .native import NativeRenderer
+        self._new_internal_document()
+        with ImagePipeline() as pipeline:
+            NativeRenderer(self, pipeline).render(lines)
+        return self.doc
+
+    def write_internal_document(self, lines, target, images=(), previous=None):
+        """[新增] 同 build_internal_document，但正文分批直接写入 target 的 word/document.xml (见 streaming.py)
+
+        images 为预先扫描出的图片路径，在生成正文的同时并行缩图；
+        previous 为上次输出的路径时，未变化的块直接复用其中的元素 (见 update.py)。
+        """
+        from .native import NativeRenderer
+        self._new_internal_document()
+        with self.metrics.stage('render'), ImagePipeline() as pipeline:
+            renderer = NativeRenderer(self, pipeline)
+            self._write_blocks(renderer, renderer.keyed_blocks(lines), target, 'internal', previous,
+                               prefetch=lambda: pipeline.prefetch(images))
+        return target
+
+    def _write_blocks(self, renderer, keyed_blocks, target, kind, previous=None, prefetch=None):
+        """[新增] 流式写出正文，并在文档中附带块清单 (见 update.py)
+
+        previous 中的清单可用时只生成变化的块，插图按需加载；否则先调用 prefetch 预取全部插图再整篇生成。
+        复用 / 生成的块数记录在 self.manifest。
+        """
+        from .streaming import write_streaming_docx
+        from .update import BlockManifest, PreviousOutput, manifest_context
+        context = manifest_context(kind, self.format_mode)
+        old = PreviousOutput.read(previous, context, self.doc, renderer._next_shape_id) if previous else None
+        if old is None and prefetch is not None:
+            prefetch()
+        self.manifest = BlockManifest(context)
+        self.manifest.attach(self.doc)
+        try:
+            write_streaming_docx(self.doc, self.manifest.elements(renderer.render_block, keyed_blocks, old), target,
+                                 on_batch=self.metrics.count_elements, on_document=self.manifest.on_document)
+        finally:
+            if old is not None:
+                old.close()
+        return self.manifest
+
+    def build_html_document(self, md_text):
+        """旧的内置引擎：markdown -> HTML -> BeautifulSoup -> add_*_internal (保留用于对照与基准测试)"""
+        import markdown
+        from bs4 import BeautifulSoup, NavigableString
+
+        self._new_internal_document()
+        html = markdown.markdown(md_text, extensions=['tables', 'fenced_code'])
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        for element in soup:
+            if isinstance(element, NavigableString):
+                if element.strip(): self.add_paragraph_internal(element.strip())
+                continue
+                
+            if element.name == 'h1': self.add_heading_internal(element.text, 1)
+            elif element.name == 'h2': self.add_heading_internal(element.text, 2)
+            elif element.name == 'h3': self.add_heading_internal(element.text, 3)
+            # [新增] 识别 pre 代码块
+            elif element.name == 'pre': 
+                self.add_code_block_internal(element)
+            elif element.name == 'p':
+                img = element.find('img')
+                if img and len(element.get_text(strip=True)) == 0:
+                    self.add_image_internal(img['src'], img.get('alt', ''))
+                else:
+                    self.add_rich_paragraph_internal(element)
+            elif element.name == 'table': self.add_table_internal(element)
+            elif element.name in ['ul', 'ol']: self.add_list_internal(element, element.name=='ol')
+
+        return self.doc
+
+    # ... (Add methods) ...
+    def add_heading_internal(self, text, level):
+        if self.style_mode:
+            self.doc.add_paragraph(text, style=f'Heading {min(level, 4)}')
+            return
+        p = self.doc.add_paragraph()
+        p.add_run(text)
+        self._format_paragraph(p, level=level)
+
+    def add_paragraph_internal(self, text):
+        if self.style_mode:
+            self.doc.add_paragraph(text, style='Body Text')
+            return
+        p = self.doc.add_paragraph()
+        p.add_run(text)
+        self._format_paragraph(p, level=0)
+
+    def add_code_block_internal(self, element):
+        """[新增] 内置引擎处理代码块"""
+        text = element.get_text()
+        if self.style_mode:
+            self.doc.add_paragraph(text, style='Source Code')
+            return
+        p = self.doc.add_paragraph()
+        p.add_run(text)
+        self._format_code_block(p) # 应用代码块样式
+
+    def add_rich_paragraph_internal(self, soup_element):
+        from bs4 import NavigableString, Tag
+        if self.style_mode:
+            p = self.doc.add_paragraph(style='Body Text')
+        else:
+            p = self.doc.add_paragraph()
+            self._format_paragraph(p, level=0)
+        for child in soup_element.contents:
+            if isinstance(child, NavigableString):
+                text = str(child)
+                if text: 
+                    run = p.add_run(text)
+                    if not self.style_mode:
+                        self._apply_composite_font(run, NJUST_Config.SIZE_BODY)
+            elif isinstance(child, Tag):
+                text = child.get_text()
+                is_bold = child.name in ['strong', 'b']
+                is_italic = child.name in ['em', 'i']
+                # 处理行内代码 `code`
+                is_code = child.name == 'code'
+                run = p.add_run(text)
+                if self.style_mode:
+                    # 样式模式下 run 只记录与段落样式不同的部分
+                    if is_bold: run.bold = True
+                    if is_italic: run.italic = True
+                    if is_code: run.style = self.doc.styles['Verbatim Char']
+                else:
+                    self._apply_composite_font(run, NJUST_Config.SIZE_BODY, bold=is_bold, italic=is_italic, is_code=is_code)
+
+    def add_image_internal(self, src, caption):
+        if not os.path.isabs(src):
+            src = os.path.join(os.path.dirname(self.input_path), src)
+        if os.path.exists(src):
+            try:
+                # 直接持有新段落 (doc.paragraphs[-1] 每次都重建全文段落列表，图片多时是平方复杂度)
+                figure = self.doc.add_paragraph()
+                figure.add_run().add_picture(src, width=NJUST_Config.IMAGE_WIDTH)
+                if self.style_mode:
+                    figure.style = self.doc.styles['Figure']
+                    if caption:
+                        self.doc.add_paragraph(f"图 {caption}", style='Image Caption')
+                    return
+                figure.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                if caption:
+                    p = self.doc.add_paragraph()
+                    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                    run = p.add_run(f"图 {caption}")
+                    self._apply_composite_font(run, NJUST_Config.SIZE_CAPTION)
+            except: pass
+
+    def add_table_internal(self, table_element):
+        rows = [[col.get_text(strip=True) for col in row.find_all(['td', 'th'])]
+                for row in table_element.find_all('tr')]
+        if not rows: return
+        max_cols = max(len(r) for r in rows)
+        if not max_cols: return
+
+        # 直接生成 w:tbl，避免 table.cell(i, j) 逐格重算网格
+        section = self.doc.sections[-1]
+        block_width = section.page_width - section.left_margin - section.right_margin
+        col_width = Length(block_width).twips // max_cols
+        if self.style_mode:
+            tbl = build_table_element(rows, max_cols, col_width,
+                                      table_style_id=self.doc.styles['Table'].style_id,
+                                      text_style_id=self.doc.styles['Table Text'].style_id)
+        else:
+            tbl = build_table_element(rows, max_cols, col_width,
+                                      para_template=self._paragraph_template('center'),
+                                      run_template=run_template(half_points(NJUST_Config.SIZE_CAPTION)))
+        self.doc.element.body._insert_tbl(tbl)
+
+    def add_list_internal(self, element, ordered=False):
+        for i, li in enumerate(element.find_all('li', recursive=False)):
+            text = li.get_text(strip=True)
+            prefix = f"{i+1}. " if ordered else "● "
+            if self.style_mode:
+                self.doc.add_paragraph(prefix + text, style='List Paragraph')
+                continue
+            p = self.doc.add_paragraph()
+            self._format_paragraph(p, level=0)
+            p.paragraph_format.first_line_indent = Pt(0)
+            p.paragraph_format.left_indent = Pt(21)
+            p.paragraph_format.first_line_indent = Pt(-21)
+            run = p.add_run(prefix + text)
+            self._apply_composite_font(run, NJUST_Config.SIZE_BODY)
+
+
+# ==========================================
+# 库入口：带引擎回退的单文件转换
+# ==========================================
+ENGINES = ('auto', 'pandoc', 'ast', 'internal')
+
+def convert_file(input_path, engine='auto', on_info=None, format_mode='direct', use_cache=True, workers=1,
+                 metrics=None, update=False):
+    """转换单个 Markdown 文件并返回输出路径
+
+    engine='auto' 时优先使用 Pandoc，失败后回退到内置引擎；
+    engine='ast' 时由 Pandoc 的 JSON 语法树直接生成文档 (不回退，输出文件名与 Pandoc 引擎相同)；
+    on_info 用于接收进度提示 (GUI 状态栏 / CLI 输出)；
+    format_mode 见 FORMAT_MODES；
+    use_cache=True 时 Markdown、引用图片与配置都未变化则直接复用上次的转换结果；
+    workers > 1 时 Pandoc 引擎把各章分发到多个进程并行转换；
+    metrics 为 ConversionMetrics (可选，见 metrics.py)，记录分阶段耗时、元素计数、所用引擎与回退原因；
+    update=True 时 AST / 内置引擎与上次的输出逐块比较，只重新生成变化的块并原地替换输出文件 (见 update.py)。
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"未知引擎: {engine}")
+    metrics = _new_metrics(metrics, input_path, engine, format_mode)
+    return _recorded(metrics, lambda: _convert_file(input_path, engine, on_info or (lambda msg: None),
+                                                    format_mode, use_cache, workers, metrics, update))
+
+
+def _new_metrics(metrics, path, engine, format_mode):
+    metrics = metrics or ConversionMetrics(path)
+    metrics.engine_requested = engine
+    metrics.format_mode = format_mode
+    return metrics
+
+
+def _recorded(metrics, convert):
+    """执行转换并收尾记录：设置了 NJUST_METRICS_LOG 时写出一行 JSON，设置了 NJUST_PROFILE_DIR 时同时做性能剖析"""
+    try:
+        with profiled(metrics):
+            result = convert()
+    except Exception as e:
+        metrics.finish(error=f"{type(e).__name__}: {e}")
+        metrics.write_log()
+        raise
+    # 内存中的转换 (render_markdown) 没有输出路径
+    metrics.finish(output=result if isinstance(result, str) else None)
+    metrics.write_log()
+    return result
+
+
+def _convert_file(input_path, engine, info, format_mode, use_cache, workers, metrics, update=False):
+    formatter = NJUST_Formatter(input_path, format_mode=format_mode, metrics=metrics)
+
+    cache = key = None
+    if use_cache:
+        from .cache import ConversionCache, conversion_key, restore_output
+        try:
+            cache = ConversionCache()
+            with open(input_path, 'rb') as f:
+                md_bytes = f.read()
+            base_dir = os.path.abspath(os.path.dirname(input_path) or '.')
+            key = conversion_key(md_bytes, base_dir, engine, format_mode)
+            hit = cache.lookup(key)
+        except OSError as e:
+            print(f"Conversion cache unavailable: {e}")
+            cache = None
+            hit = None
+        metrics.cache = 'hit' if hit else 'miss'
+        if hit:
+            kind, cached_path = hit
+            metrics.engine = kind
+            info("内容未变化，复用缓存的转换结果")
+            return restore_output(cached_path, formatter.get_safe_output_path(formatter.default_output_path(kind)))
+
+    output_path, kind = _convert_uncached(formatter, engine, info, use_cache=use_cache, workers=workers, update=update)
+
+    if cache is not None and not _degraded(engine, kind):
+        try:
+            # 转换期间文件又被修改时不写入缓存，避免旧键对应新内容
+            with open(input_path, 'rb') as f:
+                unchanged = f.read() == md_bytes
+            if unchanged:
+                cache.store(key, kind, output_path)
+        except OSError as e:
+            print(f"Conversion cache store failed: {e}")
+    return output_path
+
+
+def _degraded(engine, kind):
+    """
+    Pandoc 已安装，本次却因出错或超时回退到了内置引擎。
+
+    这样的结果不写入缓存：缓存键按所请求的引擎计算，写入后 Pandoc 恢复正常时仍会一直复用回退的输出。
+    未安装 Pandoc 时缓存键中的 Pandoc 版本为空，安装后键随之变化，回退结果可以照常缓存。
+    """
+    if engine == 'internal' or kind != 'internal':
+        return False
+    from .cache import pandoc_signature
+    return pandoc_signature() is not None
+
+
+def render_markdown(md_bytes, base_dir='.', engine='auto', on_info=None, format_mode='direct', use_cache=True,
+                    metrics=None):
+    """[新增] 在内存中转换 Markdown 字节，返回 (docx 字节, 实际使用的引擎)
+
+    不读写源文件与输出文件 (守护进程 / 标准输入输出使用)；
+    相对路径的图片按 base_dir 解析，缓存键与 convert_file 相同。
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"未知引擎: {engine}")
+    base_dir = os.path.abspath(base_dir)
+    metrics = _new_metrics(metrics, os.path.join(base_dir, 'stdin.md'), engine, format_mode)
+    return _recorded(metrics, lambda: _render_markdown(md_bytes, base_dir, engine, on_info or (lambda msg: None),
+                                                       format_mode, use_cache, metrics))
+
+
+def _render_markdown(md_bytes, base_dir, engine, info, format_mode, use_cache, metrics):
+    formatter = NJUST_Formatter(metrics.path, format_mode=format_mode, metrics=metrics)
+
+    cache = key = None
+    if use_cache:
+        from .cache import ConversionCache, conversion_key
+        try:
+            cache = ConversionCache()
+            key = conversion_key(md_bytes, base_dir, engine, format_mode)
+            hit = cache.lookup(key)
+            metrics.cache = 'hit' if hit else 'miss'
+            if hit:
+                kind, cached_path = hit
+                with open(cached_path, 'rb') as f:
+                    data = f.read()
+                metrics.engine = kind
+                info("内容未变化，复用缓存的转换结果")
+                return data, kind
+        except OSError as e:
+            print(f"Conversion cache unavailable: {e}")
+            cache = None
+
+    data = kind = None
+    if engine == 'ast':
+        from .pandoc_ast import UnsupportedContent
+        try:
+            info("正在使用 Pandoc 语法树引擎...")
+            metrics.plan('ast')
+            metrics.engine = 'ast'
+            data, kind = formatter.render_with_ast(md_bytes), 'pandoc'
+        except UnsupportedContent as e:
+            engine = _ast_fallback(metrics, info, e)
+    if data is None and engine in ('auto', 'pandoc'):
+        try:
+            info("正在尝试使用 Pandoc 引擎...")
+            metrics.plan('pandoc')
+            metrics.engine = 'pandoc'
+            data, kind = formatter.render_with_pandoc(md_bytes), 'pandoc'
+        except PandocCancelled:
+            raise
+        except FileNotFoundError as e:
+            if engine == 'pandoc': raise
+            metrics.fallback('pandoc', f"未检测到 Pandoc: {e}")
+            info("未检测到 Pandoc，切换至内置引擎...")
+        except Exception as e:
+            if engine == 'pandoc': raise
+            print(f"Pandoc error: {e}")
+            metrics.fallback('pandoc', f"{type(e).__name__}: {e}")
+            info("Pandoc 转换出错，切换至内置引擎...")
+    if data is None:
+        info("正在使用内置引擎解析...")
+        metrics.plan('internal')
+        metrics.engine = 'internal'
+        data, kind = formatter.render_internal(md_bytes.decode('utf-8')), 'internal'
+
+    if cache is not None and not _degraded(engine, kind):
+        try:
+            cache.store_bytes(key, kind, data)
+        except OSError as e:
+            print(f"Conversion cache store failed: {e}")
+    return data, kind
+
+
+def _convert_uncached(formatter, engine, info, use_cache=False, workers=1, update=False):
+    """按引擎策略执行转换，返回 (输出路径, 实际使用的引擎)
+
+    启用缓存或多进程时，Pandoc 引擎按一级标题分章转换：只重新转换内容变化的章节，
+    需要转换的章节按 workers 并行。update 只对 AST / 内置引擎生效 (Pandoc 引擎的输出没有块清单)。
+    """
+    metrics = formatter.metrics
+    if engine == 'ast':
+        from .pandoc_ast import UnsupportedContent
+        try:
+            info("正在使用 Pandoc 语法树引擎...")
+            metrics.plan('ast')
+            metrics.engine = 'ast'
+            output_path = formatter.convert_with_ast(update=update)
+            _report_update(formatter, info)
+            return output_path, 'pandoc'
+        except UnsupportedContent as e:
+            engine = _ast_fallback(metrics, info, e)
+    if engine in ('auto', 'pandoc'):
+        try:
+            info("正在尝试使用 Pandoc 引擎...")
+            metrics.engine = 'pandoc'
+            output_path = None
+            if use_cache or workers > 1:
+                metrics.plan('chapters')
+                output_path = _convert_chapters(formatter, info, use_cache, workers)
+            if output_path is None:
+                metrics.plan('pandoc')
+                output_path = formatter.convert_with_pandoc()
+            return output_path, 'pandoc'
+        except (PermissionError, PandocCancelled):
+            raise
+        except FileNotFoundError as e:
+            if engine == 'pandoc': raise
+            metrics.fallback('pandoc', f"未检测到 Pandoc: {e}")
+            info("未检测到 Pandoc，切换至内置引擎...")
+        except Exception as e:
+            if engine == 'pandoc': raise
+            print(f"Pandoc error: {e}")
+            metrics.fallback('pandoc', f"{type(e).__name__}: {e}")
+            info("Pandoc 转换出错，切换至内置引擎...")
+
+    info("正在使用内置引擎解析...")
+    metrics.plan('internal')
+    metrics.engine = 'internal'
+    output_path = formatter.convert_internal(update=update)
+    _report_update(formatter, info)
+    return output_path, 'internal'
+
+
+def _ast_fallback(metrics, info, error):
+    """AST 引擎无法保留文档内容 (超链接、脚注) 时改用 Pandoc 引擎，返回新的引擎名"""
+    metrics.fallback('ast', str(error))
+    info(f"{error}，切换至 Pandoc 引擎...")
+    return 'pandoc'
+
+
+def _report_update(formatter, info):
+    """增量更新时报告复用 / 重新生成的块数 (同时计入 metrics.counts)"""
+    manifest = formatter.manifest
+    if manifest is None or not manifest.updated:
+        return
+    formatter.metrics.counts.update(blocks_reused=manifest.reused, blocks_rendered=manifest.rendered)
+    info(f"增量更新：复用 {manifest.reused} 块，重新生成 {manifest.rendered} 块")
+
+
+def _convert_chapters(formatter, info, use_cache, workers):
+    """按章转换；不足两章或拼接失败时返回 None，由调用方整篇转换"""
+    from .chapters import convert_incremental
+    try:
+        return convert_incremental(formatter, on_info=info, workers=workers, use_cache=use_cache)
+    except (PermissionError, FileNotFoundError, PandocCancelled, subprocess.TimeoutExpired):
+        # 超时直接交给调用方回退，不再整篇重试 (否则卡住的 Pandoc 要等两倍的超时)
+        raise
+    except Exception as e:
+        print(f"Incremental conversion failed, converting the whole file: {e}")
+        formatter.metrics.fallback('chapters', f"{type(e).__name__}: {e}")
+        return None
@@ -0,0 +1,315 @@
+import sys
+import os
+import subprocess
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QVBoxLayout, 
+                             QWidget, QProgressBar, QMessageBox, QPushButton, QFileDialog)
+from PyQt6.QtCore import Qt, QObject, QThread, pyqtSignal
+from PyQt6.QtGui import QDragEnterEvent, QDropEvent, QCursor
+
+from .scheduler import ConversionScheduler, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+from .watcher import FolderWatcher, HAS_WATCHDOG
+from .watch_index import WatchIndex
+
+# 同时进行的转换数 (Pandoc 在独立进程中运行，2 个即可让 CPU 保持忙碌)
+GUI_MAX_WORKERS = 2
+
+# ==========================================
+# 文件夹监控线程 (使用 watchdog)
+# ==========================================
+class WatchdogWorker(QThread):
+    """
+    [改进] 使用 Watchdog 实现的高效文件监控器
+    """
+    file_detected_signal = pyqtSignal(str)
+
+    def __init__(self, folder_path, index=None):
+        super().__init__()
+        self.folder_path = folder_path
+        self.watcher = FolderWatcher(folder_path, index=index)
+
+    def run(self):
+        self.watcher.run(self.file_detected_signal.emit)
+
+    def stop(self):
+        self.watcher.stop()
+        self.requestInterruption()
+
+# ==========================================
+# 转换调度器 -> Qt 信号
+# ==========================================
+class SchedulerBridge(QObject):
+    """调度器的回调在工作线程中触发，经由信号转到主线程更新界面 (同时携带触发时的状态快照)"""
+    job_event = pyqtSignal(object, str, str)
+
+    def emit_job(self, job):
+        self.job_event.emit(job, job.status, job.message)
+
+# ==========================================
+# 主窗口
+# ==========================================
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("NJUST 论文格式转换工具 (自动监控版)")
+        self.resize(600, 600)
+        self.setAcceptDrops(True)
+        self.watcher_thread = None
+        self.bridge = SchedulerBridge()
+        self.bridge.job_event.connect(self.on_job_event)
+        self.scheduler = ConversionScheduler(max_workers=GUI_MAX_WORKERS, on_event=self.bridge.emit_job,
+                                             on_progress=self.bridge.emit_job)
+        self.batch_total = 0
+        self.batch_finished = 0
+        self.batch_failed = 0
+        self._active = {}  # 执行中的任务 -> 进度 (0..1)
+        self.watch_index = None  # 当前监控文件夹的索引 (重启后只补转换离线期间修改的文件)
+        self.init_ui()
+
+    def init_ui(self):
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        layout.setSpacing(15)
+        layout.setContentsMargins(20, 20, 20, 20)
+        
+        # 拖拽区域
+        self.label = QLabel("模式一：将 Markdown (.md) 文件拖入此处")
+        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.label.setStyleSheet("""
+            QLabel {
+                border: 3px dashed #aaa;
+                border-radius: 10px;
+                font-size: 16px;
+                color: #555;
+                background-color: #f9f9f9;
+                padding: 30px;
+            }
+        """)
+        layout.addWidget(self.label)
+        
+        # 监控按钮
+        self.monitor_btn = QPushButton("模式二：选择并监控文件夹 (自动转换)")
+        self.monitor_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.monitor_btn.setMinimumHeight(50)
+        self.monitor_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #0078D7;
+                color: white;
+                font-size: 14px;
+                font-weight: bold;
+                border-radius: 5px;
+                border: none;
+            }
+            QPushButton:hover { background-color: #005A9E; }
+            QPushButton:pressed { background-color: #004578; }
+        """)
+        self.monitor_btn.clicked.connect(self.select_folder)
+        layout.addWidget(self.monitor_btn)
+        
+        # [新增] 批量转换按钮
+        self.batch_btn = QPushButton("模式三：批量转换文件夹中的全部 .md 文件")
+        self.batch_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.batch_btn.setMinimumHeight(36)
+        self.batch_btn.clicked.connect(self.select_batch_folder)
+        layout.addWidget(self.batch_btn)
+
+        self.monitor_label = QLabel("当前未监控任何文件夹")
+        self.monitor_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.monitor_label.setStyleSheet("color: #666; font-size: 12px;")
+        layout.addWidget(self.monitor_label)
+
+        self.status_label = QLabel("就绪")
+        self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.status_label.setStyleSheet("font-size: 13px; color: #333;")
+        layout.addWidget(self.status_label)
+
+        self.progress = QProgressBar()
+        self.progress.setVisible(False)
+        self.progress.setStyleSheet("""
+            QProgressBar { height: 6px; border-radius: 3px; background: #eee; }
+            QProgressBar::chunk { background-color: #0078D7; border-radius: 3px; }
+        """)
+        layout.addWidget(self.progress)
+
+        self.cancel_btn = QPushButton("取消排队中的任务")
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self.cancel_pending)
+        layout.addWidget(self.cancel_btn)
+        
+        # 底部信息栏布局
+        bottom_layout = QVBoxLayout()
+        bottom_layout.setSpacing(5)
+
+        # 依赖检测提示
+        ver_info = "V3.2 | 代码块识别 | "
+        ver_info += "Watchdog 监控中" if HAS_WATCHDOG else "Watchdog 未安装 (轮询模式)"
+        version_label = QLabel(ver_info)
+        version_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+        version_label.setStyleSheet("color: #999; font-size: 10px;")
+        bottom_layout.addWidget(version_label)
+
+        # =========================================
+        # [新增] 作者信息与引导链接
+        # =========================================
+        # 请修改下方的 href 和 文本内容
+        author_text = (
+            'Created by <a href="https://github.com/jimmyshuixin/MDtoWORD-for-NJUST" style="color:#0078D7; text-decoration:none;">'
+            '[JimmyShuixin]</a> | '
+            '<a href="https://github.com/jimmyshuixin/MDtoWORD-for-NJUST/blob/main/README.md" style="color:#0078D7; text-decoration:none;">'
+            '查看使用教程 & 帮助</a>'
+        )
+        self.author_label = QLabel(author_text)
+        self.author_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.author_label.setOpenExternalLinks(True) # 允许点击跳转浏览器
+        self.author_label.setStyleSheet("QLabel { color: #666; font-size: 11px; margin-top: 5px; }")
+        
+        bottom_layout.addWidget(self.author_label)
+        layout.addLayout(bottom_layout)
+
+    def select_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "选择要监控的 Markdown 文件夹")
+        if folder:
+            if self.watcher_thread and self.watcher_thread.isRunning():
+                self.watcher_thread.stop()
+                self.watcher_thread.wait()
+            
+            self.monitor_label.setText(f"正在监控: {folder}\n(包括子文件夹，将自动转换新增或修改的 .md 文件)")
+            self.monitor_label.setStyleSheet("color: #2E7D32; font-weight: bold;")
+            
+            # 启动新监控线程 (WatchdogWorker)
+            self.watch_index = WatchIndex(folder)
+            self.watcher_thread = WatchdogWorker(folder, self.watch_index)
+            self.watcher_thread.file_detected_signal.connect(self.start_conversion_silent)
+            self.watcher_thread.start()
+            
+            msg = f"已开始监控文件夹：\n{folder}\n\n"
+            if not HAS_WATCHDOG:
+                msg += "⚠️ 提示：未检测到 watchdog 库，当前使用轮询模式 (Polling)。\n建议安装: pip install watchdog 以获得更好体验。"
+            
+            QMessageBox.information(self, "监控已启动", msg)
+
+    def select_batch_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "选择要批量转换的 Markdown 文件夹")
+        if folder:
+            jobs = self.scheduler.submit_folder(folder)
+            if not jobs:
+                self.status_label.setText("该文件夹中没有 .md 文件")
+
+    def dragEnterEvent(self, event: QDragEnterEvent):
+        if event.mimeData().hasUrls():
+            urls = event.mimeData().urls()
+            if any(url.toLocalFile().lower().endswith('.md') for url in urls):
+                event.accept()
+                self.label.setStyleSheet("QLabel { border: 3px dashed #4CAF50; background-color: #E8F5E9; color: #2E7D32; font-size: 16px; padding: 30px; }")
+                self.label.setText("释放以开始转换")
+            else:
+                event.ignore()
+        else:
+            event.ignore()
+
+    def dragLeaveEvent(self, event):
+        self.label.setText("模式一：将 Markdown (.md) 文件拖入此处")
+        self.label.setStyleSheet("QLabel { border: 3px dashed #aaa; background-color: #f9f9f9; font-size: 16px; color: #555; padding: 30px; }")
+
+    def dropEvent(self, event: QDropEvent):
+        for url in event.mimeData().urls():
+            file_path = url.toLocalFile()
+            if file_path.lower().endswith('.md'):
+                self.start_conversion(file_path)
+
+    def start_conversion(self, file_path):
+        self.label.setText(f"处理中：{os.path.basename(file_path)}")
+        self.scheduler.submit(file_path, origin='drop')
+
+    def start_conversion_silent(self, file_path):
+        self.status_label.setText(f"检测到新文件：{os.path.basename(file_path)}")
+        self.scheduler.submit(file_path, origin='watch')
+
+    def cancel_pending(self):
+        count = self.scheduler.cancel_all()
+        self.status_label.setText(f"已取消 {count} 个排队任务")
+
+    def on_job_event(self, job, status, message):
+        """调度器任务状态变化 (主线程)"""
+        name = os.path.basename(job.path)
+        if status == QUEUED:
+            self.batch_total += 1
+        elif status == RUNNING:
+            self._active[job] = job.progress
+            if job.stage:
+                message = f"{message or f'正在转换：{name}'} ({job.stage} {job.progress:.0%})"
+            self.status_label.setText(message or f"正在转换：{name}")
+        else:
+            self._active.pop(job, None)
+            self.batch_finished += 1
+            if status == DONE and job.origin == 'watch' and self.watch_index is not None:
+                self.watch_index.record(job.path, job.output_path)
+            if status == FAILED:
+                self.batch_failed += 1
+            if job.origin != 'batch':
+                if status == DONE:
+                    self.on_success(job.output_path, job.metrics.summary() if job.metrics else None)
+                elif status == FAILED:
+                    self.on_error(f"{job.error}\n{job.traceback}")
+            elif status != CANCELLED:
+                self.status_label.setText(f"{'已生成' if status == DONE else '失败'}：{name}")
+        self._update_progress()
+
+    def _update_progress(self):
+        pending = self.scheduler.pending_count
+        running = self.scheduler.running_count
+        self.cancel_btn.setVisible(pending > 0)
+        if not pending and not running:
+            if self.batch_total > 1:
+                self.label.setText(f"批量转换完成：成功 {self.batch_finished - self.batch_failed}，"
+                                   f"失败 {self.batch_failed}")
+            self.progress.setVisible(False)
+            self.batch_total = self.batch_finished = self.batch_failed = 0
+            self._active.clear()
+            return
+        self.progress.setVisible(True)
+        # 已完成的任务各计 1，执行中的任务按其阶段进度计入
+        done = self.batch_finished + sum(self._active.values())
+        self.progress.setRange(0, 1000)
+        self.progress.setValue(int(1000 * done / max(1, self.batch_total)))
+        if self.batch_total > 1:
+            self.label.setText(f"队列：已完成 {self.batch_finished}/{self.batch_total}，"
+                               f"进行中 {running}，等待 {pending}")
+
+    def on_success(self, output_path, summary=None):
+        self.progress.setVisible(False)
+        self.label.setText("转换成功！")
+        text = f"已生成: {os.path.basename(output_path)}"
+        self.status_label.setText(f"{text}\n{summary}" if summary else text)
+        self.label.setStyleSheet("QLabel { border: 3px solid #4CAF50; color: #4CAF50; font-size: 16px; padding: 30px; }")
+        
+        try:
+            if sys.platform == 'win32':
+                os.startfile(output_path)
+            elif sys.platform == 'darwin':
+                subprocess.call(('open', output_path))
+            else:
+                subprocess.call(('xdg-open', output_path))
+        except:
+            pass
+
+    def on_error(self, err_msg):
+        self.progress.setVisible(False)
+        self.label.setText("转换出错")
+        self.label.setStyleSheet("QLabel { border: 3px solid #F44336; color: #F44336; font-size: 16px; padding: 30px; }")
+        self.status_label.setText(f"错误: {err_msg[:50]}...")
+
+    def closeEvent(self, event):
+        if self.watcher_thread:
+            self.watcher_thread.stop()
+            self.watcher_thread.wait()
+        self.scheduler.shutdown(cancel_pending=True, cancel_running=True)
+        event.accept()
+
+
+def run_gui(argv=None):
+    """启动图形界面"""
+    app = QApplication(argv if argv is not None else sys.argv)
+    window = MainWindow()
+    window.show()
+    return app.exec()
@@ -0,0 +1,219 @@
+import io
+import os
+import hashlib
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+from docx.parts.image import ImagePart
+from docx.shared import Length
+
+from .cache import referenced_images, evict_lru
+from .config import NJUST_Config
+from .paths import cache_dir
+
+# ==========================================
+# 插图处理：预先解析、并行缩图、按内容去重与磁盘缓存
+# ==========================================
+# 相机照片 / 高分屏截图往往有数千像素宽，而插图最终只印 160 mm 宽：
+# 按 IMAGE_DPI 缩小到所需像素数后再嵌入，docx 体积与 Word 打开速度都会明显改善。
+# 缩图结果按 (原图内容哈希, 目标像素) 缓存在磁盘上，内容相同的图片 (无论文件名) 只处理一次。
+
+# 仅探测 Pillow 是否可用；缺失时不缩图，只做去重
+HAS_PIL = importlib.util.find_spec("PIL") is not None
+
+# 缩图逻辑变化时递增，使旧缓存失效
+IMAGE_CACHE_REVISION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# 只缩放这两种格式 (保持原格式)；GIF 可能是动图，BMP / TIFF 极少见，原样嵌入
+_RESIZABLE = ('PNG', 'JPEG')
+# 磁盘缓存条目：缩小后的图片 / 无需缩小的标记 (空文件)
+_CACHE_SUFFIXES = ('.img', '.orig')
+
+
+def target_pixels(width=None, dpi=None):
+    """以 dpi 打印 width 宽度所需的像素数；dpi 为 0 时返回 0 (不缩图)"""
+    width = NJUST_Config.IMAGE_WIDTH if width is None else width
+    dpi = NJUST_Config.IMAGE_DPI if dpi is None else dpi
+    return round(Length(width).inches * dpi) if dpi else 0
+
+
+def scan_images(lines, base_dir):
+    """逐行扫描 Markdown 中引用的本地图片 (绝对路径，按出现顺序去重)"""
+    paths = {}
+    for line in lines:
+        if '![' in line or '<img' in line or '<IMG' in line:
+            for path in referenced_images(line, base_dir):
+                paths.setdefault(path)
+    return list(paths)
+
+
+def downscale(data, max_px, dpi):
+    """
+    把 PNG / JPEG 缩小到宽度不超过 max_px (保持格式、宽高比、EXIF 与 ICC 信息)。
+
+    无需缩小、格式不支持或缩小后反而更大时返回 None。
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as im:
+        fmt = im.format
+        if fmt not in _RESIZABLE or im.width <= max_px:
+            return None
+        size = (max_px, max(1, round(im.height * max_px / im.width)))
+        info = im.info
+        if fmt == 'JPEG':
+            im.draft(im.mode, size)  # JPEG 解码时直接按 1/2、1/4、1/8 缩小
+        if im.mode in ('1', 'P'):
+            im = im.convert('RGBA' if 'transparency' in info else 'RGB')
+        elif im.mode not in ('L', 'LA', 'RGB', 'RGBA', 'CMYK'):
+            return None
+        resized = im.resize(size, Image.LANCZOS)
+
+    out = io.BytesIO()
+    options = {'dpi': (dpi, dpi)}
+    if info.get('icc_profile'):
+        options['icc_profile'] = info['icc_profile']
+    if fmt == 'JPEG':
+        options['quality'] = 90
+        if info.get('exif'):
+            options['exif'] = info['exif']
+    resized.save(out, fmt, **options)
+    result = out.getvalue()
+    return result if len(result) < len(data) else None
+
+
+class ImagePipeline:
+    """
+    插图处理流水线：submit / prefetch 把图片交给线程池 (Pillow 解码与缩放时释放 GIL)，
+    get 取回要嵌入的字节。
+
+    处理结果按原图内容哈希记忆，同一内容只解码一次；磁盘缓存条目为 <哈希>-<像素>-r<版本>.img，
+    无需缩小的图片记录为空的 .orig 文件，下次运行直接嵌入原图。
+    """
+
+    def __init__(self, dpi=None, width=None, max_workers=DEFAULT_WORKERS, folder=None,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.dpi = NJUST_Config.IMAGE_DPI if dpi is None else dpi
+        self.max_px = target_pixels(width, self.dpi) if HAS_PIL else 0
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='njust-image')
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._digest_locks = {}
+        self._results = {}
+        self._stored = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        if self._stored:
+            evict_lru(self._cache_folder(), self.max_bytes, _CACHE_SUFFIXES)
+
+    # ---- 文件 ----
+    def submit(self, path):
+        with self._lock:
+            future = self._futures.get(path)
+            if future is None:
+                future = self._futures[path] = self._pool.submit(self._load, path)
+        return future
+
+    def prefetch(self, paths):
+        for path in paths:
+            self.submit(path)
+
+    def get(self, path):
+        """path 对应的嵌入字节 (缩小后的图片或原图)"""
+        return self.submit(path).result()
+
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            return self.process(f.read())
+
+    # ---- 字节 ----
+    def process(self, data):
+        if not self.max_px:
+            return data
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            lock = self._digest_locks.setdefault(digest, threading.Lock())
+        with lock:
+            result = self._results.get(digest)
+            if result is None:
+                result = self._results[digest] = self._cached(digest, data)
+        return result
+
+    def _cache_folder(self):
+        return self.folder or cache_dir('images')
+
+    def _cached(self, digest, data):
+        stem = os.path.join(self._cache_folder(), f"{digest}-{self.max_px}-r{IMAGE_CACHE_REVISION}")
+        for suffix in _CACHE_SUFFIXES:
+            try:
+                with open(stem + suffix, 'rb') as f:
+                    cached = f.read()
+                os.utime(stem + suffix)
+            except OSError:
+                continue
+            return cached or data
+
+        try:
+            small = downscale(data, self.max_px, self.dpi)
+        except Exception as e:
+            print(f"Image not resized: {e}")
+            return data
+        path = stem + ('.img' if small else '.orig')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(small or b'')
+            os.replace(tmp_path, path)
+            self._stored = True
+        except OSError:
+            pass
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return small or data
+
+    # ---- 已生成的文档 ----
+    def shrink_package(self, package):
+        """
+        缩小 docx 包中的图片部件 (格式不变，显示尺寸由文档中的 extent 决定)，
+        并把指向相同内容图片的关系合并到同一个部件。返回被替换或合并掉的部件数。
+        """
+        parts = [part for part in package.parts if isinstance(part, ImagePart)]
+        if not parts:
+            return 0
+        changed = 0
+        if self.max_px:
+            for part, blob in zip(parts, self._pool.map(self.process, [part.blob for part in parts])):
+                if blob != part.blob:
+                    part._blob = blob
+                    part._image = None
+                    changed += 1
+        return changed + dedupe_image_parts(package)
+
+
+def dedupe_image_parts(package):
+    """内容相同的图片部件只保留第一个，其余关系改指向它 (不再被引用的部件保存时自然略去)"""
+    canonical = {}
+    merged = set()
+    for part in list(package.parts):
+        for rel in part.rels.values():
+            if rel.is_external or not isinstance(rel.target_part, ImagePart):
+                continue
+            target = rel.target_part
+            first = canonical.setdefault(target.sha1, target)
+            if first is not target:
+                rel._target = first
+                merged.add(target.partname)
+    return len(merged)
@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# ==========================================
+# 转换过程记录：分阶段耗时、元素计数、引擎与回退原因、进度
+# ==========================================
+# 每次转换对应一个 ConversionMetrics，由 convert_file / render_markdown 创建并交给 NJUST_Formatter。
+# 设置环境变量 NJUST_METRICS_LOG (文件路径，'-' 为标准错误) 时每次转换追加一行 JSON；
+# 设置 NJUST_PROFILE_DIR 时每次转换额外在该目录写出 cProfile 统计 (.prof) 与 tracemalloc 内存分配排行 (.mem.txt)。
+# 本模块只依赖标准库 (命令行与 GUI 启动时可直接导入)。
+
+METRICS_LOG_ENV = 'NJUST_METRICS_LOG'
+PROFILE_DIR_ENV = 'NJUST_PROFILE_DIR'
+
+# 各转换路径的阶段与进度权重 (流式引擎的 render 包含写出 docx)
+STAGE_PLANS = {
+    'pandoc': (('pandoc', 0.40), ('load', 0.05), ('post_process', 0.45), ('save', 0.10)),
+    'chapters': (('chapters', 0.85), ('splice', 0.10), ('save', 0.05)),
+    'ast': (('pandoc', 0.35), ('render', 0.65)),
+    'internal': (('scan', 0.05), ('render', 0.95)),
+}
+
+# 统计的正文元素 (含表格单元格中的段落)
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_COUNTS = {
+    _W + 'p': 'paragraphs',
+    _W + 'r': 'runs',
+    _W + 'tbl': 'tables',
+    _W + 'drawing': 'images',
+    '{http://schemas.openxmlformats.org/officeDocument/2006/math}oMath': 'formulas',
+}
+_log_lock = threading.Lock()
+
+
+def peak_rss():
+    """本进程的峰值常驻内存 (字节)；平台不支持时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class ConversionMetrics:
+    """
+    一次转换的记录。
+
+    stage(name) 计时一个阶段，advance(done, total) 报告阶段内进度；
+    on_progress(进度 0..1, 阶段名) 在进度变化 (按 1% 取整) 时调用，调用线程即转换线程。
+    """
+
+    def __init__(self, path=None, on_progress=None):
+        self.path = path
+        self.on_progress = on_progress
+        self.engine_requested = None
+        self.engine = None
+        self.format_mode = None
+        self.cache = None
+        self.fallbacks = []
+        self.stages = []
+        self.counts = {}
+        self.output = None
+        self.error = None
+        self.traced_peak = None
+        self.started = time.time()
+        self.seconds = None
+        self._clock = time.perf_counter()
+        self._plan = {}
+        self._done = 0.0
+        self._base = 0.0
+        self._weight = 0.0
+        self._stage = None
+        self._reported = -1
+
+    # ---- 阶段与进度 ----
+    def plan(self, name):
+        """切换到 STAGE_PLANS 中的一条路径 (回退到其他引擎时，已有进度保留，剩余部分按新路径分配)"""
+        self._base = self.progress
+        self._plan = dict(STAGE_PLANS.get(name, ()))
+        self._done = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        """计时一个阶段；未调用 plan() 时 (例如直接调用 NJUST_Formatter.convert_*) 只计时，进度不变"""
+        start = time.perf_counter()
+        self._stage = name
+        self._weight = self._plan.get(name, 0.0)
+        self._report(0.0)
+        try:
+            yield self
+        finally:
+            self.stages.append({'stage': name, 'start': round(start - self._clock, 4),
+                                'seconds': round(time.perf_counter() - start, 4)})
+            self._done += self._weight
+            self._weight = 0.0
+            self._report(0.0)
+
+    def advance(self, done, total, stage=None):
+        """阶段内进度；给出 stage 时只在该阶段中生效 (例如按章转换时各章的后处理不单独报告进度)"""
+        if total and (stage is None or stage == self._stage):
+            self._report(min(1.0, done / total))
+
+    @property
+    def progress(self):
+        return self._base + (1 - self._base) * min(1.0, self._done)
+
+    def _report(self, fraction):
+        if self.on_progress is None:
+            return
+        value = self._base + (1 - self._base) * min(1.0, self._done + self._weight * fraction)
+        percent = int(value * 100)
+        if percent != self._reported:
+            self._reported = percent
+            try:
+                self.on_progress(value, self._stage)
+            except Exception as e:
+                print(f"Progress handler failed: {e}")
+
+    # ---- 内容 ----
+    def count_elements(self, element):
+        """累计 element 之下的段落 / run / 表格 / 图片 / 公式数 (流式写出时每批调用一次)"""
+        counts = self.counts
+        for el in element.iter(*_COUNTS):
+            name = _COUNTS[el.tag]
+            counts[name] = counts.get(name, 0) + 1
+
+    def fallback(self, engine, reason):
+        self.fallbacks.append({'engine': engine, 'reason': reason})
+
+    # ---- 结果 ----
+    def finish(self, output=None, error=None):
+        self.output = output
+        self.error = error
+        self.seconds = round(time.perf_counter() - self._clock, 4)
+
+    def to_dict(self):
+        return {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'path': self.path,
+            'output': self.output,
+            'engine_requested': self.engine_requested,
+            'engine': self.engine,
+            'format_mode': self.format_mode,
+            'cache': self.cache,
+            'fallbacks': self.fallbacks,
+            'seconds': self.seconds,
+            'stages': self.stages,
+            'counts': self.counts,
+            'peak_rss': peak_rss(),
+            'traced_peak': self.traced_peak,
+            'error': self.error,
+        }
+
+    def summary(self):
+        """一行摘要，例如 'pandoc 1.23 s (pandoc 0.50 / post_process 0.61 / save 0.10)'"""
+        stages = ' / '.join(f"{s['stage']} {s['seconds']:.2f}" for s in self.stages)
+        text = f"{self.engine or '-'} {self.seconds or 0:.2f} s"
+        if self.cache == 'hit':
+            text += " (缓存)"
+        elif stages:
+            text += f" ({stages})"
+        if self.fallbacks:
+            text += f"，回退原因: {self.fallbacks[-1]['reason']}"
+        return text
+
+    def write_log(self, target=None):
+        """按 NJUST_METRICS_LOG (或 target) 追加一行 JSON；未设置时不做任何事"""
+        target = target or os.getenv(METRICS_LOG_ENV)
+        if not target:
+            return
+        line = json.dumps(self.to_dict(), ensure_ascii=False)
+        try:
+            with _log_lock:
+                if target == '-':
+                    print(line, file=sys.stderr, flush=True)
+                else:
+                    with open(target, 'a', encoding='utf-8') as f:
+                        f.write(line + '\n')
+        except OSError as e:
+            print(f"Metrics log failed: {e}")
+
+
+@contextmanager
+def profiled(metrics, folder=None):
+    """
+    NJUST_PROFILE_DIR (或 folder) 已设置时，对其中的代码启用 cProfile 与 tracemalloc，结束后写出统计文件。
+
+    cProfile 只记录当前线程；tracemalloc 是全进程的，并发转换时内存统计包含其他转换。
+    """
+    folder = folder or os.getenv(PROFILE_DIR_ENV)
+    if not folder:
+        yield
+        return
+    import cProfile
+    import tracemalloc
+
+    os.makedirs(folder, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(metrics.path or 'conversion'))[0]
+    stem = os.path.join(folder, f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}-{threading.get_ident()}")
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(10)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(stem + '.prof')
+        snapshot = tracemalloc.take_snapshot()
+        metrics.traced_peak = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+        with open(stem + '.mem.txt', 'w', encoding='utf-8') as f:
+            f.write(f"traced peak: {metrics.traced_peak} bytes\n")
+            f.write("allocations still held at the end (top 30):\n")
+            for stat in snapshot.statistics('lineno')[:30]:
+                f.write(f"{stat}\n")
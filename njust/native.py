@@ -0,0 +1,662 @@
+import io
+import os
+import re
+import copy
+from html import unescape
+from urllib.parse import unquote
+
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.oxml.shape import CT_Inline
+from lxml import etree
+from docx.shared import Pt, Length
+
+from .config import NJUST_Config
+from .omml import formula
+from .tables import build_table_element
+from .templates import run_template, paragraph_template, half_points
+
+# ==========================================
+# 原生 Markdown -> WordprocessingML 引擎 (内置引擎)
+# ==========================================
+# 逐行读取 Markdown，每识别出一个块就立即生成对应的 w:p / w:tbl 元素，
+# 不再经过 HTML 字符串 -> BeautifulSoup -> python-docx 对象三层中间表示，也不再依赖 markdown / bs4。
+# 生成的格式与 NJUST_Formatter.add_*_internal 相同 (direct / style 两种格式化模式)。
+
+W_T = qn('w:t')
+W_BR = qn('w:br')
+W_TAB = qn('w:tab')
+M_R = qn('m:r')
+M_RPR = qn('m:rPr')
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# ---- 块级语法 ----
+_ATX = re.compile(r'^ {0,3}(#{1,6})[ \t]*(.*?)[ \t]*#*[ \t]*$')
+_SETEXT = re.compile(r'^ {0,3}(=+|-+)[ \t]*$')
+_FENCE = re.compile(r'^( {0,3})(`{3,}|~{3,})[ \t]*([^`]*)$')
+_HR = re.compile(r'^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_QUOTE = re.compile(r'^ {0,3}> ?')
+_LIST_ITEM = re.compile(r'^( *)([-*+]|\d{1,9}[.)])(?:[ \t]+(.*))?$')
+_TABLE_DELIM = re.compile(r'^ *\|? *:?-+:? *(?:\| *:?-+:? *)*\|? *$')
+_LINK_DEF = re.compile(r'^ {0,3}\[[^\]^][^\]]*\]:[ \t]*\S+')
+# XML 不允许的控制字符
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# ---- 行内语法 (按出现位置最左匹配，未匹配的标记字符原样保留) ----
+_INLINE = re.compile(r"""
+    \$\$(?P<display>.+?)\$\$
+  | \\\[(?P<display_b>.+?)\\\]
+  | \\\((?P<math_b>.+?)\\\)
+  | (?<![\\$])\$(?P<math>[^\s$](?:[^$]*?[^\s\\$])?)\$(?!\d)
+  | \\(?P<escaped>[\\`*_{}\[\]()#+\-.!|<>~$])
+  | (?P<ticks>`+)(?P<code>.+?)(?<!`)(?P=ticks)(?!`)
+  | !\[(?P<image>[^\]]*)\]\([^)]*\)
+  | \[(?P<label>[^\]]*)\](?:\([^)]*\)|\[[^\]]*\])
+  | <(?P<autolink>(?:https?|ftp)://[^>\s]+|mailto:[^>\s]+)>
+  | <(?P<tag>strong|b|em|i|code)(?:\s[^>]*)?>(?P<tagged>.*?)</(?P=tag)\s*>
+  | (?P<br><br\s*/?>)
+  | <!--.*?-->
+  | </?[A-Za-z][A-Za-z0-9-]*(?:\s[^<>]*)?/?>
+  | (?:\*\*\*|(?<!\w)___)(?=\S)(?P<bold_italic>.+?)(?<=\S)(?:\*\*\*|___(?!\w))
+  | \*\*(?=\S)(?P<strong>.+?)(?<=\S)\*\*
+  | (?<!\w)__(?=\S)(?P<strong_u>.+?)(?<=\S)__(?!\w)
+  | \*(?=[^\s*])(?P<em>[^*]+?)(?<=\S)\*
+  | (?<!\w)_(?=[^\s_])(?P<em_u>.+?)(?<=[^\s_])_(?!\w)
+  | (?P<entity>&(?:\#[0-9]+|\#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);)
+""", re.VERBOSE | re.DOTALL)
+_INLINE_STYLE = {'strong': 'b', 'b': 'b', 'em': 'i', 'i': 'i', 'code': 'code'}
+# 公式 (与 Pandoc 的 tex_math_dollars + tex_math_single_backslash 一致)
+_MATH_STYLE = {'math': 'math', 'math_b': 'math', 'display': 'display', 'display_b': 'display'}
+_HTML_TAG = re.compile(r'<[^>]*>')
+# 仅由图片组成的段落 (Markdown 语法或 <img> 标签)
+_IMAGE_ONLY = re.compile(r'^(?:\s*(?:!\[[^\]]*\]\([^)]*\)|<img\b[^>]*>))+\s*$', re.IGNORECASE)
+_IMAGE_ITEM = re.compile(r'!\[(?P<alt>[^\]]*)\]\(\s*(?:<(?P<angled>[^>]*)>|(?P<src>[^)\s]+))[^)]*\)'
+                         r'|(?P<tag><img\b[^>]*>)', re.IGNORECASE)
+_IMG_ATTR = re.compile(r'\b(src|alt)\s*=\s*(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+
+
+def parse_inline(text, math=True):
+    """
+    解析行内格式，返回 [(样式, 文本)]，样式为 '' / 'b' / 'i' / 'code' / 'math' / 'display'。
+
+    与旧实现一致，只区分最外层的格式 (加粗内嵌斜体按加粗处理)；相邻同样式片段合并为一段。
+    公式片段的文本为 LaTeX 源码；math=False 时公式连同定界符按原文保留。
+    """
+    segments = []
+
+    def add(style, s):
+        if not s:
+            return
+        if segments and segments[-1][0] == style:
+            segments[-1] = (style, segments[-1][1] + s)
+        else:
+            segments.append((style, s))
+
+    pos = 0
+    for m in _INLINE.finditer(text):
+        add('', text[pos:m.start()])
+        pos = m.end()
+        kind = m.lastgroup
+        if kind in _MATH_STYLE:
+            if math:
+                segments.append((_MATH_STYLE[kind], m.group(kind)))
+            else:
+                add('', m.group(0))
+        elif kind == 'escaped':
+            add('', m.group('escaped'))
+        elif kind == 'code':
+            add('code', m.group('code').strip())
+        elif kind == 'label':
+            add('', plain_text(m.group('label')))
+        elif kind == 'autolink':
+            add('', m.group('autolink'))
+        elif kind == 'tagged':
+            add(_INLINE_STYLE[m.group('tag').lower()], unescape(_HTML_TAG.sub('', m.group('tagged'))))
+        elif kind == 'br':
+            add('', '\n')
+        elif kind in ('bold_italic', 'strong', 'strong_u'):
+            add('b', plain_text(m.group(kind)))
+        elif kind in ('em', 'em_u'):
+            add('i', plain_text(m.group(kind)))
+        elif kind == 'entity':
+            add('', unescape(m.group('entity')))
+        # 其余 (行内图片、HTML 标签与注释) 不输出文字
+    add('', text[pos:])
+    return segments
+
+
+def plain_text(text):
+    """去掉行内标记后的纯文本 (标题、列表项与表格单元格使用，公式保留 LaTeX 原文)"""
+    return ''.join(s for _style, s in parse_inline(text, math=False))
+
+
+# ==========================================
+# 块切分：逐行读取，读完一个块立即产出
+# ==========================================
+class _Lines:
+    """逐行读取并规范化 (去行尾换行、展开行首制表符)，支持预读一行"""
+
+    def __init__(self, lines):
+        self._it = iter(lines)
+        self._buf = []
+        self._first = True
+
+    def _read(self):
+        line = next(self._it).rstrip('\r\n')
+        if self._first:
+            line = line.lstrip('\ufeff')
+            self._first = False
+        if '\t' in line:
+            stripped = line.lstrip(' \t')
+            line = line[:len(line) - len(stripped)].expandtabs(4) + stripped
+        return line
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._buf:
+            return self._buf.pop()
+        return self._read()
+
+    def peek(self):
+        if not self._buf:
+            try:
+                self._buf.append(self._read())
+            except StopIteration:
+                return None
+        return self._buf[-1]
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip(' '))
+
+
+def _interrupts(line):
+    """能打断段落 / 列表的块起始行"""
+    return bool(_ATX.match(line) or _FENCE.match(line) or _HR.match(line) or _QUOTE.match(line))
+
+
+def iter_blocks(lines):
+    """
+    把 Markdown 文本行切分为块，逐个产出：
+      ('heading', 级别, 文本) / ('paragraph', 文本) / ('code', 文本) /
+      ('table', 行列表) / ('list', [(层级, 是否有序, 序号, 文本)])
+    lines 为任意可迭代的文本行 (文件对象、str.splitlines() 等)，全文不会被一次读入。
+    """
+    reader = _Lines(lines)
+    for line in reader:
+        if not line.strip():
+            continue
+        m = _FENCE.match(line)
+        if m:
+            yield 'code', _read_fence(reader, m)
+            continue
+        if line.lstrip().startswith('<!--'):
+            _skip_comment(reader, line)
+            continue
+        m = _ATX.match(line)
+        if m:
+            yield 'heading', len(m.group(1)), plain_text(m.group(2)).strip()
+            continue
+        if _HR.match(line):
+            continue
+        if _QUOTE.match(line):
+            # 引用块的内容按普通块处理
+            yield from iter_blocks(_read_quote(reader, line))
+            continue
+        if _indent(line) >= 4:
+            yield 'code', _read_indented(reader, line)
+            continue
+        if _LIST_ITEM.match(line):
+            yield 'list', _read_list(reader, line)
+            continue
+        if '|' in line:
+            delim = reader.peek()
+            if delim is not None and '-' in delim and _TABLE_DELIM.match(delim):
+                yield 'table', _read_table(reader, line)
+                continue
+        if _LINK_DEF.match(line):
+            continue
+        yield from _read_paragraph(reader, line)
+
+
+def _read_fence(reader, m):
+    indent, fence = len(m.group(1)), m.group(2)
+    closing = re.compile(r'^ {0,3}' + re.escape(fence[0]) + '{' + str(len(fence)) + r',}[ \t]*$')
+    body = []
+    for line in reader:
+        if closing.match(line):
+            break
+        body.append(line[min(indent, _indent(line)):])
+    return '\n'.join(body)
+
+
+def _skip_comment(reader, line):
+    while '-->' not in line:
+        line = next(reader, None)
+        if line is None:
+            return
+
+
+def _read_quote(reader, line):
+    quoted = [_QUOTE.sub('', line, count=1)]
+    while True:
+        nxt = reader.peek()
+        if nxt is None or not _QUOTE.match(nxt):
+            return quoted
+        quoted.append(_QUOTE.sub('', next(reader), count=1))
+
+
+def _read_indented(reader, line):
+    body = [line[4:]]
+    while True:
+        nxt = reader.peek()
+        if nxt is None or (nxt.strip() and _indent(nxt) < 4):
+            break
+        body.append(next(reader)[4:])
+    while body and not body[-1].strip():
+        body.pop()
+    return '\n'.join(body)
+
+
+def _read_list(reader, line):
+    """读取一个列表 (含嵌套)，返回 [(层级, 是否有序, 序号, 文本)]"""
+    items = []
+    levels = []  # [缩进, 是否有序, 计数]
+    while line is not None:
+        m = _LIST_ITEM.match(line)
+        if m and not _HR.match(line):
+            indent, ordered = len(m.group(1)), m.group(2)[0].isdigit()
+            while levels and indent < levels[-1][0]:
+                levels.pop()
+            if not levels or indent >= levels[-1][0] + 2:
+                levels.append([indent, ordered, 0])
+            elif levels[-1][1] != ordered:
+                levels[-1] = [levels[-1][0], ordered, 0]
+            levels[-1][2] += 1
+            items.append([len(levels) - 1, ordered, levels[-1][2], [m.group(3) or '']])
+        elif line.strip():
+            items[-1][3].append(line.strip())  # 续行
+        else:
+            # 空行之后仍是列表项或缩进的续段时，列表继续
+            while True:
+                nxt = reader.peek()
+                if nxt is None or nxt.strip():
+                    break
+                next(reader)
+            if nxt is None or not (_LIST_ITEM.match(nxt) or _indent(nxt) >= 2) or _HR.match(nxt):
+                break
+        nxt = reader.peek()
+        if nxt is None or (nxt.strip() and _interrupts(nxt) and not _LIST_ITEM.match(nxt)):
+            break
+        line = next(reader)
+    return [(depth, ordered, number, plain_text('\n'.join(text)).strip())
+            for depth, ordered, number, text in items]
+
+
+def _split_row(line):
+    line = line.strip()
+    if '`' not in line and '\\' not in line:
+        cells = line.split('|')
+    else:
+        cells, current, in_code, i = [], [], False, 0
+        while i < len(line):
+            ch = line[i]
+            if ch == '\\' and i + 1 < len(line):
+                current.append(line[i:i + 2])
+                i += 2
+                continue
+            if ch == '`':
+                in_code = not in_code
+            if ch == '|' and not in_code:
+                cells.append(''.join(current))
+                current = []
+            else:
+                current.append(ch)
+            i += 1
+        cells.append(''.join(current))
+    if line.startswith('|'):
+        cells = cells[1:]
+    if line.endswith('|') and not line.endswith('\\|') and cells:
+        cells = cells[:-1]
+    return [plain_text(cell).strip() for cell in cells]
+
+
+def _read_table(reader, header):
+    next(reader)  # 分隔行
+    rows = [_split_row(header)]
+    col_count = len(rows[0])
+    while True:
+        nxt = reader.peek()
+        if nxt is None or not nxt.strip() or '|' not in nxt:
+            break
+        # 与 Python-Markdown 相同：各行按表头的列数补齐或截断
+        row = _split_row(next(reader))[:col_count]
+        rows.append(row + [''] * (col_count - len(row)))
+    return rows
+
+
+def _read_paragraph(reader, line):
+    lines = [line.strip()]
+    while True:
+        nxt = reader.peek()
+        if nxt is None or not nxt.strip():
+            break
+        if _SETEXT.match(nxt):
+            next(reader)
+            if len(lines) > 1:
+                yield 'paragraph', '\n'.join(lines[:-1])
+            yield 'heading', 1 if nxt.strip()[0] == '=' else 2, plain_text(lines[-1]).strip()
+            return
+        if _interrupts(nxt):
+            break
+        lines.append(next(reader).strip())
+    yield 'paragraph', '\n'.join(lines)
+
+
+# ==========================================
+# 生成 WordprocessingML
+# ==========================================
+def _append_text(r, text):
+    """写入 run 文本：换行 -> w:br，制表符 -> w:tab (与 python-docx 的 run.text 相同)"""
+    text = _XML_INVALID.sub('', text)
+    for i, line in enumerate(text.split('\n')):
+        if i:
+            etree.SubElement(r, W_BR)
+        for j, part in enumerate(line.split('\t')):
+            if j:
+                etree.SubElement(r, W_TAB)
+            if part:
+                t = etree.SubElement(r, W_T)
+                t.text = part
+                if part != part.strip():
+                    t.set(XML_SPACE, 'preserve')
+
+
+def _block_strings(node):
+    """块中的全部文本 (块为嵌套的元组 / 列表)"""
+    if isinstance(node, str):
+        yield node
+    elif isinstance(node, (tuple, list)):
+        for item in node:
+            yield from _block_strings(item)
+
+
+class NativeRenderer:
+    """
+    把 Markdown 块转换为 w:p / w:tbl 元素。
+
+    段落与 run 的属性来自预先构建的原型元素 (每种格式只构建一次，使用时复制)；
+    iter_elements 逐个产出尚未挂入文档的元素，render 把它们依次插入正文。
+    images 为 ImagePipeline (见 images.py)，缺省时直接嵌入原图。
+    """
+
+    def __init__(self, formatter, images=None):
+        self.formatter = formatter
+        self.images = images
+        self.doc = formatter.doc
+        self.style_mode = formatter.style_mode
+        self.base_dir = os.path.dirname(os.path.abspath(formatter.input_path))
+        section = self.doc.sections[-1]
+        self.block_width = Length(section.page_width - section.left_margin - section.right_margin).twips
+        self._paragraphs = {}
+        self._runs = {}
+        self._formulas = {}
+        self._shape_id = None
+
+    def render(self, lines):
+        body = self.doc.element.body
+        sectPr = body.sectPr
+        for el in self.iter_elements(lines):
+            if sectPr is not None:
+                sectPr.addprevious(el)
+            else:
+                body.append(el)
+
+    def iter_elements(self, lines):
+        for block in iter_blocks(lines):
+            yield from self.render_block(block)
+
+    def render_block(self, block):
+        return getattr(self, '_block_' + block[0])(*block[1:])
+
+    def keyed_blocks(self, lines):
+        """逐个产出 (内容哈希, 块)，供增量更新比较 (见 update.py)；块中引用的图片按文件内容计入哈希"""
+        from .cache import referenced_images
+        from .update import block_key
+        for block in iter_blocks(lines):
+            text = '\n'.join(_block_strings(block))
+            images = referenced_images(text, self.base_dir) if ('![' in text or '<img' in text.lower()) else ()
+            yield block_key(block, images), block
+
+    # ---- 原型 ----
+    def _style_id(self, name):
+        return self.doc.styles[name].style_id
+
+    def _new_paragraph(self, kind):
+        proto = self._paragraphs.get(kind)
+        if proto is None:
+            proto = self._paragraphs[kind] = self._build_paragraph(kind)
+        return copy.deepcopy(proto)
+
+    def _build_paragraph(self, kind):
+        p = OxmlElement('w:p')
+        if self.style_mode:
+            name, _sep, depth = kind.partition(':')
+            pPr = OxmlElement('w:pPr')
+            pStyle = OxmlElement('w:pStyle')
+            pStyle.set(qn('w:val'), self._style_id(name))
+            pPr.append(pStyle)
+            if depth and int(depth):
+                pPr.append(self._list_indent(int(depth)))
+            p.append(pPr)
+            return p
+        if kind.startswith('list:'):
+            twips = self.formatter._twips
+            template = paragraph_template(jc='both', line=twips(NJUST_Config.LINE_SPACING_BODY), line_rule='exact',
+                                          left=str(int(Pt(21).twips) * (int(kind[5:]) + 1)),
+                                          hanging=twips(Pt(21)))
+        elif kind == 'figure':
+            template = paragraph_template(jc='center')
+        else:
+            template = self.formatter._paragraph_template(kind)
+        p.append(copy.deepcopy(template))
+        return p
+
+    @staticmethod
+    def _list_indent(depth):
+        ind = OxmlElement('w:ind')
+        ind.set(qn('w:left'), str(int(Pt(21).twips) * (depth + 1)))
+        ind.set(qn('w:hanging'), str(int(Pt(21).twips)))
+        return ind
+
+    def _run(self, p, text, size=None, style='', bold=False):
+        """追加 run；size 为字号 (direct 模式)，style 为行内样式 '' / 'b' / 'i' / 'code'"""
+        key = (size, style, bold)
+        proto = self._runs.get(key)
+        if proto is None:
+            proto = self._runs[key] = self._build_run(size, style, bold)
+        r = copy.deepcopy(proto)
+        _append_text(r, text)
+        p.append(r)
+
+    def _build_run(self, size, style, bold):
+        r = OxmlElement('w:r')
+        if not self.style_mode:
+            r.append(copy.deepcopy(run_template(half_points(size), bold=bold or style == 'b',
+                                                italic=style == 'i', is_code=style == 'code')))
+        elif style:
+            rPr = OxmlElement('w:rPr')
+            if style == 'code':
+                rStyle = OxmlElement('w:rStyle')
+                rStyle.set(qn('w:val'), self._style_id('Verbatim Char'))
+                rPr.append(rStyle)
+            else:
+                rPr.append(OxmlElement('w:' + style))
+            r.append(rPr)
+        return r
+
+    # ---- 各类块 ----
+    def _block_heading(self, level, text):
+        if self.style_mode:
+            p = self._new_paragraph(f'Heading {min(level, 4)}')
+            self._run(p, text)
+        else:
+            size = {1: NJUST_Config.SIZE_TITLE_1, 2: NJUST_Config.SIZE_TITLE_2}.get(level, NJUST_Config.SIZE_TITLE_3)
+            p = self._new_paragraph(f'heading{min(level, 3)}')
+            self._run(p, text, size, bold=True)
+        yield p
+
+    def _append_segments(self, p, segments, size=None, bold=False):
+        """按 parse_inline 的片段追加 run / 公式"""
+        for style, segment in segments:
+            if style in ('math', 'display'):
+                self._math(p, segment, style == 'display', size)
+            else:
+                self._run(p, segment, size, style, bold)
+
+    def _rich_paragraph(self, segments):
+        p = self._new_paragraph('Body Text' if self.style_mode else 'body')
+        self._append_segments(p, segments, NJUST_Config.SIZE_BODY)
+        return p
+
+    def _block_paragraph(self, text):
+        if _IMAGE_ONLY.match(text):
+            for m in _IMAGE_ITEM.finditer(text):
+                yield from self._image(*self._image_source(m))
+            return
+        yield from self._body_paragraphs(parse_inline(text))
+
+    def _body_paragraphs(self, segments):
+        if all(style == 'display' or not segment.strip() for style, segment in segments) \
+                and any(style == 'display' for style, _segment in segments):
+            # 独立公式：单独成段居中，不使用正文的固定行距 (否则分式等会被裁掉)
+            for style, segment in segments:
+                if style == 'display':
+                    p = self._new_paragraph('Figure' if self.style_mode else 'figure')
+                    self._math(p, segment, True)
+                    yield p
+            return
+        yield self._rich_paragraph(segments)
+
+    # ---- 公式 ----
+    def _math(self, p, tex, display, size=None):
+        size = size or NJUST_Config.SIZE_BODY
+        try:
+            p.append(self._formula(tex.strip(), display, size))
+        except Exception as e:
+            print(f"Formula kept as text: {tex}: {e}")
+            delimiter = '$$' if display else '$'
+            self._run(p, f"{delimiter}{tex}{delimiter}", size)
+
+    def _formula(self, tex, display, size):
+        """公式元素 (见 omml.py)；direct 模式下 Normal 样式没有字号，公式 run 同样显式写入所在段落的字号"""
+        key = (tex, display, size)
+        proto = self._formulas.get(key)
+        if proto is None:
+            proto = formula(tex, display)
+            if not self.style_mode:
+                size = str(half_points(size))
+                for r in proto.iter(M_R):
+                    rPr = OxmlElement('w:rPr')
+                    etree.SubElement(rPr, qn('w:sz')).set(qn('w:val'), size)
+                    etree.SubElement(rPr, qn('w:szCs')).set(qn('w:val'), size)
+                    r.insert(1 if r[0].tag == M_RPR else 0, rPr)
+            self._formulas[key] = proto
+        return copy.deepcopy(proto)
+
+    def _block_code(self, text):
+        p = self._new_paragraph('Source Code' if self.style_mode else 'code')
+        self._run(p, text, NJUST_Config.SIZE_CODE, 'code' if not self.style_mode else '')
+        yield p
+
+    def _block_list(self, items):
+        for depth, ordered, number, text in items:
+            prefix = f"{number}. " if ordered else "● "
+            p = self._new_paragraph(f"{'List Paragraph' if self.style_mode else 'list'}:{depth}")
+            self._run(p, prefix + text, NJUST_Config.SIZE_BODY)
+            yield p
+
+    def _block_table(self, rows):
+        col_count = max(len(row) for row in rows)
+        if not col_count:
+            return
+        col_width = self.block_width // col_count
+        if self.style_mode:
+            yield build_table_element(rows, col_count, col_width,
+                                      table_style_id=self._style_id('Table'),
+                                      text_style_id=self._style_id('Table Text'))
+        else:
+            yield build_table_element(rows, col_count, col_width,
+                                      para_template=self.formatter._paragraph_template('center'),
+                                      run_template=run_template(half_points(NJUST_Config.SIZE_CAPTION)))
+
+    @staticmethod
+    def _image_source(m):
+        if m.group('tag'):
+            attrs = {k.lower(): v for k, _q, v in _IMG_ATTR.findall(m.group('tag'))}
+            return attrs.get('src', ''), unescape(attrs.get('alt', ''))
+        return m.group('angled') or m.group('src') or '', plain_text(m.group('alt'))
+
+    def _resolve_image(self, src):
+        if not src or re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*://', src):
+            return None
+        for candidate in (src, unquote(src)):
+            path = candidate if os.path.isabs(candidate) else os.path.join(self.base_dir, candidate)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _next_shape_id(self):
+        """
+        图片的 wp:docPr id。
+        part.next_id 每次扫描整棵文档树，而流式写出时已写出的元素不在树中，因此在此自行计数。
+        """
+        if self._shape_id is None:
+            used = [int(v) for v in self.doc.element.xpath('//@id') if v.isdigit()]
+            self._shape_id = max(used, default=0)
+        self._shape_id += 1
+        return self._shape_id
+
+    def _pic_inline(self, path, width):
+        """
+        同 part.new_pic_inline，图片字节取自插图流水线 (已缩小、按内容去重)。
+
+        以匿名流加载，图片部件使用规范扩展名，保证在 OPC 默认内容类型表中 (见 streaming.py)；
+        图片名称仍为原文件名。
+        """
+        path = os.path.normpath(path)
+        if self.images is not None:
+            data = self.images.get(path)
+        else:
+            with open(path, 'rb') as f:
+                data = f.read()
+        rId, image = self.doc.part.get_or_add_image(io.BytesIO(data))
+        cx, cy = image.scaled_dimensions(width, None)
+        return CT_Inline.new_pic_inline(self._next_shape_id(), rId, os.path.basename(path), cx, cy)
+
+    def _image(self, src, caption):
+        path = self._resolve_image(src)
+        if path is None:
+            return
+        try:
+            inline = self._pic_inline(path, NJUST_Config.IMAGE_WIDTH)
+        except Exception as e:
+            print(f"Image skipped: {src}: {e}")
+            return
+        p = self._new_paragraph('Figure' if self.style_mode else 'figure')
+        r = OxmlElement('w:r')
+        drawing = OxmlElement('w:drawing')
+        drawing.append(inline)
+        r.append(drawing)
+        p.append(r)
+        yield p
+        if caption:
+            yield self._caption(f"图 {caption}", 'Image Caption')
+
+    def _caption(self, text, style_name):
+        """题注段落 (居中、题注字号)；style_name 为样式模式下使用的样式"""
+        p = self._new_paragraph(style_name if self.style_mode else 'figure')
+        self._run(p, text, NJUST_Config.SIZE_CAPTION)
+        return p
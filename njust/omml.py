@@ -0,0 +1,649 @@
+import os
+import re
+import copy
+import json
+import threading
+
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import qn
+from lxml import etree
+
+from .paths import cache_dir
+
+# ==========================================
+# LaTeX 公式 -> Office Math (OMML)
+# ==========================================
+# 内置引擎把 $...$ / $$...$$ 中的 LaTeX 直接转换为 Word 原生公式 (m:oMath)，不再需要 Pandoc。
+# 覆盖论文常用的子集：上下标、分式、根式、求和 / 积分等大型运算符、\left...\right 定界符、
+# 重音、字体命令、\text、矩阵 / cases / aligned 等环境与常用符号；不认识的命令原样输出，不会报错。
+#
+# 同一篇论文反复出现相同的符号与公式：转换结果按公式文本记忆，并持久化到缓存目录，
+# 进程内命中时只需复制一份现成的元素。
+
+# 转换逻辑变化时递增，使旧缓存失效
+OMML_REVISION = 1
+# 公式缓存文件超过此大小时清空重建
+MAX_CACHE_BYTES = 16 * 1024 * 1024
+
+# ---- 符号表 ----
+GREEK = {
+    'alpha': 'α', 'beta': 'β', 'gamma': 'γ', 'delta': 'δ', 'epsilon': 'ϵ', 'varepsilon': 'ε',
+    'zeta': 'ζ', 'eta': 'η', 'theta': 'θ', 'vartheta': 'ϑ', 'iota': 'ι', 'kappa': 'κ',
+    'lambda': 'λ', 'mu': 'μ', 'nu': 'ν', 'xi': 'ξ', 'pi': 'π', 'varpi': 'ϖ', 'rho': 'ρ',
+    'varrho': 'ϱ', 'sigma': 'σ', 'varsigma': 'ς', 'tau': 'τ', 'upsilon': 'υ', 'phi': 'ϕ',
+    'varphi': 'φ', 'chi': 'χ', 'psi': 'ψ', 'omega': 'ω',
+    'Gamma': 'Γ', 'Delta': 'Δ', 'Theta': 'Θ', 'Lambda': 'Λ', 'Xi': 'Ξ', 'Pi': 'Π',
+    'Sigma': 'Σ', 'Upsilon': 'Υ', 'Phi': 'Φ', 'Psi': 'Ψ', 'Omega': 'Ω',
+}
+SYMBOLS = {
+    # 关系
+    'leq': '≤', 'le': '≤', 'geq': '≥', 'ge': '≥', 'leqslant': '⩽', 'geqslant': '⩾', 'neq': '≠', 'ne': '≠',
+    'equiv': '≡', 'approx': '≈', 'sim': '∼', 'simeq': '≃', 'cong': '≅', 'propto': '∝', 'll': '≪',
+    'gg': '≫', 'prec': '≺', 'succ': '≻', 'preceq': '⪯', 'succeq': '⪰', 'subset': '⊂', 'supset': '⊃',
+    'subseteq': '⊆', 'supseteq': '⊇', 'subsetneq': '⊊', 'supsetneq': '⊋', 'in': '∈', 'notin': '∉',
+    'ni': '∋', 'perp': '⊥', 'parallel': '∥', 'mid': '∣', 'models': '⊨', 'vdash': '⊢', 'asymp': '≍',
+    'doteq': '≐', 'triangleq': '≜',
+    # 箭头
+    'to': '→', 'rightarrow': '→', 'leftarrow': '←', 'gets': '←', 'leftrightarrow': '↔',
+    'Rightarrow': '⇒', 'Leftarrow': '⇐', 'Leftrightarrow': '⇔', 'implies': '⟹', 'impliedby': '⟸',
+    'iff': '⟺', 'mapsto': '↦', 'longrightarrow': '⟶', 'longleftarrow': '⟵', 'Longrightarrow': '⟹',
+    'Longleftarrow': '⟸', 'longmapsto': '⟼', 'uparrow': '↑', 'downarrow': '↓', 'Uparrow': '⇑',
+    'Downarrow': '⇓', 'nearrow': '↗', 'searrow': '↘', 'hookrightarrow': '↪', 'rightharpoonup': '⇀',
+    # 二元运算
+    'pm': '±', 'mp': '∓', 'times': '×', 'div': '÷', 'cdot': '⋅', 'ast': '∗', 'star': '⋆', 'circ': '∘',
+    'bullet': '∙', 'oplus': '⊕', 'ominus': '⊖', 'otimes': '⊗', 'odot': '⊙', 'cup': '∪', 'cap': '∩',
+    'setminus': '∖', 'wedge': '∧', 'land': '∧', 'vee': '∨', 'lor': '∨', 'lnot': '¬', 'neg': '¬',
+    'sqcup': '⊔', 'sqcap': '⊓', 'uplus': '⊎', 'diamond': '⋄',
+    # 其他
+    'infty': '∞', 'partial': '∂', 'nabla': '∇', 'forall': '∀', 'exists': '∃', 'nexists': '∄',
+    'emptyset': '∅', 'varnothing': '∅', 'ell': 'ℓ', 'hbar': 'ℏ', 'Re': 'ℜ', 'Im': 'ℑ', 'aleph': 'ℵ',
+    'wp': '℘', 'angle': '∠', 'triangle': '△', 'prime': '′', 'degree': '°', 'dagger': '†',
+    'ddagger': '‡', 'ldots': '…', 'cdots': '⋯', 'vdots': '⋮', 'ddots': '⋱', 'dots': '…',
+    'therefore': '∴', 'because': '∵', 'top': '⊤', 'bot': '⊥', 'square': '□', 'Box': '□',
+    'blacksquare': '■', 'checkmark': '✓', 'S': '§', 'P': '¶',
+    # 定界符
+    'langle': '⟨', 'rangle': '⟩', 'lfloor': '⌊', 'rfloor': '⌋', 'lceil': '⌈', 'rceil': '⌉',
+    'vert': '|', 'lvert': '|', 'rvert': '|', 'Vert': '‖', 'lVert': '‖', 'rVert': '‖',
+    'backslash': '\\', 'lbrace': '{', 'rbrace': '}', 'lbrack': '[', 'rbrack': ']',
+    # 间距
+    'quad': '\u2003', 'qquad': '\u2003\u2003', 'enspace': '\u2002', 'thinspace': '\u2009',
+    'medspace': '\u205f', 'thickspace': '\u2005',
+}
+SYMBOLS.update(GREEK)
+# \{ \, 等单字符转义
+ESCAPES = {
+    '{': '{', '}': '}', '|': '‖', ',': '\u2009', ':': '\u205f', '>': '\u205f', ';': '\u2005',
+    '!': '', ' ': ' ', '%': '%', '&': '&', '#': '#', '_': '_', '$': '$',
+}
+# 直接输入的字符
+CHARS = {'-': '−', '*': '∗', '~': '\u00a0'}
+# \not 与常见符号的组合
+NEGATED = {'=': '≠', '∈': '∉', '⊂': '⊄', '⊃': '⊅', '⊆': '⊈', '⊇': '⊉', '<': '≮', '>': '≯',
+           '≡': '≢', '∼': '≁', '≈': '≉', '≤': '≰', '≥': '≱', '∃': '∄', '∣': '∤', '∥': '∦'}
+
+# 大型运算符 (名称 -> 符号, 是否为积分类 [上下限总在右侧])
+NARY = {
+    'sum': ('∑', False), 'prod': ('∏', False), 'coprod': ('∐', False), 'bigcup': ('⋃', False),
+    'bigcap': ('⋂', False), 'bigvee': ('⋁', False), 'bigwedge': ('⋀', False), 'bigoplus': ('⨁', False),
+    'bigotimes': ('⨂', False), 'bigodot': ('⨀', False), 'biguplus': ('⨄', False), 'bigsqcup': ('⨆', False),
+    'int': ('∫', True), 'iint': ('∬', True), 'iiint': ('∭', True), 'oint': ('∮', True),
+    'oiint': ('∯', True),
+}
+# 函数名 (正体，后接自变量)
+FUNCTIONS = {name: name for name in (
+    'sin', 'cos', 'tan', 'cot', 'sec', 'csc', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh',
+    'coth', 'log', 'ln', 'lg', 'exp', 'dim', 'ker', 'deg', 'hom', 'arg')}
+# 下标写在正下方的算子
+LIMITS = {'lim': 'lim', 'limsup': 'lim sup', 'liminf': 'lim inf', 'max': 'max', 'min': 'min',
+          'sup': 'sup', 'inf': 'inf', 'det': 'det', 'gcd': 'gcd', 'Pr': 'Pr',
+          'argmax': 'arg max', 'argmin': 'arg min'}
+ACCENTS = {
+    'hat': '\u0302', 'widehat': '\u0302', 'tilde': '\u0303', 'widetilde': '\u0303', 'bar': '\u0305',
+    'vec': '\u20d7', 'overrightarrow': '\u20d7', 'overleftarrow': '\u20d6', 'dot': '\u0307',
+    'ddot': '\u0308', 'check': '\u030c', 'breve': '\u0306', 'acute': '\u0301', 'grave': '\u0300',
+    'mathring': '\u030a',
+}
+# 字体命令 -> (m:scr, m:sty)
+FONTS = {
+    'mathrm': (None, 'p'), 'mathbf': (None, 'b'), 'mathit': (None, 'i'), 'boldsymbol': (None, 'bi'),
+    'bm': (None, 'bi'), 'mathbb': ('double-struck', 'p'), 'mathcal': ('script', None),
+    'mathscr': ('script', None), 'mathfrak': ('fraktur', None), 'mathsf': ('sans-serif', 'p'),
+    'mathtt': ('monospace', 'p'), 'rm': (None, 'p'), 'bf': (None, 'b'),
+}
+TEXT_COMMANDS = ('text', 'textrm', 'textnormal', 'textit', 'textbf', 'mbox', 'hbox')
+# 忽略的命令 (及其需要跳过的参数个数)
+IGNORED = {'displaystyle': 0, 'textstyle': 0, 'scriptstyle': 0, 'scriptscriptstyle': 0, 'nonumber': 0,
+           'notag': 0, 'mathstrut': 0, 'strut': 0, 'label': 1, 'phantom': 1, 'hphantom': 1, 'vphantom': 1,
+           'hspace': 1, 'vspace': 1, 'color': 1, 'limits': 0, 'nolimits': 0}
+BIG_DELIMITERS = {'big', 'Big', 'bigg', 'Bigg', 'bigl', 'bigr', 'Bigl', 'Bigr', 'biggl', 'biggr',
+                  'Biggl', 'Biggr', 'bigm', 'Bigm'}
+# 矩阵类环境 -> (左定界符, 右定界符)
+MATRIX_DELIMITERS = {'matrix': None, 'smallmatrix': None, 'array': None, 'pmatrix': ('(', ')'),
+                     'bmatrix': ('[', ']'), 'Bmatrix': ('{', '}'), 'vmatrix': ('|', '|'),
+                     'Vmatrix': ('‖', '‖'), 'cases': ('{', ''), 'dcases': ('{', '')}
+ALIGNED = {'aligned', 'align', 'alignat', 'alignedat', 'split', 'eqnarray', 'flalign'}
+
+_TOKEN = re.compile(r'\\([A-Za-z]+)\*?|\\(.)|(\s+)|(.)', re.DOTALL)
+
+CMD, ESC, SPACE, CHR = 'cmd', 'esc', 'space', 'chr'
+_OPEN, _CLOSE = (CHR, '{'), (CHR, '}')
+_AMP, _ROW = (CHR, '&'), (ESC, '\\')
+_RIGHT, _MIDDLE, _END = (CMD, 'right'), (CMD, 'middle'), (CMD, 'end')
+# 任何一层表达式都可能以这些记号结束 (大型运算符 / 函数不会把它们当作自变量)
+_ALL_STOPS = {_CLOSE, _AMP, _ROW, _RIGHT, _MIDDLE, _END}
+
+
+def _m(name):
+    return qn('m:' + name)
+
+
+def _sub(parent, name, val=None):
+    el = etree.SubElement(parent, _m(name))
+    if val is not None:
+        el.set(_m('val'), val)
+    return el
+
+
+def _node(name, *slots):
+    """构造 m:<name>，slots 依次为 (子元素名, 元素列表)"""
+    el = OxmlElement('m:' + name)
+    for slot, items in slots:
+        _sub(el, slot).extend(items)
+    return el
+
+
+def _run(text, scr=None, sty=None, nor=False):
+    r = OxmlElement('m:r')
+    if nor or scr or sty:
+        rPr = _sub(r, 'rPr')
+        if nor:
+            _sub(rPr, 'nor')
+        else:
+            if scr:
+                _sub(rPr, 'scr', scr)
+            if sty:
+                _sub(rPr, 'sty', sty)
+    t = _sub(r, 't')
+    t.text = text
+    if text != text.strip():
+        t.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+    return r
+
+
+def _merge_runs(items):
+    """相邻且格式相同的 m:r 合并为一个"""
+    merged = []
+    for el in items:
+        if merged and el.tag == _m('r') and merged[-1].tag == _m('r'):
+            prev = merged[-1]
+            prev_rPr, rPr = prev.find(_m('rPr')), el.find(_m('rPr'))
+            same = (prev_rPr is None and rPr is None) or (
+                prev_rPr is not None and rPr is not None and etree.tostring(prev_rPr) == etree.tostring(rPr))
+            if same:
+                t = prev.find(_m('t'))
+                t.text = (t.text or '') + (el.find(_m('t')).text or '')
+                if t.text != t.text.strip():
+                    t.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+                continue
+        merged.append(el)
+    return merged
+
+
+class _Parser:
+    """递归下降解析 LaTeX 记号流，直接产出 OMML 元素列表"""
+
+    def __init__(self, tex, display):
+        self.tokens = []
+        for m in _TOKEN.finditer(tex):
+            if m.group(1):
+                self.tokens.append((CMD, m.group(1)))
+            elif m.group(2) is not None:
+                self.tokens.append((ESC, m.group(2)))
+            elif m.group(3):
+                self.tokens.append((SPACE, ' '))
+            else:
+                self.tokens.append((CHR, m.group(4)))
+        self.pos = 0
+        self.display = display
+        self.font = (None, None)
+
+    # ---- 记号 ----
+    def _peek(self):
+        while self.pos < len(self.tokens) and self.tokens[self.pos][0] == SPACE:
+            self.pos += 1
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        if token is not None:
+            self.pos += 1
+        return token
+
+    def _raw_group(self):
+        """{...} 的原始文本 (\\text 与环境名使用)"""
+        if self._peek() != _OPEN:
+            token = self._next()
+            return '' if token is None else token[1]
+        self._next()
+        depth, out = 1, []
+        while self.pos < len(self.tokens):
+            kind, value = self.tokens[self.pos]
+            self.pos += 1
+            if (kind, value) == _OPEN:
+                depth += 1
+            elif (kind, value) == _CLOSE:
+                depth -= 1
+                if not depth:
+                    break
+            out.append('\\' + value if kind == CMD else ESCAPES.get(value, value) if kind == ESC else value)
+        return ''.join(out)
+
+    def _optional(self):
+        """可选参数 [...] (\\sqrt 的根指数)"""
+        if self._peek() != (CHR, '['):
+            return None
+        self._next()
+        return self.expression({(CHR, ']')}, consume=True)
+
+    # ---- 语法 ----
+    def parse(self):
+        """顶层：\\\\ 分隔的多行公式转换为 m:eqArr"""
+        rows = [self.expression({_ROW})]
+        while self._next() == _ROW:
+            rows.append(self.expression({_ROW}))
+        rows = [row for row in rows if row]
+        if len(rows) > 1:
+            return [_node('eqArr', *[('e', row) for row in rows])]
+        return rows[0] if rows else []
+
+    def expression(self, stops, consume=False):
+        items = []
+        while True:
+            token = self._peek()
+            if token is None or token in stops:
+                break
+            items.extend(self.scripted())
+        if consume:
+            self._next()
+        return _merge_runs(items)
+
+    def group(self):
+        """命令参数：{...} 或单个记号"""
+        if self._peek() == _OPEN:
+            self._next()
+            return self.expression({_CLOSE}, consume=True)
+        items, _kind, _extra = self.atom()
+        return items
+
+    def _has_operand(self):
+        token = self._peek()
+        return token is not None and token not in _ALL_STOPS and token not in ((CHR, '^'), (CHR, '_'))
+
+    def scripted(self):
+        """一个原子及其上下标"""
+        base, kind, extra = self.atom()
+        sub = sup = None
+        limits = None
+        while True:
+            token = self._peek()
+            if token == (CHR, '_') and sub is None:
+                self._next()
+                sub = self.group()
+            elif token == (CHR, '^') and sup is None:
+                self._next()
+                sup = self.group()
+            elif token == (CHR, "'"):
+                primes = 0
+                while self._peek() == (CHR, "'"):
+                    self._next()
+                    primes += 1
+                sup = (sup or []) + [_run('′' * primes)]
+            elif token in ((CMD, 'limits'), (CMD, 'nolimits')):
+                self._next()
+                limits = token[1] == 'limits'
+            else:
+                break
+
+        if kind == 'nary':
+            char, integral = extra
+            under = limits if limits is not None else (self.display and not integral)
+            pr = OxmlElement('m:naryPr')
+            _sub(pr, 'chr', char)
+            _sub(pr, 'limLoc', 'undOvr' if under else 'subSup')
+            if sub is None:
+                _sub(pr, 'subHide', '1')
+            if sup is None:
+                _sub(pr, 'supHide', '1')
+            body = self.scripted() if self._has_operand() else []
+            el = _node('nary', ('sub', sub or []), ('sup', sup or []), ('e', body))
+            el.insert(0, pr)
+            return [el]
+        if kind == 'limit' and (sub is not None or (sup is not None and extra)):
+            el = base
+            if sub is not None:
+                el = [_node('limLow', ('e', el), ('lim', sub))]
+            if sup is not None:
+                el = [_node('limUpp', ('e', el), ('lim', sup))]
+            return el
+        if sub is not None or sup is not None:
+            if sub is not None and sup is not None:
+                base = [_node('sSubSup', ('e', base), ('sub', sub), ('sup', sup))]
+            elif sub is not None:
+                base = [_node('sSub', ('e', base), ('sub', sub))]
+            else:
+                base = [_node('sSup', ('e', base), ('sup', sup))]
+        if kind == 'func' and self._has_operand():
+            return [_node('func', ('fName', base), ('e', self._argument()))]
+        return base
+
+    def _argument(self):
+        """函数的自变量：(...) 整体或下一个原子"""
+        if self._peek() != (CHR, '('):
+            return self.scripted()
+        self._next()
+        inner = self.expression({(CHR, ')')}, consume=True)
+        return _merge_runs([_run('(')] + inner + [_run(')')])
+
+    def atom(self):
+        """返回 (元素列表, 类别, 附加信息)；类别为 None / 'nary' / 'func' / 'limit'"""
+        token = self._next()
+        if token is None:
+            return [], None, None
+        kind, value = token
+        scr, sty = self.font
+        if kind == CHR:
+            if value == '{':
+                return self.expression({_CLOSE}, consume=True), None, None
+            if value in '}&':
+                return [], None, None  # 多余的 } / 环境外的 &
+            return [_run(CHARS.get(value, value), scr, sty)], None, None
+        if kind == ESC:
+            if value == '\\':
+                return [], None, None
+            text = ESCAPES.get(value, value)
+            return ([_run(text)] if text else []), None, None
+        return self.command(value)
+
+    def command(self, name):
+        scr, sty = self.font
+        if name in NARY:
+            return [_run(NARY[name][0])], 'nary', NARY[name]
+        if name in FUNCTIONS:
+            return [_run(FUNCTIONS[name], sty='p')], 'func', None
+        if name in LIMITS:
+            return [_run(LIMITS[name], sty='p')], 'limit', False
+        if name == 'operatorname':
+            return [_run(self._raw_group(), sty='p')], 'func', None
+        if name in SYMBOLS:
+            return [_run(SYMBOLS[name], scr, sty)], None, None
+        if name in ('frac', 'dfrac', 'tfrac', 'cfrac'):
+            num = self.group()
+            return [_node('f', ('num', num), ('den', self.group()))], None, None
+        if name in ('binom', 'dbinom', 'tbinom'):
+            top = self.group()
+            f = _node('f', ('num', top), ('den', self.group()))
+            pr = OxmlElement('m:fPr')
+            _sub(pr, 'type', 'noBar')
+            f.insert(0, pr)
+            return [self._delimited('(', ')', [[f]])], None, None
+        if name == 'sqrt':
+            degree = self._optional()
+            rad = _node('rad', ('deg', degree or []), ('e', self.group()))
+            if not degree:
+                pr = OxmlElement('m:radPr')
+                _sub(pr, 'degHide', '1')
+                rad.insert(0, pr)
+            return [rad], None, None
+        if name == 'left':
+            return [self._left_right()], None, None
+        if name in ('right', 'middle'):
+            self._next()
+            return [], None, None
+        if name in BIG_DELIMITERS:
+            return [_run(self._delimiter())], None, None
+        if name in ACCENTS:
+            acc = _node('acc', ('e', self.group()))
+            pr = OxmlElement('m:accPr')
+            _sub(pr, 'chr', ACCENTS[name])
+            acc.insert(0, pr)
+            return [acc], None, None
+        if name in ('overline', 'underline'):
+            bar = _node('bar', ('e', self.group()))
+            pr = OxmlElement('m:barPr')
+            _sub(pr, 'pos', 'top' if name == 'overline' else 'bot')
+            bar.insert(0, pr)
+            return [bar], None, None
+        if name in ('overbrace', 'underbrace'):
+            group = _node('groupChr', ('e', self.group()))
+            pr = OxmlElement('m:groupChrPr')
+            if name == 'overbrace':
+                _sub(pr, 'chr', '⏞')
+                _sub(pr, 'pos', 'top')
+                _sub(pr, 'vertJc', 'bot')
+            else:
+                _sub(pr, 'chr', '⏟')
+            group.insert(0, pr)
+            return [group], 'limit', True
+        if name in ('overset', 'stackrel', 'underset'):
+            limit = self.group()
+            base = self.group()
+            return [_node('limUpp' if name != 'underset' else 'limLow', ('e', base), ('lim', limit))], None, None
+        if name in FONTS:
+            outer = self.font
+            self.font = FONTS[name]
+            try:
+                items = self.group()
+            finally:
+                self.font = outer
+            return items, None, None
+        if name in TEXT_COMMANDS:
+            text = self._raw_group()
+            return ([_run(text, nor=True)] if text else []), None, None
+        if name == 'textcolor':
+            self._raw_group()
+            return self.group(), None, None
+        if name == 'tag':
+            return [_run(f"\u2003({self._raw_group()})")], None, None
+        if name == 'not':
+            items, _kind, _extra = self.atom()
+            if len(items) == 1 and items[0].tag == _m('r'):
+                t = items[0].find(_m('t'))
+                t.text = NEGATED.get(t.text, t.text + '\u0338')
+            return items, None, None
+        if name == 'begin':
+            return self._environment(self._raw_group()), None, None
+        if name == 'end':
+            self._raw_group()
+            return [], None, None
+        if name in IGNORED:
+            for _ in range(IGNORED[name]):
+                self._raw_group()
+            return [], None, None
+        # 不认识的命令：原样输出
+        return [_run('\\' + name, sty='p')], None, None
+
+    # ---- 定界符与环境 ----
+    def _delimiter(self):
+        token = self._next()
+        if token is None:
+            return ''
+        kind, value = token
+        if kind == CMD:
+            return SYMBOLS.get(value, '')
+        if kind == ESC:
+            return ESCAPES.get(value, value)
+        return '' if value == '.' else value
+
+    @staticmethod
+    def _delimited(beg, end, segments, sep=None):
+        d = OxmlElement('m:d')
+        pr = _sub(d, 'dPr')
+        _sub(pr, 'begChr', beg)
+        if sep is not None:
+            _sub(pr, 'sepChr', sep)
+        _sub(pr, 'endChr', end)
+        for items in segments:
+            _sub(d, 'e').extend(items)
+        return d
+
+    def _left_right(self):
+        beg = self._delimiter()
+        segments, sep = [self.expression({_RIGHT, _MIDDLE})], None
+        while self._peek() == _MIDDLE:
+            self._next()
+            sep = self._delimiter()
+            segments.append(self.expression({_RIGHT, _MIDDLE}))
+        end = ''
+        if self._next() == _RIGHT:
+            end = self._delimiter()
+        return self._delimited(beg, end, segments, sep)
+
+    def _environment(self, name):
+        name = name.rstrip('*')
+        columns = None
+        if name in ('array', 'alignat', 'alignedat'):
+            spec = self._raw_group()
+            if name == 'array':
+                columns = [{'l': 'left', 'r': 'right'}.get(c, 'center') for c in spec if c in 'lcr']
+        rows = [[]]
+        while True:
+            rows[-1].append(self.expression({_AMP, _ROW, _END}))
+            token = self._next()
+            if token is None:
+                break
+            if token == _ROW:
+                if self._peek() == (CHR, '['):
+                    self._raw_bracket()
+                rows.append([])
+            elif token == _END:
+                self._raw_group()
+                break
+        if rows and all(not cell for cell in rows[-1]):
+            rows.pop()
+        if not rows:
+            return []
+
+        width = max(len(row) for row in rows)
+        if width == 1 and name not in MATRIX_DELIMITERS:
+            # equation / gather / multline 等单列环境：逐行居中
+            if len(rows) == 1:
+                return rows[0][0]
+            return [_node('eqArr', *[('e', row[0]) for row in rows])]
+        if columns is None:
+            if name in ALIGNED:
+                columns = ['right' if i % 2 == 0 else 'left' for i in range(width)]
+            elif name in ('cases', 'dcases'):
+                columns = ['left'] * width
+            else:
+                columns = ['center'] * width
+        columns = (columns + ['center'] * width)[:width]
+
+        matrix = OxmlElement('m:m')
+        mPr = _sub(matrix, 'mPr')
+        _sub(mPr, 'plcHide', '1')
+        mcs = _sub(mPr, 'mcs')
+        for jc in columns:
+            mcPr = _sub(_sub(mcs, 'mc'), 'mcPr')
+            _sub(mcPr, 'count', '1')
+            _sub(mcPr, 'mcJc', jc)
+        for row in rows:
+            mr = _sub(matrix, 'mr')
+            for cell in row + [[]] * (width - len(row)):
+                _sub(mr, 'e').extend(cell)
+        delimiters = MATRIX_DELIMITERS.get(name)
+        if delimiters:
+            return [self._delimited(delimiters[0], delimiters[1], [[matrix]])]
+        return [matrix]
+
+    def _raw_bracket(self):
+        while self.pos < len(self.tokens):
+            token = self.tokens[self.pos]
+            self.pos += 1
+            if token == (CHR, ']'):
+                break
+
+
+def latex_to_omml(tex, display=False):
+    """把一个 LaTeX 公式转换为 m:oMath (display=True 时为包含 m:oMath 的 m:oMathPara)"""
+    math = OxmlElement('m:oMath')
+    math.extend(_Parser(tex, display).parse())
+    if not display:
+        return math
+    para = OxmlElement('m:oMathPara')
+    para.append(math)
+    return para
+
+
+class FormulaCache:
+    """
+    公式转换结果缓存：进程内按 (公式, 行内/独立) 记忆元素原型，使用时复制；
+    新转换的公式追加写入 JSON Lines 文件，下次启动时整体载入。
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._prototypes = {}
+        self._stored = None
+        self._out = None
+        self._lock = threading.Lock()
+
+    def _file(self):
+        return self.path or os.path.join(cache_dir('math'), f"formulas-r{OMML_REVISION}.jsonl")
+
+    def _load(self):
+        stored = {}
+        path = self._file()
+        try:
+            if os.path.getsize(path) > MAX_CACHE_BYTES:
+                os.remove(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        key, xml = json.loads(line)
+                    except ValueError:
+                        continue  # 并发追加时截断的行
+                    stored[key] = xml
+        except OSError:
+            pass
+        return stored
+
+    def get(self, tex, display=False):
+        key = ('D' if display else 'I') + tex
+        proto = self._prototypes.get(key)
+        if proto is None:
+            with self._lock:
+                if self._stored is None:
+                    self._stored = self._load()
+                xml = self._stored.get(key)
+                if xml is not None:
+                    proto = parse_xml(xml)
+                else:
+                    proto = latex_to_omml(tex, display)
+                    self._append(key, etree.tostring(proto, encoding='unicode'))
+                self._prototypes[key] = proto
+        return copy.deepcopy(proto)
+
+    def _append(self, key, xml):
+        self._stored[key] = xml
+        try:
+            if self._out is None:
+                self._out = open(self._file(), 'a', encoding='utf-8')
+            # 每条一行、一次写入，多个进程同时追加也不会交错
+            self._out.write(json.dumps([key, xml], ensure_ascii=False) + '\n')
+            self._out.flush()
+        except OSError:
+            pass
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def formula(tex, display=False):
+    """带缓存的 latex_to_omml (进程内共用一个 FormulaCache)"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = FormulaCache()
+    return _default_cache.get(tex, display)
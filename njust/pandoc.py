@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+import subprocess
+from contextlib import contextmanager
+
+# ==========================================
+# Pandoc 调用封装
+# ==========================================
+PANDOC_INPUT_FORMAT = 'markdown+tex_math_dollars+tex_math_single_backslash'
+
+# 需要 --resource-path (Pandoc 2.0+)
+MIN_PANDOC_VERSION = (2, 0)
+# 单次 Pandoc 调用的超时 (秒)；环境变量 NJUST_PANDOC_TIMEOUT 可覆盖，0 表示不限
+PANDOC_TIMEOUT = 300
+PANDOC_TIMEOUT_ENV = 'NJUST_PANDOC_TIMEOUT'
+# 未找到 Pandoc 的结果保留多久 (秒)，之后重新查找 (程序运行期间安装了 Pandoc)
+_MISSING_TTL = 60
+# 可取消的调用多久检查一次取消标记 (秒)
+_CANCEL_POLL = 0.1
+
+_lock = threading.Lock()
+_discovered = None  # (命令, 版本号, 可执行文件修改时间) 或 (FileNotFoundError, 查找时间)
+_local = threading.local()
+
+
+class PandocCancelled(Exception):
+    """Pandoc 调用被取消 (见 cancellable)"""
+
+
+def _locate_pandoc():
+    pandoc_cmd = shutil.which("pandoc")
+    if not pandoc_cmd:
+        possible_paths = [
+            r"C:\Program Files\Pandoc\pandoc.exe",
+            r"C:\Program Files (x86)\Pandoc\pandoc.exe",
+            os.path.join(os.getenv('LOCALAPPDATA', ''), 'Pandoc', 'pandoc.exe')
+        ]
+        for p in possible_paths:
+            if os.path.exists(p):
+                pandoc_cmd = p
+                break
+
+    if not pandoc_cmd:
+        raise FileNotFoundError("未找到 Pandoc")
+    return pandoc_cmd
+
+
+def _discover():
+    pandoc_cmd = _locate_pandoc()
+    version = _query_version(pandoc_cmd)
+    if _version_tuple(version) < MIN_PANDOC_VERSION:
+        raise FileNotFoundError(f"Pandoc 版本过旧 ({version})，需要 "
+                                f"{'.'.join(map(str, MIN_PANDOC_VERSION))} 以上")
+    return pandoc_cmd, version, os.stat(pandoc_cmd).st_mtime_ns
+
+
+def pandoc_info():
+    """
+    返回 (Pandoc 命令, 版本号字符串)，找不到或版本过旧时抛出 FileNotFoundError。
+
+    每个进程只查找并检查一次版本；之后每次调用只 stat 一次可执行文件，文件被替换 (升级) 时重新检查，
+    未找到的结果保留 _MISSING_TTL 秒。
+    """
+    global _discovered
+    with _lock:
+        found = _discovered
+        if found is not None and len(found) == 3:
+            try:
+                if os.stat(found[0]).st_mtime_ns != found[2]:
+                    found = None
+            except OSError:
+                found = None
+        elif found is not None and time.monotonic() - found[1] > _MISSING_TTL:
+            found = None
+        if found is None:
+            try:
+                found = _discover()
+            except (OSError, subprocess.SubprocessError) as e:
+                found = (FileNotFoundError(str(e)) if not isinstance(e, FileNotFoundError) else e,
+                         time.monotonic())
+            _discovered = found
+    if len(found) == 2:
+        raise FileNotFoundError(*found[0].args)
+    return found[0], found[1]
+
+
+def reset_pandoc():
+    """丢弃记住的查找结果 (下次调用时重新查找)"""
+    global _discovered
+    with _lock:
+        _discovered = None
+
+
+def find_pandoc():
+    """查找 Pandoc 可执行文件，找不到时抛出 FileNotFoundError"""
+    return pandoc_info()[0]
+
+
+def pandoc_version(pandoc_cmd=None):
+    """返回 Pandoc 版本号字符串，例如 '3.1.9'"""
+    try:
+        found_cmd, version = pandoc_info()
+    except FileNotFoundError:
+        if pandoc_cmd is None:
+            raise
+        found_cmd = None
+    if pandoc_cmd is None or pandoc_cmd == found_cmd:
+        return version
+    return _query_version(pandoc_cmd)
+
+
+def _query_version(pandoc_cmd):
+    out = subprocess.run([pandoc_cmd, '--version'], stdout=subprocess.PIPE, check=True, timeout=30,
+                         startupinfo=no_window_startupinfo()).stdout
+    first_line = out.decode('utf-8', errors='replace').splitlines()[0]
+    return first_line.split()[-1]
+
+
+def _version_tuple(version):
+    parts = []
+    for part in version.split('.'):
+        if not part.isdigit():
+            break
+        parts.append(int(part))
+    return tuple(parts)
+
+
+def pandoc_timeout():
+    """单次调用的超时秒数，None 表示不限"""
+    try:
+        timeout = float(os.getenv(PANDOC_TIMEOUT_ENV, PANDOC_TIMEOUT))
+    except ValueError:
+        timeout = PANDOC_TIMEOUT
+    return timeout if timeout > 0 else None
+
+
+@contextmanager
+def cancellable(event):
+    """在此范围内 (当前线程) 启动的 Pandoc 在 event 被设置时立即结束，并抛出 PandocCancelled"""
+    previous = getattr(_local, 'cancel', None)
+    _local.cancel = event
+    try:
+        yield
+    finally:
+        _local.cancel = previous
+
+
+def no_window_startupinfo():
+    """Windows 下隐藏 Pandoc 的控制台窗口"""
+    if os.name != 'nt':
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startupinfo
+
+
+def markdown_to_docx_bytes(md_bytes, resource_dir=None, extra_args=(), warnings=None):
+    """
+    通过 stdin/stdout 调用 Pandoc，直接返回 docx 的字节内容。
+
+    不在源文件夹中产生任何临时文件；resource_dir 用于解析 Markdown 中的相对图片路径。
+    给出列表 warnings 时 Pandoc 的警告追加到其中，而不是写到标准错误。
+    """
+    cmd = [
+        find_pandoc(),
+        '-f', PANDOC_INPUT_FORMAT,
+        '-t', 'docx',
+        '-o', '-',
+        '--standalone',
+    ]
+    if resource_dir:
+        cmd += ['--resource-path', resource_dir]
+    cmd += list(extra_args)
+    return _run_pandoc(cmd, md_bytes, warnings)
+
+
+def markdown_to_ast(md_bytes):
+    """通过 stdin/stdout 调用 Pandoc，返回 Markdown 的 JSON 抽象语法树 (dict，见 pandoc_ast.py)"""
+    cmd = [find_pandoc(), '-f', PANDOC_INPUT_FORMAT, '-t', 'json']
+    return json.loads(_run_pandoc(cmd, md_bytes))
+
+
+def _run_pandoc(cmd, md_bytes, warnings=None):
+    """运行 Pandoc：超过 pandoc_timeout() 时结束进程并抛出 TimeoutExpired，被取消时抛出 PandocCancelled"""
+    timeout = pandoc_timeout()
+    cancel = getattr(_local, 'cancel', None)
+    if cancel is not None and cancel.is_set():
+        raise PandocCancelled("转换已取消")
+    deadline = None if timeout is None else time.monotonic() + timeout
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            startupinfo=no_window_startupinfo())
+    pending = md_bytes
+    while True:
+        wait = _CANCEL_POLL if cancel is not None else None
+        if deadline is not None:
+            remaining = max(0.0, deadline - time.monotonic())
+            wait = remaining if wait is None else min(wait, remaining)
+        try:
+            stdout, stderr = proc.communicate(pending, timeout=wait)
+            break
+        except subprocess.TimeoutExpired:
+            pending = None  # 输入只在第一次写入
+            if cancel is not None and cancel.is_set():
+                _kill(proc)
+                raise PandocCancelled("转换已取消")
+            if deadline is not None and time.monotonic() >= deadline:
+                _kill(proc)
+                raise subprocess.TimeoutExpired(cmd, timeout)
+    if stderr and warnings is not None:
+        warnings.append(stderr.decode('utf-8', errors='replace'))
+    elif stderr:
+        # 保留 Pandoc 的警告输出 (例如找不到图片)
+        sys.stderr.write(stderr.decode('utf-8', errors='replace'))
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=stdout, stderr=stderr)
+    return stdout
+
+
+def _kill(proc):
+    proc.kill()
+    proc.communicate()
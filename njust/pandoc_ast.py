@@ -0,0 +1,380 @@
+from .config import NJUST_Config
+from .formatter import REFERENCE_TITLES, REFERENCE_ENTRY
+from .native import NativeRenderer
+
+# ==========================================
+# Pandoc JSON AST 引擎
+# ==========================================
+# Pandoc 引擎原本先让 Pandoc 写出 docx，再用 python-docx 打开、按样式名猜测段落角色
+# ('Code' in style_name / '题注' in style_name) 逐段重新格式化。
+# 这里改为 pandoc -t json 只做解析，按语法树的结构 (标题级别、代码块、题注、列表) 一次生成
+# NJUST 格式的段落，复用内置引擎的段落 / run 原型、公式、插图与三线表 (见 native.py)，正文流式写出。
+#
+# Pandoc 的 JSON 中公式为 LaTeX 源码 (OMML 只在其 docx 写出器中生成)，由 omml.py 转换；
+# YAML 元数据 (title / author 等) 不输出。段落只由纯文本 run 组成，含超链接或脚注的文档
+# 由 check_supported 拒绝，调用方改用 Pandoc 引擎 (其 docx 写出器生成 w:hyperlink 与 footnotes.xml)。
+
+# 需要 Pandoc 2.10+ 的表格 / 题注结构 (pandoc-api-version 1.21)
+MIN_API_VERSION = (1, 21)
+
+_QUOTES = {'DoubleQuote': ('“', '”'), 'SingleQuote': ('‘', '’')}
+# 只取其中文字的行内元素 (Link / Span / Cite 的文字位于 c[1])
+_TRANSPARENT = frozenset(['Underline', 'Strikeout', 'Superscript', 'Subscript', 'SmallCaps'])
+_WRAPPED = frozenset(['Link', 'Span', 'Cite'])
+# 无法以纯文本 run 表达的行内元素
+UNSUPPORTED = {'Link': '超链接', 'Note': '脚注'}
+_ROMAN = ((1000, 'm'), (900, 'cm'), (500, 'd'), (400, 'cd'), (100, 'c'), (90, 'xc'),
+          (50, 'l'), (40, 'xl'), (10, 'x'), (9, 'ix'), (5, 'v'), (4, 'iv'), (1, 'i'))
+
+
+def check_api_version(document):
+    version = tuple(document.get('pandoc-api-version', ())[:2])
+    if version < MIN_API_VERSION:
+        raise ValueError(f"Pandoc 版本过旧 (pandoc-api-version {version})，AST 引擎需要 Pandoc 2.10 以上")
+
+
+class UnsupportedContent(ValueError):
+    """文档中含有 AST 引擎无法保留的内容 (超链接、脚注)，应改用 Pandoc 引擎"""
+
+
+def check_supported(document):
+    """语法树中含有 UNSUPPORTED 中的行内元素时抛出 UnsupportedContent (在写出任何内容之前调用)"""
+    found = set()
+    stack = [document['blocks']]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, dict):
+            if n.get('t') in UNSUPPORTED:
+                found.add(n['t'])
+            if 'c' in n:
+                stack.append(n['c'])
+        elif isinstance(n, list):
+            stack.extend(n)
+    if found:
+        names = '、'.join(UNSUPPORTED[kind] for kind in UNSUPPORTED if kind in found)
+        raise UnsupportedContent(f"AST 引擎无法保留文档中的{names}")
+
+
+def inline_segments(inlines):
+    """
+    把行内元素列表转换为 [(样式, 文本)]，样式与 native.parse_inline 相同：
+    '' / 'b' / 'i' / 'code' / 'math' / 'display'，只区分最外层格式，相邻同样式片段合并。
+    """
+    segments = []
+
+    def add(style, s):
+        if not s:
+            return
+        if segments and segments[-1][0] == style:
+            segments[-1] = (style, segments[-1][1] + s)
+        else:
+            segments.append((style, s))
+
+    def walk(items, style):
+        for item in items:
+            kind, c = item['t'], item.get('c')
+            if kind == 'Str':
+                add(style, c)
+            elif kind in ('Space', 'SoftBreak'):
+                add(style, ' ')
+            elif kind == 'LineBreak':
+                add(style, '\n')
+            elif kind == 'Code':
+                add('code', c[1])
+            elif kind == 'Math':
+                segments.append(('display' if c[0]['t'] == 'DisplayMath' else 'math', c[1]))
+            elif kind == 'Strong':
+                walk(c, style or 'b')
+            elif kind == 'Emph':
+                walk(c, style or 'i')
+            elif kind in _TRANSPARENT:
+                walk(c, style)
+            elif kind in _WRAPPED:
+                walk(c[1], style)
+            elif kind == 'Quoted':
+                left, right = _QUOTES.get(c[0]['t'], ('“', '”'))
+                add(style, left)
+                walk(c[1], style)
+                add(style, right)
+            # 其余 (行内图片、RawInline、Note) 不输出文字
+
+    walk(inlines, '')
+    return segments
+
+
+def stringify(inlines):
+    """纯文本 (表格单元格、题注、参考文献识别使用，公式保留 LaTeX 原文)"""
+    parts = []
+    for style, s in inline_segments(inlines):
+        if style == 'math':
+            s = f"${s}$"
+        elif style == 'display':
+            s = f"$${s}$$"
+        parts.append(s)
+    return ''.join(parts)
+
+
+def blocks_text(blocks):
+    """块列表中各段落的纯文本，以换行连接"""
+    return '\n'.join(stringify(b['c']) for b in blocks if b['t'] in ('Para', 'Plain'))
+
+
+def iter_image_sources(node):
+    """按出现顺序列出语法树中全部图片的地址"""
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, dict):
+            if n.get('t') == 'Image':
+                yield n['c'][2][0]
+            elif 'c' in n:
+                stack.append(n['c'])
+            elif 'blocks' in n:
+                stack.append(n['blocks'])
+        elif isinstance(n, list):
+            stack.extend(reversed(n))
+
+
+def _list_label(n, style):
+    if style in ('LowerAlpha', 'UpperAlpha'):
+        label = ''
+        while n > 0:
+            n, r = divmod(n - 1, 26)
+            label = chr(ord('a') + r) + label
+        return label.upper() if style == 'UpperAlpha' else label
+    if style in ('LowerRoman', 'UpperRoman'):
+        label = ''
+        for value, numeral in _ROMAN:
+            count, n = divmod(n, value)
+            label += numeral * count
+        return label.upper() if style == 'UpperRoman' else label
+    return str(n)
+
+
+def list_markers(list_attrs, count):
+    """有序列表各项的编号文字 (起始序号、编号样式与分隔符取自 ListAttributes)"""
+    start, style, delim = list_attrs[0], list_attrs[1]['t'], list_attrs[2]['t']
+    markers = []
+    for n in range(start, start + count):
+        label = _list_label(n, style)
+        markers.append({'OneParen': f"{label}) ", 'TwoParens': f"({label}) "}.get(delim, f"{label}. "))
+    return markers
+
+
+def _is_reference_title(inlines):
+    return stringify(inlines).strip().replace(' ', '') in REFERENCE_TITLES
+
+
+def sets_references(block):
+    """渲染该块后是否进入参考文献部分 (与 AstRenderer._ast_para / _ast_header 的判定一致)"""
+    kind, c = block['t'], block.get('c')
+    if kind in ('Para', 'Plain'):
+        return _is_reference_title(c)
+    if kind == 'Header':
+        return _is_reference_title(c[2])
+    if kind == 'LineBlock':
+        return _is_reference_title([item for line in c for item in line + [{'t': 'LineBreak'}]][:-1])
+    if kind == 'BlockQuote':
+        children = c
+    elif kind == 'Div':
+        children = c[1]
+    elif kind in ('BulletList', 'OrderedList'):
+        # 列表项中的段落按列表项输出，只有嵌套的其他块可能是标题
+        items = c if kind == 'BulletList' else c[1]
+        children = [b for item in items for b in item if b['t'] not in ('Plain', 'Para')]
+    elif kind == 'DefinitionList':
+        children = [b for _term, definitions in c for blocks in definitions for b in blocks]
+    elif kind == 'Figure':
+        children = c[2]
+    else:
+        return False
+    return any(sets_references(b) for b in children)
+
+
+class AstRenderer(NativeRenderer):
+    """
+    把 Pandoc JSON 语法树转换为 w:p / w:tbl 元素。
+
+    iter_elements 接收 json.loads 后的完整文档，逐个产出块元素；
+    参考文献标题 (REFERENCE_TITLES) 之后以 [n] / n. 开头的段落与有序列表项使用参考文献格式，
+    与 post_process_doc 的判定一致。
+    """
+
+    def __init__(self, formatter, images=None):
+        super().__init__(formatter, images)
+        self._in_references = False
+
+    def iter_elements(self, document):
+        check_api_version(document)
+        blocks = document['blocks']
+        metrics = self.formatter.metrics
+        for i, block in enumerate(blocks):
+            yield from self._blocks([block])
+            metrics.advance(i + 1, len(blocks))
+
+    def render_block(self, item):
+        """渲染 keyed_blocks 产出的一个顶层块 (先恢复该块之前的参考文献状态)"""
+        self._in_references, block = item
+        return self._blocks([block])
+
+    def keyed_blocks(self, document):
+        """
+        逐个产出 (内容哈希, (参考文献状态, 顶层块))，供增量更新比较 (见 update.py)。
+
+        块的输出还取决于它是否位于参考文献标题之后，该状态计入哈希；图片按文件内容计入哈希。
+        """
+        from .update import block_key
+        check_api_version(document)
+        blocks = document['blocks']
+        metrics = self.formatter.metrics
+        in_references = False
+        for i, block in enumerate(blocks):
+            images = [p for p in map(self._resolve_image, iter_image_sources(block)) if p is not None]
+            yield block_key([in_references, block], images), (in_references, block)
+            in_references = in_references or sets_references(block)
+            metrics.advance(i + 1, len(blocks))
+
+    def image_paths(self, document):
+        """语法树中可解析的本地图片 (按出现顺序去重，供插图流水线预取)"""
+        paths = {}
+        for src in iter_image_sources(document['blocks']):
+            path = self._resolve_image(src)
+            if path is not None:
+                paths.setdefault(path)
+        return list(paths)
+
+    def _blocks(self, blocks, depth=0):
+        for block in blocks:
+            handler = getattr(self, '_ast_' + block['t'].lower(), None)
+            if handler is not None:
+                yield from handler(block.get('c'), depth)
+            # 其余 (HorizontalRule、RawBlock、Null) 不输出
+
+    # ---- 段落 ----
+    def _ast_para(self, inlines, depth):
+        text = stringify(inlines).strip()
+        if not text and not any(item['t'] == 'Image' for item in inlines):
+            return
+        if text.replace(' ', '') in REFERENCE_TITLES:
+            self._in_references = True
+            yield from self._ast_header([1, None, inlines], depth)
+            return
+        if all(item['t'] in ('Image', 'Space', 'SoftBreak', 'LineBreak') for item in inlines):
+            # 仅由图片组成的段落：每张图单独成段，替代文字作题注 (与内置引擎相同)
+            for item in inlines:
+                if item['t'] == 'Image':
+                    yield from self._image(item['c'][2][0], stringify(item['c'][1]).strip())
+            return
+        segments = inline_segments(inlines)
+        if self._in_references and REFERENCE_ENTRY.match(text):
+            p = self._new_paragraph('Bibliography' if self.style_mode else 'reference')
+            self._append_segments(p, segments, NJUST_Config.SIZE_BODY)
+            yield p
+            return
+        yield from self._body_paragraphs(segments)
+
+    _ast_plain = _ast_para
+
+    def _ast_lineblock(self, lines, depth):
+        inlines = []
+        for i, line in enumerate(lines):
+            if i:
+                inlines.append({'t': 'LineBreak'})
+            inlines.extend(line)
+        yield from self._ast_para(inlines, depth)
+
+    def _ast_header(self, c, depth):
+        level, _attr, inlines = c
+        if stringify(inlines).replace(' ', '').strip() in REFERENCE_TITLES:
+            self._in_references = True
+            level = 1 if not self.style_mode else level
+        if self.style_mode:
+            p = self._new_paragraph(f'Heading {min(level, 4)}')
+            self._append_segments(p, inline_segments(inlines))
+        else:
+            size = {1: NJUST_Config.SIZE_TITLE_1, 2: NJUST_Config.SIZE_TITLE_2}.get(level, NJUST_Config.SIZE_TITLE_3)
+            p = self._new_paragraph(f'heading{min(level, 3)}')
+            self._append_segments(p, inline_segments(inlines), size, bold=True)
+        yield p
+
+    def _ast_codeblock(self, c, depth):
+        yield from self._block_code(c[1])
+
+    # ---- 容器 ----
+    def _ast_blockquote(self, blocks, depth):
+        yield from self._blocks(blocks, depth)
+
+    def _ast_div(self, c, depth):
+        yield from self._blocks(c[1], depth)
+
+    def _ast_definitionlist(self, items, depth):
+        for term, definitions in items:
+            p = self._new_paragraph('Body Text' if self.style_mode else 'body')
+            self._append_segments(p, [('b', stringify(term))], NJUST_Config.SIZE_BODY)
+            yield p
+            for blocks in definitions:
+                yield from self._blocks(blocks, depth)
+
+    # ---- 列表 ----
+    def _ast_bulletlist(self, items, depth):
+        yield from self._list(items, ['● '] * len(items), depth)
+
+    def _ast_orderedlist(self, c, depth):
+        list_attrs, items = c
+        yield from self._list(items, list_markers(list_attrs, len(items)), depth, ordered=True)
+
+    def _list(self, items, markers, depth, ordered=False):
+        references = ordered and self._in_references and depth == 0
+        for marker, blocks in zip(markers, items):
+            for i, block in enumerate(blocks):
+                if block['t'] not in ('Plain', 'Para'):
+                    yield from self._blocks([block], depth + 1 if block['t'].endswith('List') else depth)
+                    continue
+                segments = inline_segments(block['c'])
+                if i == 0:
+                    if segments and segments[0][0] == '':
+                        segments[0] = ('', marker + segments[0][1])
+                    else:
+                        segments.insert(0, ('', marker))
+                if references:
+                    p = self._new_paragraph('Bibliography' if self.style_mode else 'reference')
+                else:
+                    p = self._new_paragraph(f"{'List Paragraph' if self.style_mode else 'list'}:{depth}")
+                self._append_segments(p, segments, NJUST_Config.SIZE_BODY)
+                yield p
+
+    # ---- 插图与表格 ----
+    def _ast_figure(self, c, depth):
+        _attr, caption, blocks = c
+        caption_text = blocks_text(caption[1]).strip()
+        inlines = [item for b in blocks if b['t'] in ('Para', 'Plain') for item in b['c']]
+        images = [item for item in inlines if item['t'] == 'Image']
+        if images and len(blocks) == 1 and all(item['t'] in ('Image', 'Space', 'SoftBreak') for item in inlines):
+            for item in images:
+                yield from self._image(item['c'][2][0], caption_text or stringify(item['c'][1]).strip())
+            return
+        yield from self._blocks(blocks, depth)
+        if caption_text:
+            yield self._caption(f"图 {caption_text}", 'Image Caption')
+
+    def _ast_table(self, c, depth):
+        _attr, caption, _colspecs, head, bodies, foot = c
+        rows = [self._table_row(row) for row in head[1]]
+        for body in bodies:
+            rows.extend(self._table_row(row) for row in body[2] + body[3])
+        rows.extend(self._table_row(row) for row in foot[1])
+        if not rows:
+            return
+        caption_text = blocks_text(caption[1]).strip()
+        if caption_text:
+            yield self._caption(f"表 {caption_text}", 'Table Caption')
+        col_count = max(len(row) for row in rows)
+        yield from self._block_table([row + [''] * (col_count - len(row)) for row in rows])
+
+    @staticmethod
+    def _table_row(row):
+        cells = []
+        for _attr, _align, _rowspan, colspan, blocks in row[1]:
+            cells.append(blocks_text(blocks).strip())
+            cells.extend([''] * (colspan - 1))
+        return cells
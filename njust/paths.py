@@ -0,0 +1,22 @@
+import os
+
+# ==========================================
+# 缓存目录：只依赖标准库，命令行客户端也可使用
+# ==========================================
+
+def cache_dir(*parts):
+    """
+    返回 (并创建) 本工具的缓存目录。
+
+    可通过环境变量 NJUST_CACHE_DIR 指定；默认 Windows 下位于 %LOCALAPPDATA%\\NJUST\\cache，
+    其他系统位于 $XDG_CACHE_HOME/njust (或 ~/.cache/njust)。
+    """
+    base = os.getenv('NJUST_CACHE_DIR')
+    if not base:
+        if os.name == 'nt' and os.getenv('LOCALAPPDATA'):
+            base = os.path.join(os.getenv('LOCALAPPDATA'), 'NJUST', 'cache')
+        else:
+            base = os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'njust')
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
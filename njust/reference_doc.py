@@ -0,0 +1,67 @@
+import os
+import threading
+import subprocess
+
+from docx import Document
+
+from .config import NJUST_Config, config_fingerprint
+from .paths import cache_dir
+from .pandoc import find_pandoc, pandoc_version, no_window_startupinfo
+from .styles import apply_njust_styles
+
+# ==========================================
+# NJUST reference.docx：供 Pandoc --reference-doc 使用
+# ==========================================
+# 生成逻辑变化时递增，使旧缓存失效
+REFERENCE_DOC_REVISION = 2
+
+
+def _default_reference_docx(pandoc_cmd, path):
+    """导出当前 Pandoc 自带的 reference.docx (包含 Pandoc 会用到的全部样式)"""
+    subprocess.run([pandoc_cmd, '-o', path, '--print-default-data-file', 'reference.docx'],
+                   check=True, timeout=60, startupinfo=no_window_startupinfo())
+
+
+def build_reference_docx(path, pandoc_cmd=None):
+    """以 Pandoc 默认模板为基础，写入 NJUST 样式与页面设置"""
+    pandoc_cmd = pandoc_cmd or find_pandoc()
+    _default_reference_docx(pandoc_cmd, path)
+
+    doc = Document(path)
+    section = doc.sections[0]
+    section.page_width = NJUST_Config.PAGE_WIDTH
+    section.page_height = NJUST_Config.PAGE_HEIGHT
+    section.top_margin = NJUST_Config.MARGIN_TOP
+    section.bottom_margin = NJUST_Config.MARGIN_BOTTOM
+    section.left_margin = NJUST_Config.MARGIN_LEFT
+    section.right_margin = NJUST_Config.MARGIN_RIGHT
+    section.header_distance = NJUST_Config.HEADER_DIST
+    section.footer_distance = NJUST_Config.FOOTER_DIST
+
+    apply_njust_styles(doc)
+    doc.save(path)
+    return path
+
+
+def reference_docx_path(pandoc_cmd=None):
+    """
+    返回与当前配置匹配的 reference.docx 路径，不存在时生成。
+
+    缓存键 = NJUST_Config 哈希 + Pandoc 版本 + 生成逻辑版本，任一变化都会重新生成。
+    """
+    pandoc_cmd = pandoc_cmd or find_pandoc()
+    version = pandoc_version(pandoc_cmd).replace('.', '_')
+    name = f"reference-{config_fingerprint()}-pandoc{version}-r{REFERENCE_DOC_REVISION}.docx"
+    path = os.path.join(cache_dir('reference'), name)
+    if os.path.exists(path):
+        return path
+
+    # 先写临时文件再原子替换，避免并发转换 (多进程或调度器的多个线程) 读到半成品
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        build_reference_docx(tmp_path, pandoc_cmd)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
@@ -0,0 +1,310 @@
+import os
+import time
+import threading
+import traceback
+from contextlib import nullcontext
+from collections import deque, OrderedDict
+
+# ==========================================
+# 转换调度器：GUI、文件夹监控与批量转换共用的有界任务队列
+# ==========================================
+# 固定数量的工作线程从队列中取任务，不再为每个文件新建线程；
+# 同一路径在排队期间重复提交只保留一个任务，排队中的任务可以取消。
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# status() 可查询的已结束任务数 (常驻服务与文件夹监控中按最近结束的顺序保留)
+HISTORY_LIMIT = 256
+
+
+class ConversionJob:
+    """一次转换任务。状态只由调度器更新，回调中只读"""
+
+    def __init__(self, path, origin=None):
+        self.path = path
+        self.origin = origin  # 任务来源，例如 'drop' / 'watch' / 'batch'
+        self.status = QUEUED
+        self.message = ''
+        self.output_path = None
+        self.error = None
+        self.traceback = None
+        self.progress = 0.0  # 0..1，由 metrics 在转换线程中更新 (进程模式下只在结束时更新)
+        self.stage = None
+        self.metrics = None  # 结束后为该次转换的 ConversionMetrics
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+        self._cancel = threading.Event()  # 执行中取消：结束正在运行的 Pandoc (仅线程模式)
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def wait(self, timeout=None):
+        """等待该任务结束 (完成 / 失败 / 取消)，超时返回 False"""
+        return self._done.wait(timeout)
+
+    def _finish(self, status):
+        self.status = status
+        self.finished_at = time.time()
+        self._done.set()
+
+    def __repr__(self):
+        return f"<ConversionJob {os.path.basename(self.path)} {self.status}>"
+
+
+def iter_markdown(folder, recursive=False):
+    """列出文件夹中的 .md 文件 (按路径排序，保证处理顺序稳定)"""
+    if recursive:
+        found = []
+        for root, _dirs, files in os.walk(folder):
+            found.extend(os.path.join(root, f) for f in files if f.lower().endswith('.md'))
+        return sorted(found)
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                  if f.lower().endswith('.md') and os.path.isfile(os.path.join(folder, f)))
+
+
+def _convert_in_process(path, options):
+    """进程池任务 (子进程中无法回传进度提示)，返回 (输出路径, ConversionMetrics)"""
+    from .formatter import convert_file
+    from .metrics import ConversionMetrics
+    metrics = ConversionMetrics(path)
+    return convert_file(path, metrics=metrics, **options), metrics
+
+
+class ConversionScheduler:
+    """
+    有界并发的转换队列。
+
+    max_workers: 同时进行的转换数；processes=True 时每次转换在独立进程中执行 (绕开 GIL)；
+    on_event(job): 任务状态或进度提示变化时调用 (在工作线程中调用)；
+    on_progress(job): 执行中任务的进度值 (job.progress / job.stage) 变化时调用 (同上，仅线程模式)；
+    slots: 多个调度器共享并发上限时传入同一个 threading.Semaphore，每次转换前获取 (等待期间任务已是 RUNNING)；
+    其余关键字参数原样传给 convert_file (engine / format_mode / use_cache / workers)。
+    """
+
+    def __init__(self, max_workers=2, on_event=None, processes=False, on_progress=None, slots=None,
+                 **convert_options):
+        self.max_workers = max(1, max_workers)
+        self.on_event = on_event
+        self.on_progress = on_progress
+        self.processes = processes
+        self.slots = slots
+        self.convert_options = convert_options
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._queued = {}   # key -> 排队中的任务
+        self._running = {}  # key -> 执行中的任务
+        self._finished = OrderedDict()  # key -> 该路径最近结束的任务 (最多 HISTORY_LIMIT 个)
+        self._threads = []
+        self._pool = None
+        self._closed = False
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    # ---- 提交与取消 ----
+    def submit(self, path, origin=None):
+        """提交文件；该路径已在排队时返回已有任务 (执行中的同一文件会再排一次，以转换最新内容)"""
+        key = self._key(path)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("调度器已关闭")
+            job = self._queued.get(key)
+            if job is not None:
+                return job
+            job = ConversionJob(path, origin)
+            self._queue.append((key, job))
+            self._queued[key] = job
+            if len(self._threads) < min(self.max_workers, len(self._queue) + len(self._running)):
+                thread = threading.Thread(target=self._worker, name=f"njust-convert-{len(self._threads)}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        self._emit(job)
+        return job
+
+    def submit_folder(self, folder, recursive=False, origin='batch'):
+        """提交文件夹中的全部 .md 文件，返回任务列表"""
+        return [self.submit(path, origin=origin) for path in iter_markdown(folder, recursive)]
+
+    def cancel(self, path, running=False):
+        """
+        取消排队中的任务，返回是否取消成功。
+
+        running=True 时同时中断该文件正在进行的转换：结束其 Pandoc 进程，任务状态为 CANCELLED
+        (进程模式与内置引擎的转换无法中断，会照常完成)。
+        """
+        key = self._key(path)
+        with self._cond:
+            job = self._queued.pop(key, None)
+            if job is None:
+                job = self._running.get(key) if running else None
+                if job is None:
+                    return False
+                job._cancel.set()
+                return True
+            self._queue.remove((key, job))
+            self._finish(key, job, CANCELLED)
+            self._cond.notify_all()
+        self._emit(job)
+        return True
+
+    def cancel_all(self, running=False):
+        """取消全部排队中的任务 (running=True 时同时中断执行中的转换，见 cancel)，返回取消数量"""
+        with self._cond:
+            if running:
+                for job in self._running.values():
+                    job._cancel.set()
+            cancelled = [job for _key, job in self._queue]
+            for key, job in self._queue:
+                self._finish(key, job, CANCELLED)
+            self._queue.clear()
+            self._queued.clear()
+            self._cond.notify_all()
+        for job in cancelled:
+            self._emit(job)
+        return len(cancelled)
+
+    # ---- 查询 ----
+    def status(self, path):
+        """该路径最近一次提交的任务 (没有或已结束太久、超出 HISTORY_LIMIT 时返回 None)"""
+        key = self._key(path)
+        with self._cond:
+            return self._queued.get(key) or self._running.get(key) or self._finished.get(key)
+
+    @property
+    def pending_count(self):
+        with self._cond:
+            return len(self._queue)
+
+    @property
+    def running_count(self):
+        with self._cond:
+            return len(self._running)
+
+    def wait(self, timeout=None):
+        """等待队列清空且没有正在执行的任务，超时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, wait=True, cancel_pending=False, cancel_running=False):
+        """
+        停止接收新任务；cancel_pending=True 时丢弃排队任务，cancel_running=True 时中断执行中的 Pandoc，
+        wait=True 时等待执行中的任务结束。
+        """
+        if cancel_pending or cancel_running:
+            with self._cond:
+                if cancel_running:
+                    for job in self._running.values():
+                        job._cancel.set()
+            if cancel_pending:
+                self.cancel_all()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+            if self._pool is not None:
+                self._pool.shutdown()
+
+    # ---- 执行 ----
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    item = self._next_runnable()
+                    if item is not None or (self._closed and not self._queue):
+                        break
+                    self._cond.wait()
+                if item is None:
+                    return
+                key, job = item
+                self._queue.remove(item)
+                del self._queued[key]
+                self._running[key] = job
+                job.status = RUNNING
+                job.started_at = time.time()
+            self._emit(job)
+
+            try:
+                with self.slots or nullcontext():
+                    job.output_path = self._convert(job)
+                job.progress = 1.0
+                status = DONE
+            except Exception as e:
+                job.error = str(e)
+                job.traceback = traceback.format_exc()
+                status = CANCELLED if job._cancel.is_set() else FAILED
+
+            with self._cond:
+                del self._running[key]
+                self._finish(key, job, status)
+                self._cond.notify_all()
+            self._emit(job)
+
+    def _finish(self, key, job, status):
+        """结束任务并记入 _finished (调用方持有 self._cond)"""
+        job._finish(status)
+        self._finished[key] = job
+        self._finished.move_to_end(key)
+        while len(self._finished) > HISTORY_LIMIT:
+            self._finished.popitem(last=False)
+
+    def _next_runnable(self):
+        """队列中第一个可以开始的任务：同一文件正在转换时，其新任务要等上一次完成"""
+        for item in self._queue:
+            if item[0] not in self._running:
+                return item
+        return None
+
+    def _convert(self, job):
+        if self.processes:
+            with self._cond:
+                if self._pool is None:
+                    from concurrent.futures import ProcessPoolExecutor
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            output_path, job.metrics = self._pool.submit(_convert_in_process, job.path,
+                                                         self.convert_options).result()
+            return output_path
+
+        from .formatter import convert_file
+        from .metrics import ConversionMetrics
+        from .pandoc import cancellable
+
+        def on_info(msg):
+            job.message = msg
+            self._emit(job)
+
+        def on_progress(value, stage):
+            job.progress = value
+            job.stage = stage
+            if self.on_progress is not None:
+                self._emit(job, self.on_progress)
+        job.metrics = ConversionMetrics(job.path, on_progress=on_progress)
+        with cancellable(job._cancel):
+            return convert_file(job.path, on_info=on_info, metrics=job.metrics, **self.convert_options)
+
+    def _emit(self, job, handler=None):
+        handler = handler or self.on_event
+        if handler is None:
+            return
+        try:
+            handler(job)
+        except Exception as e:
+            print(f"Scheduler event handler failed: {e}")
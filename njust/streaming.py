@@ -0,0 +1,142 @@
+import os
+import copy
+import zipfile
+
+from lxml import etree
+from docx.image.constants import MIME_TYPE
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.oxml import CT_Types, serialize_part_xml
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.spec import default_content_types
+
+# ==========================================
+# 流式写出 docx (内置引擎)
+# ==========================================
+# Document.save 先在内存中拼出完整的正文树，再整体序列化为 word/document.xml；
+# 几百页的论文 (大量表格 / 附录日志) 在保存时要同时持有元素树与序列化后的字节。
+# 这里只保留文档骨架 (样式、页面设置、sectPr)，正文元素由生成器逐个产出，
+# 每攒满一批就序列化进 zip 条目并从树中移除，峰值内存只与批大小有关。
+
+# 每批序列化的块元素数
+BATCH_SIZE = 256
+
+# python-docx 能识别的图片类型 (Image.content_type 的取值)
+_IMAGE_CONTENT_TYPES = {MIME_TYPE.BMP, MIME_TYPE.GIF, MIME_TYPE.JPEG, MIME_TYPE.PNG, MIME_TYPE.TIFF}
+
+_BODY_MARKER = 'njust-streaming-body'
+
+
+def _content_types(parts):
+    """
+    [Content_Types].xml 必须先于正文写出，而图片部件在正文生成过程中才出现：
+    除骨架中已有部件的类型外，预先为所有图片扩展名登记 Default (与 python-docx 同样排序)。
+    """
+    defaults = {'rels': CT.OPC_RELATIONSHIPS, 'xml': CT.XML}
+    overrides = {}
+    for ext, content_type in default_content_types:
+        if content_type in _IMAGE_CONTENT_TYPES:
+            defaults[ext] = content_type
+    for part in parts:
+        ext = part.partname.ext
+        if (ext.lower(), part.content_type) in default_content_types:
+            defaults[ext.lower()] = part.content_type
+        else:
+            overrides[part.partname] = part.content_type
+    return defaults, overrides
+
+
+def _content_types_blob(defaults, overrides):
+    types = CT_Types.new()
+    for ext in sorted(defaults):
+        types.add_default(ext, defaults[ext])
+    for partname in sorted(overrides):
+        types.add_override(partname, overrides[partname])
+    return serialize_part_xml(types)
+
+
+def _check_content_types(parts, defaults, overrides):
+    """确认正文生成后新增的部件都已被预先写出的 [Content_Types].xml 覆盖"""
+    for part in parts:
+        if part.partname in overrides:
+            continue
+        if defaults.get(part.partname.ext.lower()) != part.content_type:
+            raise ValueError(f"未登记内容类型的部件: {part.partname} ({part.content_type})")
+
+
+def _envelope(document_element):
+    """word/document.xml 中正文之前与之后的字节 (调用时正文应已清空)"""
+    root = copy.deepcopy(document_element)
+    root.body.text = _BODY_MARKER
+    head, tail = serialize_part_xml(root).split(_BODY_MARKER.encode('ascii'))
+    return head, tail
+
+
+def _children_xml(body):
+    """序列化 body 的全部子元素 (去掉 body 自身的起止标签与命名空间声明)"""
+    xml = etree.tostring(body, encoding='UTF-8')
+    return xml[xml.index(b'>') + 1:xml.rindex(b'</')]
+
+
+def write_streaming_docx(doc, elements, target, batch_size=BATCH_SIZE, on_batch=None, on_document=None):
+    """
+    把骨架文档 doc 与逐个产出的正文元素写为 docx。
+
+    elements 为 w:p / w:tbl 等块元素的可迭代对象 (如 NativeRenderer.iter_elements)，
+    生成过程中可以继续向 doc.part 添加图片等部件；target 为路径或可写的二进制文件对象。
+    写出的部件与 Document.save 相同，仅 zip 条目顺序不同；写出后 doc 的正文只剩最后一批，不应再保存。
+    on_batch(body) 在每批序列化之前调用 (例如统计元素数)；
+    on_document(zipinfo) 在 word/document.xml 写完、其余部件写出之前调用 (例如记录其 CRC，见 update.py)。
+    """
+    package = doc.part.package
+    document_part = doc.part
+    body = doc.element.body
+    sectPr = body.sectPr
+    if sectPr is not None:
+        body.remove(sectPr)
+    for child in list(body):
+        body.remove(child)
+
+    for part in package.parts:
+        part.before_marshal()
+    defaults, overrides = _content_types(package.parts)
+    head, tail = _envelope(doc.element)
+
+    try:
+        with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(CONTENT_TYPES_URI.membername, _content_types_blob(defaults, overrides))
+            zf.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+
+            with zf.open(document_part.partname.membername, 'w') as out:
+                out.write(head)
+                pending = 0
+                for el in elements:
+                    body.append(el)
+                    pending += 1
+                    if pending >= batch_size:
+                        if on_batch is not None:
+                            on_batch(body)
+                        out.write(_children_xml(body))
+                        del body[:]
+                        pending = 0
+                if on_batch is not None and len(body):
+                    on_batch(body)
+                if sectPr is not None:
+                    body.append(sectPr)
+                if len(body):
+                    out.write(_children_xml(body))
+                out.write(tail)
+            if on_document is not None:
+                on_document(zf.getinfo(document_part.partname.membername))
+
+            parts = list(package.parts)
+            _check_content_types(parts, defaults, overrides)
+            for part in parts:
+                if part is not document_part:
+                    zf.writestr(part.partname.membername, part.blob)
+                if len(part.rels):
+                    zf.writestr(part.partname.rels_uri.membername, part.rels.xml)
+    except BaseException:
+        if isinstance(target, (str, os.PathLike)) and os.path.exists(target):
+            os.remove(target)
+        raise
+    return target
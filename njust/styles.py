@@ -0,0 +1,242 @@
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
+from docx.shared import Pt, RGBColor
+from docx.oxml.ns import qn
+from docx.oxml import OxmlElement
+
+from .config import NJUST_Config
+
+# ==========================================
+# 样式级格式定义：把 NJUST 规范写进 styles.xml
+# ==========================================
+# 每一项: (样式名, 样式类型, 基准样式, 字符格式, 段落格式)
+# 字符格式: size / bold / italic / code / underline
+# 段落格式: align / exact (固定行距) / single / first / left / before / after / shading
+_BODY_PARA = dict(align=WD_ALIGN_PARAGRAPH.JUSTIFY, exact=True, first=Pt(24), left=Pt(0),
+                  before=Pt(0), after=Pt(0))
+_CENTER_PARA = dict(align=WD_ALIGN_PARAGRAPH.CENTER, first=Pt(0), left=Pt(0))
+
+
+def _heading_para(space):
+    return dict(align=WD_ALIGN_PARAGRAPH.LEFT, single=True, first=Pt(0), left=Pt(0),
+                before=Pt(space), after=Pt(space))
+
+
+def style_specs():
+    """根据 NJUST_Config 生成样式表 (每次调用都重新读取配置)"""
+    P, C = WD_STYLE_TYPE.PARAGRAPH, WD_STYLE_TYPE.CHARACTER
+    return [
+        ('Normal', P, None, dict(size=NJUST_Config.SIZE_BODY), dict(exact=True)),
+        ('Body Text', P, 'Normal', dict(size=NJUST_Config.SIZE_BODY), _BODY_PARA),
+        ('First Paragraph', P, 'Body Text', dict(size=NJUST_Config.SIZE_BODY), _BODY_PARA),
+        ('Compact', P, 'Body Text', dict(size=NJUST_Config.SIZE_BODY), _BODY_PARA),
+        ('List Paragraph', P, 'Normal', dict(size=NJUST_Config.SIZE_BODY),
+         dict(_BODY_PARA, first=Pt(-21), left=Pt(21))),
+        ('Heading 1', P, 'Normal', dict(size=NJUST_Config.SIZE_TITLE_1, bold=True), _heading_para(18)),
+        ('Heading 2', P, 'Normal', dict(size=NJUST_Config.SIZE_TITLE_2, bold=True), _heading_para(12)),
+        ('Heading 3', P, 'Normal', dict(size=NJUST_Config.SIZE_TITLE_3, bold=True), _heading_para(6)),
+        ('Heading 4', P, 'Normal', dict(size=NJUST_Config.SIZE_TITLE_4, bold=True), _heading_para(6)),
+        ('Caption', P, 'Normal', dict(size=NJUST_Config.SIZE_CAPTION), _CENTER_PARA),
+        ('Image Caption', P, 'Caption', dict(size=NJUST_Config.SIZE_CAPTION), _CENTER_PARA),
+        ('Table Caption', P, 'Caption', dict(size=NJUST_Config.SIZE_CAPTION), _CENTER_PARA),
+        ('Table Text', P, 'Normal', dict(size=NJUST_Config.SIZE_CAPTION), _CENTER_PARA),
+        ('Figure', P, 'Normal', dict(size=NJUST_Config.SIZE_BODY), _CENTER_PARA),
+        ('Captioned Figure', P, 'Figure', dict(size=NJUST_Config.SIZE_BODY), _CENTER_PARA),
+        ('Source Code', P, 'Normal', dict(size=NJUST_Config.SIZE_CODE, code=True),
+         dict(align=WD_ALIGN_PARAGRAPH.LEFT, single=True, first=Pt(0), left=Pt(0),
+              before=Pt(2), after=Pt(2), shading='F5F5F5')),
+        ('Bibliography', P, 'Normal', dict(size=NJUST_Config.SIZE_BODY),
+         dict(align=WD_ALIGN_PARAGRAPH.JUSTIFY, exact=True, first=Pt(-21), left=Pt(21),
+              before=Pt(0), after=Pt(0))),
+        ('Verbatim Char', C, None, dict(size=NJUST_Config.SIZE_BODY, code=True), None),
+        ('Hyperlink', C, None, dict(underline=False), None),
+    ]
+
+
+def _set_style_fonts(rPr, ascii_font):
+    """写入中西文复合字体，并清除主题字体属性 (否则 Word 优先使用主题字体)"""
+    fonts = rPr.get_or_add_rFonts()
+    for attr in ['asciiTheme', 'eastAsiaTheme', 'hAnsiTheme', 'cstheme']:
+        attr_name = qn('w:' + attr)
+        if attr_name in fonts.attrib:
+            del fonts.attrib[attr_name]
+    fonts.set(qn('w:ascii'), ascii_font)
+    fonts.set(qn('w:hAnsi'), ascii_font)
+    fonts.set(qn('w:eastAsia'), NJUST_Config.FONT_CN)
+    fonts.set(qn('w:cs'), ascii_font)
+
+
+# OOXML 要求子元素按固定顺序出现，插入时需给出其后继元素
+_SZCS_SUCCESSORS = ('w:highlight', 'w:u', 'w:effect', 'w:bdr', 'w:shd', 'w:fitText', 'w:vertAlign',
+                    'w:rtl', 'w:cs', 'w:em', 'w:lang', 'w:eastAsianLayout', 'w:specVanish', 'w:oMath')
+_SHD_SUCCESSORS = ('w:tabs', 'w:suppressAutoHyphens', 'w:kinsoku', 'w:wordWrap', 'w:overflowPunct',
+                   'w:topLinePunct', 'w:autoSpaceDE', 'w:autoSpaceDN', 'w:bidi', 'w:adjustRightInd',
+                   'w:snapToGrid', 'w:spacing', 'w:ind', 'w:contextualSpacing', 'w:mirrorIndents',
+                   'w:suppressOverlap', 'w:jc', 'w:textDirection', 'w:textAlignment',
+                   'w:textboxTightWrap', 'w:outlineLvl', 'w:divId', 'w:cnfStyle', 'w:rPr',
+                   'w:sectPr', 'w:pPrChange')
+_TBL_BORDERS_SUCCESSORS = ('w:shd', 'w:tblLayout', 'w:tblCellMar', 'w:tblLook', 'w:tblCaption',
+                           'w:tblDescription', 'w:tblPrChange')
+
+
+def _set_size_cs(rPr, size):
+    szCs = rPr.find(qn('w:szCs'))
+    if szCs is None:
+        szCs = OxmlElement('w:szCs')
+        rPr.insert_element_before(szCs, *_SZCS_SUCCESSORS)
+    szCs.set(qn('w:val'), str(int(size.pt * 2)))
+
+
+def set_style_size(style, size):
+    """设置样式的字号 (同时写入复杂文种字号 szCs)"""
+    style.font.size = size
+    _set_size_cs(style.element.get_or_add_rPr(), size)
+
+
+def _set_shading(pPr, fill):
+    shd = pPr.find(qn('w:shd'))
+    if shd is None:
+        shd = OxmlElement('w:shd')
+        pPr.insert_element_before(shd, *_SHD_SUCCESSORS)
+    shd.set(qn('w:val'), 'clear')
+    shd.set(qn('w:color'), 'auto')
+    shd.set(qn('w:fill'), fill)
+
+
+def define_style(doc, name, style_type, base, run_fmt, para_fmt):
+    """创建或覆盖一个样式定义"""
+    styles = doc.styles
+    if name in styles:
+        style = styles[name]
+    else:
+        style = styles.add_style(name, style_type)
+        style.quick_style = True
+    if base and base in styles and style.style_id != styles[base].style_id:
+        style.base_style = styles[base]
+
+    font = style.font
+    if 'size' in run_fmt:
+        set_style_size(style, run_fmt['size'])
+    # 段落样式显式关闭加粗/斜体；字符样式只写入指定的属性，以免覆盖所在段落
+    if style_type == WD_STYLE_TYPE.PARAGRAPH or 'bold' in run_fmt:
+        font.bold = run_fmt.get('bold', False)
+    if style_type == WD_STYLE_TYPE.PARAGRAPH or 'italic' in run_fmt:
+        font.italic = run_fmt.get('italic', False)
+    font.color.rgb = RGBColor(0, 0, 0)
+    if 'underline' in run_fmt:
+        font.underline = run_fmt['underline']
+    if 'size' in run_fmt or run_fmt.get('code'):
+        ascii_font = NJUST_Config.FONT_CODE if run_fmt.get('code') else NJUST_Config.FONT_EN
+        _set_style_fonts(style.element.get_or_add_rPr(), ascii_font)
+
+    if para_fmt is None:
+        return style
+    pf = style.paragraph_format
+    if 'align' in para_fmt:
+        pf.alignment = para_fmt['align']
+    if para_fmt.get('exact'):
+        pf.line_spacing_rule = WD_LINE_SPACING.EXACTLY
+        pf.line_spacing = NJUST_Config.LINE_SPACING_BODY
+    elif para_fmt.get('single'):
+        pf.line_spacing_rule = WD_LINE_SPACING.SINGLE
+    if 'first' in para_fmt:
+        pf.first_line_indent = para_fmt['first']
+    if 'left' in para_fmt:
+        pf.left_indent = para_fmt['left']
+    if 'before' in para_fmt:
+        pf.space_before = para_fmt['before']
+    if 'after' in para_fmt:
+        pf.space_after = para_fmt['after']
+    if 'shading' in para_fmt:
+        _set_shading(style.element.get_or_add_pPr(), para_fmt['shading'])
+    return style
+
+
+def _set_doc_defaults(doc):
+    """docDefaults 中的主题字体同样替换为宋体 / Times New Roman"""
+    doc_defaults = doc.styles.element.find(qn('w:docDefaults'))
+    if doc_defaults is None:
+        return
+    rPr = doc_defaults.find(qn('w:rPrDefault') + '/' + qn('w:rPr'))
+    if rPr is not None:
+        _set_style_fonts(rPr, NJUST_Config.FONT_EN)
+
+
+def _mk_border(name, val, sz, color):
+    b = OxmlElement(f'w:{name}')
+    b.set(qn('w:val'), val)
+    b.set(qn('w:sz'), sz)
+    b.set(qn('w:space'), '0')
+    b.set(qn('w:color'), color)
+    return b
+
+
+def define_three_line_table_style(doc, name='Table'):
+    """在表格样式中定义三线表边框 (顶/底粗线 + 表头下细线)"""
+    styles = doc.styles
+    if name in styles:
+        style = styles[name]
+    else:
+        style = styles.add_style(name, WD_STYLE_TYPE.TABLE)
+    style_el = style.element
+
+    tblPr = style_el.find(qn('w:tblPr'))
+    if tblPr is None:
+        tblPr = OxmlElement('w:tblPr')
+        style_el.insert_element_before(tblPr, 'w:trPr', 'w:tcPr', 'w:tblStylePr')
+    tblBorders = tblPr.find(qn('w:tblBorders'))
+    if tblBorders is not None:
+        tblPr.remove(tblBorders)
+    tblBorders = OxmlElement('w:tblBorders')
+    tblBorders.append(_mk_border('top', 'single', '12', '000000'))
+    tblBorders.append(_mk_border('left', 'nil', '0', 'auto'))
+    tblBorders.append(_mk_border('bottom', 'single', '12', '000000'))
+    tblBorders.append(_mk_border('right', 'nil', '0', 'auto'))
+    tblBorders.append(_mk_border('insideH', 'nil', '0', 'auto'))
+    tblBorders.append(_mk_border('insideV', 'nil', '0', 'auto'))
+    tblPr.insert_element_before(tblBorders, *_TBL_BORDERS_SUCCESSORS)
+    jc = tblPr.find(qn('w:jc'))
+    if jc is None:
+        jc = OxmlElement('w:jc')
+        tblPr.insert_element_before(jc, 'w:tblCellSpacing', 'w:tblInd', 'w:tblBorders',
+                                    *_TBL_BORDERS_SUCCESSORS)
+    jc.set(qn('w:val'), 'center')
+
+    # 单元格内容垂直居中
+    tcPr = style_el.find(qn('w:tcPr'))
+    if tcPr is None:
+        tcPr = OxmlElement('w:tcPr')
+        style_el.insert_element_before(tcPr, 'w:tblStylePr')
+    vAlign = tcPr.find(qn('w:vAlign'))
+    if vAlign is None:
+        vAlign = OxmlElement('w:vAlign')
+        tcPr.append(vAlign)
+    vAlign.set(qn('w:val'), 'center')
+
+    # 表头行 (firstRow) 下边框
+    for old in style_el.findall(qn('w:tblStylePr')):
+        if old.get(qn('w:type')) == 'firstRow':
+            style_el.remove(old)
+    first_row = OxmlElement('w:tblStylePr')
+    first_row.set(qn('w:type'), 'firstRow')
+    tcPr = OxmlElement('w:tcPr')
+    tcBorders = OxmlElement('w:tcBorders')
+    tcBorders.append(_mk_border('bottom', 'single', '6', '000000'))
+    tcPr.append(tcBorders)
+    first_row.append(tcPr)
+    style_el.append(first_row)
+    return style
+
+
+# 由 NJUST 样式直接负责格式的段落样式名 (样式模式下这些段落无需再处理)
+NJUST_PARAGRAPH_STYLES = frozenset(
+    name for name, style_type, _base, _run, _para in style_specs() if style_type == WD_STYLE_TYPE.PARAGRAPH
+)
+
+
+def apply_njust_styles(doc):
+    """把 NJUST 规范的全部样式写入文档的 styles.xml"""
+    _set_doc_defaults(doc)
+    for name, style_type, base, run_fmt, para_fmt in style_specs():
+        define_style(doc, name, style_type, base, run_fmt, para_fmt)
+    define_three_line_table_style(doc)
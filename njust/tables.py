@@ -0,0 +1,239 @@
+import copy
+from functools import lru_cache
+
+from docx.oxml.ns import qn
+from docx.oxml import OxmlElement
+
+from .templates import apply_paragraph_template, apply_run_template, insert_ordered
+
+# ==========================================
+# 三线表：直接在 w:tbl 上批量构建与格式化
+# ==========================================
+# python-docx 的 table.rows / row.cells / table.cell(i, j) 每次都会重新计算单元格网格，
+# 大表 (附录中数千行的数据表) 会退化为平方复杂度。这里只按行、按单元格顺序遍历一次 XML。
+
+W_TR = qn('w:tr')
+W_TC = qn('w:tc')
+W_P = qn('w:p')
+W_R = qn('w:r')
+W_VAL = qn('w:val')
+W_PPR = qn('w:pPr')
+W_PSTYLE = qn('w:pStyle')
+W_TCPR = qn('w:tcPr')
+W_VALIGN = qn('w:vAlign')
+
+_TCPR_ORDER = {qn(tag): i for i, tag in enumerate((
+    'w:cnfStyle', 'w:tcW', 'w:gridSpan', 'w:hMerge', 'w:vMerge', 'w:tcBorders', 'w:shd', 'w:noWrap',
+    'w:tcMar', 'w:textDirection', 'w:tcFitText', 'w:vAlign', 'w:hideMark', 'w:headers', 'w:cellIns',
+    'w:cellDel', 'w:cellMerge', 'w:tcPrChange',
+))}
+
+_TBL_BORDERS_SUCCESSORS = ('w:shd', 'w:tblLayout', 'w:tblCellMar', 'w:tblLook', 'w:tblCaption',
+                           'w:tblDescription', 'w:tblPrChange')
+_TBL_JC_SUCCESSORS = ('w:tblCellSpacing', 'w:tblInd', 'w:tblBorders') + _TBL_BORDERS_SUCCESSORS
+
+
+def _border(name, val, sz, color):
+    b = OxmlElement(f'w:{name}')
+    b.set(qn('w:val'), val)
+    b.set(qn('w:sz'), sz)
+    b.set(qn('w:space'), '0')
+    b.set(qn('w:color'), color)
+    return b
+
+
+@lru_cache(maxsize=None)
+def _table_borders():
+    """三线表的表格级边框：上下粗线，其余无线"""
+    tblBorders = OxmlElement('w:tblBorders')
+    tblBorders.append(_border('top', 'single', '12', '000000'))
+    tblBorders.append(_border('left', 'nil', '0', 'auto'))
+    tblBorders.append(_border('bottom', 'single', '12', '000000'))
+    tblBorders.append(_border('right', 'nil', '0', 'auto'))
+    tblBorders.append(_border('insideH', 'nil', '0', 'auto'))
+    tblBorders.append(_border('insideV', 'nil', '0', 'auto'))
+    return tblBorders
+
+
+@lru_cache(maxsize=None)
+def _header_cell_borders():
+    """表头行单元格的下边框 (细线)"""
+    tcBorders = OxmlElement('w:tcBorders')
+    tcBorders.append(_border('bottom', 'single', '6', '000000'))
+    return tcBorders
+
+
+def _set_table_borders(tblPr):
+    old = tblPr.find(qn('w:tblBorders'))
+    if old is not None:
+        tblPr.remove(old)
+    tblPr.insert_element_before(copy.deepcopy(_table_borders()), *_TBL_BORDERS_SUCCESSORS)
+    jc = tblPr.find(qn('w:jc'))
+    if jc is None:
+        jc = OxmlElement('w:jc')
+        tblPr.insert_element_before(jc, *_TBL_JC_SUCCESSORS)
+    jc.set(W_VAL, 'center')
+
+
+def _set_header_cell_border(tcPr):
+    old = tcPr.find(qn('w:tcBorders'))
+    if old is not None:
+        tcPr.remove(old)
+    insert_ordered(tcPr, copy.deepcopy(_header_cell_borders()), _TCPR_ORDER)
+
+
+def _tc_pr(tc):
+    """取得单元格的 tcPr (tcPr 总是 tc 的第一个子元素)，不存在时创建"""
+    tcPr = tc.find(W_TCPR)
+    if tcPr is None:
+        tcPr = OxmlElement('w:tcPr')
+        tc.insert(0, tcPr)
+    return tcPr
+
+
+def format_table_element(tbl, para_template, run_template):
+    """
+    直接格式模式：表格边框 + 单元格垂直居中 + 单元格段落/run 套用模板。
+
+    整张表只顺序遍历一次；表头下边框只写入第一行的单元格。
+    """
+    _set_table_borders(tbl.tblPr)
+    v_align = OxmlElement('w:vAlign')
+    v_align.set(W_VAL, 'center')
+    for row_idx, tr in enumerate(tbl.iterchildren(W_TR)):
+        for tc in tr.iterchildren(W_TC):
+            tcPr = _tc_pr(tc)
+            existing = tcPr.find(W_VALIGN)
+            if existing is None:
+                insert_ordered(tcPr, copy.deepcopy(v_align), _TCPR_ORDER)
+            else:
+                existing.set(W_VAL, 'center')
+            if row_idx == 0:
+                _set_header_cell_border(tcPr)
+            for p in tc.iterchildren(W_P):
+                apply_paragraph_template(p, para_template)
+                for r in p.iterchildren(W_R):
+                    apply_run_template(r, run_template)
+
+
+def format_table_by_style(tbl, table_style_id, text_style_id):
+    """样式模式：边框、垂直居中来自表格样式，单元格段落只写入段落样式"""
+    tblPr = tbl.tblPr
+    tblPr.get_or_add_tblStyle().val = table_style_id
+    tblLook = tblPr.find(qn('w:tblLook'))
+    if tblLook is None:
+        tblLook = OxmlElement('w:tblLook')
+        tblPr.append(tblLook)
+    tblLook.set(qn('w:firstRow'), '1')
+
+    p_style = OxmlElement('w:pStyle')
+    p_style.set(W_VAL, text_style_id)
+    p_pr = OxmlElement('w:pPr')
+    p_pr.append(copy.deepcopy(p_style))
+    for tr in tbl.iterchildren(W_TR):
+        for tc in tr.iterchildren(W_TC):
+            for p in tc.iterchildren(W_P):
+                pPr = p.find(W_PPR)
+                if pPr is None:
+                    p.insert(0, copy.deepcopy(p_pr))
+                    continue
+                # pStyle 总是 pPr 的第一个子元素
+                existing = pPr.find(W_PSTYLE)
+                if existing is None:
+                    pPr.insert(0, copy.deepcopy(p_style))
+                else:
+                    existing.set(W_VAL, text_style_id)
+
+
+def build_table_element(rows, col_count, col_width, para_template=None, run_template=None,
+                        table_style_id=None, text_style_id=None):
+    """
+    由二维文本数据直接生成 w:tbl 元素 (不经过 python-docx 的 add_table / cell)。
+
+    直接格式模式下传入 para_template / run_template，边框写在表格上；
+    样式模式下传入 table_style_id / text_style_id，格式全部来自样式。
+    col_width 为每列宽度 (twips)。每个单元格由预先构建的原型复制而来。
+    """
+    by_style = table_style_id is not None
+    width = str(int(col_width))
+
+    tbl = OxmlElement('w:tbl')
+    tblPr = OxmlElement('w:tblPr')
+    tbl.append(tblPr)
+    if by_style:
+        tblStyle = OxmlElement('w:tblStyle')
+        tblStyle.set(W_VAL, table_style_id)
+        tblPr.append(tblStyle)
+    tblW = OxmlElement('w:tblW')
+    tblW.set(qn('w:type'), 'auto')
+    tblW.set(qn('w:w'), '0')
+    tblPr.append(tblW)
+    if not by_style:
+        _set_table_borders(tblPr)
+    tblLook = OxmlElement('w:tblLook')
+    tblLook.set(qn('w:firstRow'), '1')
+    tblLook.set(qn('w:val'), '04A0')
+    tblPr.append(tblLook)
+
+    tblGrid = OxmlElement('w:tblGrid')
+    for _ in range(col_count):
+        gridCol = OxmlElement('w:gridCol')
+        gridCol.set(qn('w:w'), width)
+        tblGrid.append(gridCol)
+    tbl.append(tblGrid)
+
+    # 单元格原型：tc/tcPr + p/pPr (+ r/rPr/t)，每个单元格只需复制一次原型
+    def make_proto(header, with_run, with_text):
+        tc = OxmlElement('w:tc')
+        tcPr = OxmlElement('w:tcPr')
+        tcW = OxmlElement('w:tcW')
+        tcW.set(qn('w:w'), width)
+        tcW.set(qn('w:type'), 'dxa')
+        tcPr.append(tcW)
+        if not by_style:
+            if header:
+                tcPr.append(copy.deepcopy(_header_cell_borders()))
+            vAlign = OxmlElement('w:vAlign')
+            vAlign.set(W_VAL, 'center')
+            tcPr.append(vAlign)
+        tc.append(tcPr)
+        p = OxmlElement('w:p')
+        if by_style:
+            pPr = OxmlElement('w:pPr')
+            pStyle = OxmlElement('w:pStyle')
+            pStyle.set(W_VAL, text_style_id)
+            pPr.append(pStyle)
+            p.append(pPr)
+        elif len(para_template):
+            p.append(copy.deepcopy(para_template))
+        if with_run:
+            r = OxmlElement('w:r')
+            if not by_style and run_template is not None:
+                r.append(copy.deepcopy(run_template))
+            if with_text:
+                t = OxmlElement('w:t')
+                t.set(qn('xml:space'), 'preserve')
+                r.append(t)
+            p.append(r)
+        tc.append(p)
+        return tc
+
+    protos = {}
+    for header in (True, False):
+        protos[header, 'text'] = make_proto(header, True, True)
+        protos[header, ''] = make_proto(header, True, False)
+        protos[header, None] = make_proto(header, False, False)
+
+    for row_idx, row in enumerate(rows):
+        tr = OxmlElement('w:tr')
+        header = row_idx == 0
+        for col_idx in range(col_count):
+            text = row[col_idx] if col_idx < len(row) else None
+            if text:
+                tc = copy.deepcopy(protos[header, 'text'])
+                tc[-1][-1][-1].text = text  # tc/p/r/t
+            else:
+                tc = copy.deepcopy(protos[header, text])
+            tr.append(tc)
+        tbl.append(tr)
+    return tbl
@@ -0,0 +1,165 @@
+import copy
+from functools import lru_cache
+
+from lxml import etree
+from docx.oxml.ns import qn, nsmap
+from docx.oxml import OxmlElement
+
+from .config import NJUST_Config
+
+# ==========================================
+# 预编译的 rPr / pPr 模板
+# ==========================================
+# 每种 (字号, 加粗, 斜体, 代码...) 组合只构建一次属性元素并缓存，
+# 应用到 run / 段落时只需复制模板并替换原有属性元素。
+
+# OOXML 规定的子元素顺序，合并已有属性时据此插入模板未覆盖的子元素
+_RPR_ORDER = {qn(tag): i for i, tag in enumerate((
+    'w:rStyle', 'w:rFonts', 'w:b', 'w:bCs', 'w:i', 'w:iCs', 'w:caps', 'w:smallCaps', 'w:strike',
+    'w:dstrike', 'w:outline', 'w:shadow', 'w:emboss', 'w:imprint', 'w:noProof', 'w:snapToGrid',
+    'w:vanish', 'w:webHidden', 'w:color', 'w:spacing', 'w:w', 'w:kern', 'w:position', 'w:sz',
+    'w:szCs', 'w:highlight', 'w:u', 'w:effect', 'w:bdr', 'w:shd', 'w:fitText', 'w:vertAlign',
+    'w:rtl', 'w:cs', 'w:em', 'w:lang', 'w:eastAsianLayout', 'w:specVanish', 'w:oMath',
+))}
+_PPR_ORDER = {qn(tag): i for i, tag in enumerate((
+    'w:pStyle', 'w:keepNext', 'w:keepLines', 'w:pageBreakBefore', 'w:framePr', 'w:widowControl',
+    'w:numPr', 'w:suppressLineNumbers', 'w:pBdr', 'w:shd', 'w:tabs', 'w:suppressAutoHyphens',
+    'w:kinsoku', 'w:wordWrap', 'w:overflowPunct', 'w:topLinePunct', 'w:autoSpaceDE',
+    'w:autoSpaceDN', 'w:bidi', 'w:adjustRightInd', 'w:snapToGrid', 'w:spacing', 'w:ind',
+    'w:contextualSpacing', 'w:mirrorIndents', 'w:suppressOverlap', 'w:jc', 'w:textDirection',
+    'w:textAlignment', 'w:textboxTightWrap', 'w:outlineLvl', 'w:divId', 'w:cnfStyle', 'w:rPr',
+    'w:sectPr', 'w:pPrChange',
+))}
+
+W_RPR = qn('w:rPr')
+W_PPR = qn('w:pPr')
+_W_HANGING = qn('w:hanging')
+_W_FIRST_LINE = qn('w:firstLine')
+
+# 判断 run 中是否包含图片
+has_picture = etree.XPath('.//w:drawing | .//w:pict', namespaces=nsmap)
+
+
+def _el(tag, **attrs):
+    el = OxmlElement(tag)
+    for k, v in attrs.items():
+        el.set(qn('w:' + k), v)
+    return el
+
+
+def half_points(size_pt):
+    """字号 (Length 或磅值) 转为 OOXML 使用的半磅整数"""
+    if hasattr(size_pt, 'pt'):
+        return int(size_pt.pt * 2)
+    return int(size_pt * 2)
+
+
+@lru_cache(maxsize=None)
+def run_template(size_half_pts, bold=False, italic=False, force_black=True, is_code=False, set_bold_italic=True):
+    """
+    构建中西文复合字体的 rPr 模板。
+
+    set_bold_italic=False 时不写入 b / i (保留 run 原有的加粗斜体)，对应直接处理 w:r 元素的场景。
+    """
+    ascii_font = NJUST_Config.FONT_CODE if is_code else NJUST_Config.FONT_EN
+    rPr = OxmlElement('w:rPr')
+    rPr.append(_el('w:rFonts', ascii=ascii_font, hAnsi=ascii_font, eastAsia=NJUST_Config.FONT_CN,
+                   cs=ascii_font, hint='eastAsia'))
+    if set_bold_italic:
+        rPr.append(_el('w:b') if bold else _el('w:b', val='0'))
+    if bold:
+        rPr.append(_el('w:bCs', val='1'))
+    if set_bold_italic:
+        rPr.append(_el('w:i') if italic else _el('w:i', val='0'))
+    if force_black:
+        rPr.append(_el('w:color', val='000000'))
+    rPr.append(_el('w:sz', val=str(size_half_pts)))
+    rPr.append(_el('w:szCs', val=str(size_half_pts)))
+    if force_black:
+        rPr.append(_el('w:u', val='none'))
+    return rPr
+
+
+@lru_cache(maxsize=None)
+def paragraph_template(jc=None, line=None, line_rule=None, first_line=None, hanging=None, left=None,
+                       before=None, after=None, shading=None):
+    """
+    构建段落属性 pPr 模板，参数均为 OOXML 原始取值 (twips 等字符串)。
+
+    未指定的属性不出现在模板中，应用时保留段落原有的对应设置。
+    """
+    pPr = OxmlElement('w:pPr')
+    if shading:
+        pPr.append(_el('w:shd', val='clear', color='auto', fill=shading))
+    spacing = {}
+    if before is not None: spacing['before'] = before
+    if after is not None: spacing['after'] = after
+    if line is not None: spacing['line'] = line
+    if line_rule is not None: spacing['lineRule'] = line_rule
+    if spacing:
+        pPr.append(_el('w:spacing', **spacing))
+    ind = {}
+    if left is not None: ind['left'] = left
+    if first_line is not None: ind['firstLine'] = first_line
+    if hanging is not None: ind['hanging'] = hanging
+    if ind:
+        pPr.append(_el('w:ind', **ind))
+    if jc is not None:
+        pPr.append(_el('w:jc', val=jc))
+    return pPr
+
+
+def insert_ordered(pr, child, order):
+    """按 OOXML 顺序把 child 插入属性元素 pr"""
+    idx = order.get(child.tag, len(order))
+    for i, existing in enumerate(pr):
+        if order.get(existing.tag, len(order)) > idx:
+            pr.insert(i, child)
+            return
+    pr.append(child)
+
+
+def apply_run_template(r, template):
+    """
+    把 rPr 模板应用到 w:r 元素。
+
+    run 没有 rPr (或只有模板覆盖的属性) 时直接替换为模板副本；
+    否则保留 rStyle、上下标等模板未覆盖的属性。
+    """
+    new_rPr = copy.deepcopy(template)
+    old_rPr = r.find(W_RPR)
+    if old_rPr is None:
+        r.insert(0, new_rPr)
+        return new_rPr
+    managed = {child.tag for child in template}
+    for child in list(old_rPr):
+        if child.tag not in managed:
+            insert_ordered(new_rPr, child, _RPR_ORDER)
+    r.replace(old_rPr, new_rPr)
+    return new_rPr
+
+
+def apply_paragraph_template(p, template):
+    """
+    把 pPr 模板应用到 w:p 元素。
+
+    同名子元素按属性合并 (模板取值优先)，pStyle / numPr 等模板未涉及的设置保持不变。
+    """
+    old_pPr = p.find(W_PPR)
+    if old_pPr is None:
+        new_pPr = copy.deepcopy(template)
+        p.insert(0, new_pPr)
+        return new_pPr
+    for tpl_child in template:
+        existing = old_pPr.find(tpl_child.tag)
+        if existing is None:
+            insert_ordered(old_pPr, copy.deepcopy(tpl_child), _PPR_ORDER)
+        else:
+            for k, v in tpl_child.attrib.items():
+                existing.set(k, v)
+            # 首行缩进与悬挂缩进互斥
+            if _W_HANGING in tpl_child.attrib:
+                existing.attrib.pop(_W_FIRST_LINE, None)
+            elif _W_FIRST_LINE in tpl_child.attrib:
+                existing.attrib.pop(_W_HANGING, None)
+    return old_pPr
@@ -0,0 +1,234 @@
+import io
+import json
+import difflib
+import hashlib
+import zipfile
+import posixpath
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.part import Part
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn, nsmap
+from lxml import etree
+
+from .config import config_fingerprint
+
+# ==========================================
+# 增量更新：与上次的输出逐块比较，只重新生成变化的块
+# ==========================================
+# 内置引擎与 AST 引擎的输出中附带一个块清单 (customXml/itemN.xml)：
+# 正文按 Markdown 块 (内置引擎) 或顶层语法树块 (AST 引擎) 分组，每块记录内容哈希与生成的元素个数，
+# 并记录 word/document.xml 的 CRC。更新时读取旧文件的清单，按哈希序列做差异比较：
+# 未变化的块直接取旧文件中的元素 (重新分配图片关系与 docPr id)，只有新增或修改的块重新生成。
+# 清单的上下文 (引擎、格式模式、NJUST_Config) 不一致，或 document.xml 被 Word / 手工改动过 (CRC 不符) 时整篇重新生成。
+
+MANIFEST_REVISION = 1
+MANIFEST_NS = 'urn:njust:block-manifest'
+# python-docx 的默认模板已带有 customXml/item1.xml，清单取下一个空闲的编号
+MANIFEST_PARTNAME = '/customXml/item%d.xml'
+
+_DOCUMENT_MEMBER = 'word/document.xml'
+_DOCUMENT_RELS_MEMBER = 'word/_rels/document.xml.rels'
+_PR_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_R_NS = '{%s}' % nsmap['r']
+_HAS_REL = etree.XPath('descendant-or-self::*[@r:*]', namespaces=nsmap)
+W_SECTPR = qn('w:sectPr')
+WP_DOC_PR = qn('wp:docPr')
+
+
+def manifest_context(kind, format_mode):
+    """决定旧元素能否复用的全部设置 (kind 为 'internal' / 'ast')"""
+    from .cache import CONVERSION_CACHE_REVISION
+    payload = [MANIFEST_REVISION, CONVERSION_CACHE_REVISION, kind, format_mode, config_fingerprint()]
+    return hashlib.sha256(json.dumps(payload).encode('utf-8')).hexdigest()[:16]
+
+
+def block_key(payload, image_paths=()):
+    """块的内容哈希：payload 为可 JSON 序列化的块内容，image_paths 为块中引用的本地图片 (按内容计入)"""
+    from .cache import file_digest
+    h = hashlib.sha1(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    for path in image_paths:
+        h.update(b'\0' + file_digest(path).encode('ascii'))
+    return h.hexdigest()
+
+
+class _ManifestPart(Part):
+    """清单部件；内容在写出时才生成 (此时 document.xml 已写完，CRC 已知)"""
+
+    def __init__(self, manifest, package):
+        super().__init__(package.next_partname(MANIFEST_PARTNAME), 'application/xml', package=package)
+        self.manifest = manifest
+
+    @property
+    def blob(self):
+        return self.manifest.to_xml()
+
+
+class BlockManifest:
+    """
+    一次输出的块清单。
+
+    elements(render_block, keyed_blocks, previous) 产出正文元素并记录各块的 (哈希, 元素个数)；
+    attach(doc) 把清单部件挂到文档上，写出时以 write_streaming_docx 的 on_document 记录 document.xml 的 CRC。
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.blocks = []
+        self.document_crc = None
+        self.updated = False  # 是否与上次的输出做了比较
+        self.reused = 0
+        self.rendered = 0
+
+    def attach(self, doc):
+        doc.part.relate_to(_ManifestPart(self, doc.part.package), RT.CUSTOM_XML)
+
+    def on_document(self, zipinfo):
+        self.document_crc = zipinfo.CRC
+
+    def elements(self, render_block, keyed_blocks, previous=None):
+        if previous is None:
+            for key, block in keyed_blocks:
+                self.rendered += 1
+                yield from self._record(key, render_block(block))
+            return
+        self.updated = True
+        keyed_blocks = list(keyed_blocks)
+        keys = [key for key, _block in keyed_blocks]
+        matcher = difflib.SequenceMatcher(None, previous.keys, keys, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            for offset, j in enumerate(range(j1, j2)):
+                reused = previous.reuse(i1 + offset) if tag == 'equal' else None
+                if reused is not None:
+                    self.reused += 1
+                    yield from self._record(keys[j], reused)
+                else:
+                    self.rendered += 1
+                    yield from self._record(keys[j], render_block(keyed_blocks[j][1]))
+
+    def _record(self, key, elements):
+        count = 0
+        for el in elements:
+            count += 1
+            yield el
+        self.blocks.append((key, count))
+
+    def to_xml(self):
+        root = etree.Element(f'{{{MANIFEST_NS}}}manifest', nsmap={None: MANIFEST_NS})
+        root.set('revision', str(MANIFEST_REVISION))
+        root.set('context', self.context)
+        root.set('document-crc', str(self.document_crc or 0))
+        for key, count in self.blocks:
+            etree.SubElement(root, f'{{{MANIFEST_NS}}}block', key=key, count=str(count))
+        return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def _find_manifest(zf):
+    """document.xml 的关系中类型为 customXml 且根元素为块清单的部件"""
+    try:
+        rels = etree.fromstring(zf.read(_DOCUMENT_RELS_MEMBER))
+    except KeyError:
+        return None, None
+    for rel in rels.iterchildren(_PR_NS + 'Relationship'):
+        if rel.get('Type') == RT.CUSTOM_XML and rel.get('TargetMode') != 'External':
+            member = posixpath.normpath(posixpath.join('word', rel.get('Target'))).lstrip('/')
+            try:
+                root = etree.fromstring(zf.read(member))
+            except (KeyError, etree.XMLSyntaxError):
+                continue
+            if root.tag == f'{{{MANIFEST_NS}}}manifest':
+                return root, rels
+    return None, rels
+
+
+class PreviousOutput:
+    """
+    上次的输出文件，按清单切分为块。
+
+    read(path, context, doc, next_shape_id) 在文件不存在、没有清单或清单不可用时返回 None；
+    reuse(i) 返回第 i 块的元素 (关系与 docPr id 已改为新文档中的值)，块中有无法迁移的关系时返回 None。
+    """
+
+    def __init__(self, keys, blocks, rels, zf, doc, next_shape_id):
+        self.keys = keys
+        self._blocks = blocks
+        self._rels = rels
+        self._zf = zf
+        self._doc = doc
+        self._next_shape_id = next_shape_id
+        self._rel_map = {}
+
+    @classmethod
+    def read(cls, path, context, doc, next_shape_id):
+        try:
+            zf = zipfile.ZipFile(path)
+        except (OSError, zipfile.BadZipFile):
+            return None
+        try:
+            manifest, rels = _find_manifest(zf)
+            usable = (manifest is not None and manifest.get('context') == context
+                      and str(zf.getinfo(_DOCUMENT_MEMBER).CRC) == manifest.get('document-crc'))
+            if usable:
+                entries = [(b.get('key'), int(b.get('count'))) for b in manifest]
+                body = parse_xml(zf.read(_DOCUMENT_MEMBER)).find(qn('w:body'))
+                children = [child for child in body if child.tag != W_SECTPR]
+                usable = sum(count for _key, count in entries) == len(children)
+        except (KeyError, ValueError, etree.XMLSyntaxError):
+            usable = False
+        if not usable:
+            zf.close()
+            return None
+        blocks = []
+        start = 0
+        for _key, count in entries:
+            blocks.append(children[start:start + count])
+            start += count
+        rels = {rel.get('Id'): rel for rel in rels.iterchildren(_PR_NS + 'Relationship')}
+        return cls([key for key, _count in entries], blocks, rels, zf, doc, next_shape_id)
+
+    def reuse(self, i):
+        elements = self._blocks[i]
+        refs = [(node, attr, value) for el in elements for node in _HAS_REL(el)
+                for attr, value in node.attrib.items() if attr.startswith(_R_NS)]
+        # 先确认块中的全部关系都能迁移，再加入新文档 (否则中途失败时已加入的图片部件成为孤立部件)
+        if not all(self._movable(rId) for _node, _attr, rId in refs):
+            return None
+        for node, attr, rId in refs:
+            node.set(attr, self._new_rel(rId))
+        for el in elements:
+            for doc_pr in el.iter(WP_DOC_PR):
+                doc_pr.set('id', str(self._next_shape_id()))
+        self._blocks[i] = None
+        return elements
+
+    def _movable(self, rId):
+        """旧文档中的关系 rId 能否迁移到新文档 (外部链接，或旧文件中存在的图片)；不修改新文档"""
+        if rId in self._rel_map:
+            return True
+        rel = self._rels.get(rId)
+        if rel is None:
+            return False
+        if rel.get('TargetMode') == 'External':
+            return True
+        if rel.get('Type') != RT.IMAGE:
+            return False
+        return self._member(rel.get('Target')) in self._zf.NameToInfo
+
+    @staticmethod
+    def _member(target):
+        return posixpath.normpath(posixpath.join('word', target)).lstrip('/')
+
+    def _new_rel(self, rId):
+        """旧文档中的关系 rId 在新文档中的对应关系 (图片按内容去重后重新加入；先经 _movable 确认)"""
+        if rId not in self._rel_map:
+            rel = self._rels[rId]
+            reltype, target = rel.get('Type'), rel.get('Target')
+            if rel.get('TargetMode') == 'External':
+                self._rel_map[rId] = self._doc.part.relate_to(target, reltype, is_external=True)
+            else:
+                blob = self._zf.read(self._member(target))
+                self._rel_map[rId] = self._doc.part.get_or_add_image(io.BytesIO(blob))[0]
+        return self._rel_map[rId]
+
+    def close(self):
+        self._zf.close()
@@ -0,0 +1,610 @@
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree
+
+from .config import NJUST_Config
+from .formatter import NJUST_Formatter, REFERENCE_TITLES, REFERENCE_ENTRY
+
+# ==========================================
+# NJUST 格式检查：流式读取 docx，逐段比对 NJUST_Config 与 post_process_doc 的规则
+# ==========================================
+# 不经过 python-docx：直接从 zip 中以 lxml iterparse 读取 styles.xml 与 word/document.xml。
+# 样式表解析一次，段落 / run 的实际格式按 docDefaults -> 样式链 (basedOn) -> 字符样式 -> 直接格式 逐层叠加；
+# 正文每处理完一个段落 / 表格行就从树中清除，内存占用与文档长度无关。
+# 检查项：页面尺寸与页边距、中西文字体、字号、正文 20 磅固定行距、题注字号与居中、标题加粗、三线表。
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = W + 'body'
+W_P = W + 'p'
+W_R = W + 'r'
+W_T = W + 't'
+W_TBL = W + 'tbl'
+W_TR = W + 'tr'
+W_TC = W + 'tc'
+W_PPR = W + 'pPr'
+W_RPR = W + 'rPr'
+W_TBLPR = W + 'tblPr'
+W_TCPR = W + 'tcPr'
+W_SECTPR = W + 'sectPr'
+W_STYLE = W + 'style'
+W_DOC_DEFAULTS = W + 'docDefaults'
+W_VAL = W + 'val'
+W_TXBX_CONTENT = W + 'txbxContent'
+W_RFONTS = W + 'rFonts'
+W_SZ = W + 'sz'
+W_B = W + 'b'
+W_SPACING = W + 'spacing'
+W_JC = W + 'jc'
+W_OUTLINE_LVL = W + 'outlineLvl'
+W_PSTYLE = W + 'pStyle'
+W_RSTYLE = W + 'rStyle'
+
+_DOCUMENT_MEMBER = 'word/document.xml'
+_STYLES_MEMBER = 'word/styles.xml'
+_FONT_SLOTS = ('ascii', 'hAnsi', 'eastAsia')
+_NO_LINE = frozenset(['nil', 'none'])
+_OFF = frozenset(['0', 'false', 'off'])
+_HEADING_NAME = re.compile(r'^(?:Heading|标题)\s*(\d)')
+_CAPTION_TEXT = re.compile(r'^[图表]\s*\S')
+# 新版 OOXML 中 start / end 即 left / right
+_EDGE_ALIASES = {'start': 'left', 'end': 'right'}
+_NS = {'w': W[1:-1]}
+# 含可见文字的 run (含超链接中的 run)，以及段落中是否有图片
+_TEXT_RUNS = etree.XPath('.//w:r[w:t[normalize-space()]]', namespaces=_NS)
+_HAS_PICTURE = etree.XPath('boolean(.//w:drawing | .//w:pict)', namespaces=_NS)
+
+# 每个文件每条规则最多保留的违规条数 (总数照常统计)
+MAX_PER_RULE = 20
+# 页面尺寸允许的误差 (twips，不同工具换算毫米时的取整差异)
+PAGE_TOLERANCE = 2
+
+RULES = {
+    'page': '页面设置',
+    'font': '字体',
+    'size': '字号',
+    'spacing': '行距',
+    'align': '对齐',
+    'bold': '加粗',
+    'table': '三线表',
+}
+
+
+def _twips(length):
+    return round(length / 635)
+
+
+def _half_points(length):
+    return round(length / 6350)
+
+
+def _pt(half_points):
+    return f"{half_points / 2:g} 磅"
+
+
+def expected_page():
+    """sectPr 中 (元素, 属性) -> 期望值 (twips)"""
+    c = NJUST_Config
+    return {
+        ('pgSz', 'w'): _twips(c.PAGE_WIDTH), ('pgSz', 'h'): _twips(c.PAGE_HEIGHT),
+        ('pgMar', 'top'): _twips(c.MARGIN_TOP), ('pgMar', 'bottom'): _twips(c.MARGIN_BOTTOM),
+        ('pgMar', 'left'): _twips(c.MARGIN_LEFT), ('pgMar', 'right'): _twips(c.MARGIN_RIGHT),
+        ('pgMar', 'header'): _twips(c.HEADER_DIST), ('pgMar', 'footer'): _twips(c.FOOTER_DIST),
+    }
+
+
+_PAGE_NAMES = {('pgSz', 'w'): '纸张宽度', ('pgSz', 'h'): '纸张高度', ('pgMar', 'top'): '上边距',
+               ('pgMar', 'bottom'): '下边距', ('pgMar', 'left'): '左边距', ('pgMar', 'right'): '右边距',
+               ('pgMar', 'header'): '页眉距离', ('pgMar', 'footer'): '页脚距离'}
+
+
+# ==========================================
+# 格式属性的读取与叠加
+# ==========================================
+def _on(el):
+    return el.get(W_VAL, '1') not in _OFF
+
+
+def _first_child(el, tag):
+    """rPr / pPr / tblPr 按规范总是第一个子元素 (比 find 快得多，逐 run 调用)"""
+    return el[0] if len(el) and el[0].tag == tag else None
+
+
+def _run_props(rPr, props):
+    """把 rPr 中的字体 / 字号 / 加粗叠加到 props (主题字体优先于同级的显式字体)；只遍历一次子元素"""
+    for child in rPr:
+        tag = child.tag
+        if tag == W_RFONTS:
+            for slot in _FONT_SLOTS:
+                theme = child.get(W + slot + 'Theme')
+                if theme:
+                    props[slot] = f"主题字体 {theme}"
+                elif child.get(W + slot):
+                    props[slot] = child.get(W + slot)
+        elif tag == W_SZ:
+            val = child.get(W_VAL) or ''
+            if val.isdigit():
+                props['sz'] = int(val)
+        elif tag == W_B:
+            props['b'] = _on(child)
+    return props
+
+
+def _para_props(pPr, props):
+    """把 pPr 中的行距 / 对齐 / 大纲级别叠加到 props"""
+    for child in pPr:
+        tag = child.tag
+        if tag == W_SPACING:
+            if child.get(W + 'line'):
+                props['line'] = child.get(W + 'line')
+                props['lineRule'] = child.get(W + 'lineRule', 'auto')
+        elif tag == W_JC:
+            props['jc'] = child.get(W_VAL)
+        elif tag == W_OUTLINE_LVL:
+            props['outline'] = child.get(W_VAL)
+    return props
+
+
+def _borders(container, props):
+    """tblBorders / tcBorders 的各条边：有线时为 'single 12' 等，无线时为 None"""
+    if container is not None:
+        for edge in container:
+            val = edge.get(W_VAL)
+            name = etree.QName(edge).localname
+            name = _EDGE_ALIASES.get(name, name)
+            props[name] = None if val in _NO_LINE else f"{val} {edge.get(W + 'sz', '')}".strip()
+    return props
+
+
+def _first_row_enabled(look):
+    """tblLook 是否启用标题行条件格式 (无 tblLook 时 Word 默认启用)"""
+    if look is None:
+        return True
+    if look.get(W + 'firstRow') is not None:
+        return look.get(W + 'firstRow') not in _OFF
+    return bool(int(look.get(W_VAL) or '0020', 16) & 0x0020)
+
+
+class StyleSheet:
+    """
+    styles.xml 中的样式定义。
+
+    paragraph(styleId) / character(styleId) / table(styleId) 返回沿 basedOn 链叠加后的格式 (按样式缓存)。
+    """
+
+    def __init__(self, source=None):
+        self.styles = {}
+        self.defaults = {'p': {}, 'r': {}}
+        self.default_paragraph = None
+        self.default_table = None
+        self._resolved = {}
+        if source is not None:
+            self._read(source)
+
+    def _read(self, source):
+        for _event, el in etree.iterparse(source, events=('end',), tag=(W_STYLE, W_DOC_DEFAULTS)):
+            if el.tag == W_DOC_DEFAULTS:
+                rPr = el.find(f'{W}rPrDefault/{W_RPR}')
+                pPr = el.find(f'{W}pPrDefault/{W_PPR}')
+                if rPr is not None:
+                    _run_props(rPr, self.defaults['r'])
+                if pPr is not None:
+                    _para_props(pPr, self.defaults['p'])
+            else:
+                self._add_style(el)
+            el.clear()
+
+    def _add_style(self, el):
+        style_id = el.get(W + 'styleId')
+        kind = el.get(W + 'type', 'paragraph')
+        name = el.find(W + 'name')
+        based_on = el.find(W + 'basedOn')
+        pPr, rPr, tblPr = el.find(W_PPR), el.find(W_RPR), el.find(W_TBLPR)
+        first_row = {}
+        for cond in el.iterchildren(W + 'tblStylePr'):
+            if cond.get(W + 'type') == 'firstRow':
+                _borders(cond.find(f'{W_TCPR}/{W}tcBorders'), first_row)
+        self.styles[style_id] = {
+            'type': kind,
+            'name': name.get(W_VAL) if name is not None else style_id,
+            'based_on': based_on.get(W_VAL) if based_on is not None else None,
+            'p': _para_props(pPr, {}) if pPr is not None else {},
+            'r': _run_props(rPr, {}) if rPr is not None else {},
+            'borders': _borders(tblPr.find(W + 'tblBorders'), {}) if tblPr is not None else {},
+            'first_row': first_row,
+        }
+        if el.get(W + 'default') in ('1', 'true', 'on'):
+            if kind == 'paragraph':
+                self.default_paragraph = style_id
+            elif kind == 'table':
+                self.default_table = style_id
+
+    def name(self, style_id):
+        style = self.styles.get(style_id)
+        return style['name'] if style else (style_id or '')
+
+    def _chain(self, style_id):
+        """从最底层的基准样式到 style_id 本身 (防止循环引用)"""
+        chain = []
+        while style_id in self.styles and style_id not in chain:
+            chain.append(style_id)
+            style_id = self.styles[style_id]['based_on']
+        return [self.styles[s] for s in reversed(chain)]
+
+    def _resolve(self, kind, style_id, base):
+        key = (kind, style_id)
+        if key not in self._resolved:
+            props = dict(base)
+            for style in self._chain(style_id):
+                props.update(style[kind])
+            self._resolved[key] = props
+        return self._resolved[key]
+
+    def paragraph(self, style_id):
+        """段落样式的 (段落格式, 字符格式)，均已叠加 docDefaults"""
+        style_id = style_id if style_id in self.styles else self.default_paragraph
+        return (self._resolve('p', style_id, self.defaults['p']),
+                self._resolve('r', style_id, self.defaults['r']))
+
+    def character(self, style_id, base):
+        """字符样式叠加在段落的字符格式 base 之上"""
+        key = ('c', style_id, id(base))
+        if key not in self._resolved:
+            props = dict(base)
+            for style in self._chain(style_id):
+                props.update(style['r'])
+            self._resolved[key] = props
+        return self._resolved[key]
+
+    def table(self, style_id):
+        """表格样式的 (表格边框, 表头行单元格边框)"""
+        style_id = style_id if style_id in self.styles else self.default_table
+        return self._resolve('borders', style_id, {}), self._resolve('first_row', style_id, {})
+
+
+# ==========================================
+# 检查结果
+# ==========================================
+class ValidationReport:
+    """一个 docx 的检查结果；每条规则只保留前 max_per_rule 条违规，counts 为各规则的违规总数"""
+
+    def __init__(self, path, max_per_rule=MAX_PER_RULE):
+        self.path = path
+        self.max_per_rule = max_per_rule
+        self.violations = []
+        self.counts = {}
+        self.paragraphs = 0
+        self.tables = 0
+        self.error = None
+
+    def add(self, location, rule, message, text=''):
+        count = self.counts[rule] = self.counts.get(rule, 0) + 1
+        if count <= self.max_per_rule:
+            self.violations.append({'location': location, 'rule': rule, 'message': message, 'text': text})
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    @property
+    def ok(self):
+        return self.error is None and not self.counts
+
+    def to_dict(self):
+        return {'path': self.path, 'ok': self.ok, 'error': self.error, 'paragraphs': self.paragraphs,
+                'tables': self.tables, 'counts': self.counts, 'violations': self.violations}
+
+    def format(self):
+        """供命令行输出的多行文本"""
+        if self.error:
+            return f"{self.path}: 无法检查: {self.error}"
+        if self.ok:
+            return f"{self.path}: 符合规范 ({self.paragraphs} 段，{self.tables} 个表格)"
+        summary = '，'.join(f"{RULES[rule]} {n}" for rule, n in self.counts.items())
+        lines = [f"{self.path}: {self.total} 处不符合 ({summary})"]
+        for v in self.violations:
+            excerpt = f"「{v['text']}」" if v['text'] else ''
+            lines.append(f"  {v['location']} [{RULES[v['rule']]}] {v['message']} {excerpt}".rstrip())
+        hidden = self.total - len(self.violations)
+        if hidden:
+            lines.append(f"  …… 另有 {hidden} 处未列出")
+        return '\n'.join(lines)
+
+
+# ==========================================
+# 逐段检查
+# ==========================================
+class _Table:
+    def __init__(self, number):
+        self.number = number
+        self.row = -1
+        self.col = -1
+        self.header_ruled = True
+
+
+class DocxValidator:
+    """
+    检查一个 docx。
+
+    段落角色的判定与 post_process_doc 相同 (样式名 -> 代码 / 标题 / 题注 / 正文，参考文献标题之后的条目)，
+    另外兼顾不带样式的直接格式：含图片的段落为插图，居中且以“图 / 表”开头的段落为题注，
+    大纲级别或全部加粗且非固定行距的段落为标题。
+    """
+
+    def __init__(self, path, max_per_rule=MAX_PER_RULE):
+        self.path = path
+        self.report = ValidationReport(path, max_per_rule)
+        self.page = expected_page()
+        self.body_size = _half_points(NJUST_Config.SIZE_BODY)
+        self.caption_size = _half_points(NJUST_Config.SIZE_CAPTION)
+        self.code_size = _half_points(NJUST_Config.SIZE_CODE)
+        self.heading_sizes = {1: _half_points(NJUST_Config.SIZE_TITLE_1), 2: _half_points(NJUST_Config.SIZE_TITLE_2),
+                              3: _half_points(NJUST_Config.SIZE_TITLE_3), 4: _half_points(NJUST_Config.SIZE_TITLE_4)}
+        self.body_line = str(_twips(NJUST_Config.LINE_SPACING_BODY))
+        self.styles = None
+        self._roles = {}
+        self._tables = []
+        self._table_count = 0
+        self._in_references = False
+
+    def run(self):
+        try:
+            with zipfile.ZipFile(self.path) as zf:
+                names = set(zf.namelist())
+                if _STYLES_MEMBER in names:
+                    with zf.open(_STYLES_MEMBER) as f:
+                        self.styles = StyleSheet(f)
+                else:
+                    self.styles = StyleSheet()
+                with zf.open(_DOCUMENT_MEMBER) as f:
+                    self._walk(f)
+        except (OSError, KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+            self.report.error = f"{type(e).__name__}: {e}"
+        return self.report
+
+    def _walk(self, source):
+        events = etree.iterparse(source, events=('start', 'end'), tag=(W_P, W_TBL, W_TR, W_TC, W_SECTPR))
+        for event, el in events:
+            tag = el.tag
+            if event == 'start':
+                if tag == W_TBL:
+                    self._table_count += 1
+                    self._tables.append(_Table(self._table_count))
+                elif tag == W_TR and self._tables:
+                    self._tables[-1].row += 1
+                    self._tables[-1].col = -1
+                elif tag == W_TC and self._tables:
+                    self._tables[-1].col += 1
+                continue
+            if tag == W_P:
+                if el.getparent().tag != W_TXBX_CONTENT:
+                    self._paragraph(el)
+                el.clear()
+                self._drop_previous(el)
+            elif tag == W_TR:
+                if self._tables and self._tables[-1].row == 0:
+                    self._header_row(el)
+                el.clear()
+                self._drop_previous(el)
+            elif tag == W_TBL:
+                self._table(el, self._tables.pop())
+                el.clear()
+                self._drop_previous(el)
+            elif tag == W_SECTPR:
+                self._section(el)
+
+    @staticmethod
+    def _drop_previous(el):
+        """
+        删除已处理完的前序兄弟元素，使树的大小与文档长度无关。
+
+        正文中删除全部前序元素；表格与单元格中只删除同类元素 (tblPr / tcPr 在表格结束前还要使用)。
+        """
+        parent = el.getparent()
+        if parent is None:
+            return
+        if parent.tag == W_BODY:
+            while el.getprevious() is not None:
+                del parent[0]
+            return
+        prev = el.getprevious()
+        while prev is not None and prev.tag == el.tag:
+            parent.remove(prev)
+            prev = el.getprevious()
+
+    # ---- 页面 ----
+    def _section(self, sectPr):
+        for (child, attr), expected in self.page.items():
+            el = sectPr.find(W + child)
+            value = el.get(W + attr) if el is not None else None
+            if el is not None and child == 'pgSz' and el.get(W + 'orient') == 'landscape':
+                # 横向页面宽高互换
+                value = el.get(W + ('h' if attr == 'w' else 'w'))
+            if value is None or not value.lstrip('-').isdigit():
+                self.report.add('页面设置', 'page', f"{_PAGE_NAMES[child, attr]}未设置")
+            elif abs(int(value) - expected) > PAGE_TOLERANCE:
+                self.report.add('页面设置', 'page', f"{_PAGE_NAMES[child, attr]}应为 {expected / 56.693:.1f} mm，"
+                                                    f"实际 {int(value) / 56.693:.1f} mm")
+
+    # ---- 段落 ----
+    def _location(self):
+        if self._tables:
+            t = self._tables[-1]
+            return f"表格 {t.number} 第 {t.row + 1} 行第 {t.col + 1} 列"
+        return f"第 {self.report.paragraphs} 段"
+
+    def _style_role(self, style_id):
+        """段落样式 -> (角色, 标题级别)，与 NJUST_Formatter._classify_style 一致，另识别 4 级标题与各类 Caption"""
+        if style_id not in self._roles:
+            name = self.styles.name(style_id if style_id in self.styles.styles else self.styles.default_paragraph)
+            role = NJUST_Formatter._classify_style(name)
+            level = None
+            if role.startswith('heading'):
+                role, level = 'heading', int(role[-1])
+            elif _HEADING_NAME.match(name):
+                role, level = 'heading', min(int(_HEADING_NAME.match(name).group(1)), 4)
+            elif 'Caption' in name and 'Figure' not in name:
+                role = 'caption'
+            self._roles[style_id] = role, level
+        return self._roles[style_id]
+
+    def _paragraph(self, p):
+        if not self._tables:
+            self.report.paragraphs += 1
+        pPr = _first_child(p, W_PPR)
+        pStyle = _first_child(pPr, W_PSTYLE) if pPr is not None else None
+        style_id = pStyle.get(W_VAL) if pStyle is not None else None
+        p_base, r_base = self.styles.paragraph(style_id)
+        props = _para_props(pPr, dict(p_base)) if pPr is not None else p_base
+
+        runs = _TEXT_RUNS(p)
+        text = ''.join(p.itertext(W_T)).strip()
+        has_picture = _HAS_PICTURE(p)
+        if not text and not has_picture:
+            return
+
+        role, level = self._role(style_id, props, runs, r_base, text, has_picture)
+        location = self._location()
+        excerpt = text[:20]
+        add = self.report.add
+
+        if role == 'figure':
+            if props.get('jc') != 'center':
+                add(location, 'align', "插图段落应居中", excerpt)
+            return
+        if role in ('body', 'reference') and (props.get('lineRule') != 'exact' or props.get('line') != self.body_line):
+            actual = f"{int(props['line']) / 20:g} 磅 ({props.get('lineRule')})" if props.get('line') else "未设置"
+            add(location, 'spacing', f"正文应为固定值 {int(self.body_line) / 20:g} 磅，实际 {actual}", excerpt)
+        if role == 'caption' and props.get('jc') != 'center':
+            add(location, 'align', "题注应居中", excerpt)
+
+        sizes = {'body': (self.body_size,), 'reference': (self.body_size,), 'caption': (self.caption_size,),
+                 'table': (self.caption_size,), 'code': (self.code_size,)}.get(role)
+        if role == 'heading':
+            sizes = (self.heading_sizes[level],) if level else tuple(set(self.heading_sizes.values()))
+        ascii_font = NJUST_Config.FONT_CODE if role == 'code' else NJUST_Config.FONT_EN
+        self._check_runs(location, excerpt, runs, r_base, sizes, ascii_font, bold=role == 'heading')
+
+    def _role(self, style_id, props, runs, r_base, text, has_picture):
+        if self._tables:
+            return 'table', None
+        if has_picture:
+            return 'figure', None
+        clean = text.replace(' ', '')
+        if clean in REFERENCE_TITLES:
+            self._in_references = True
+            return 'heading', None
+        role, level = self._style_role(style_id)
+        if role != 'body':
+            return role, level
+        if self._in_references and REFERENCE_ENTRY.match(text):
+            return 'reference', None
+        if (props.get('outline') or '').isdigit() and int(props['outline']) < 4:
+            return 'heading', int(props['outline']) + 1
+        effective = [self._effective(r, r_base) for r in runs]
+        if all(e.get('ascii') == NJUST_Config.FONT_CODE for e in effective):
+            return 'code', None
+        if props.get('jc') == 'center' and _CAPTION_TEXT.match(text):
+            return 'caption', None
+        if props.get('lineRule') != 'exact' and all(e.get('b') for e in effective):
+            return 'heading', None
+        return 'body', None
+
+    def _effective(self, r, r_base):
+        """run 的实际字符格式"""
+        rPr = _first_child(r, W_RPR)
+        if rPr is None:
+            return r_base
+        rStyle = _first_child(rPr, W_RSTYLE)
+        base = self.styles.character(rStyle.get(W_VAL), r_base) if rStyle is not None else r_base
+        return _run_props(rPr, dict(base))
+
+    def _check_runs(self, location, excerpt, runs, r_base, sizes, ascii_font, bold=False):
+        """段落中各 run 的字体 / 字号 / 加粗，每条规则只报告第一个不符合的 run"""
+        found = set()
+        add = self.report.add
+        for r in runs:
+            props = self._effective(r, r_base)
+            if 'font' not in found:
+                # 行内代码 (等宽字体) 在任意段落中都允许
+                west = (ascii_font, NJUST_Config.FONT_CODE)
+                for slot, expected in (('ascii', west), ('hAnsi', west), ('eastAsia', (NJUST_Config.FONT_CN,))):
+                    actual = props.get(slot)
+                    if actual not in expected:
+                        found.add('font')
+                        add(location, 'font', f"{slot} 字体应为 {expected[0]}，实际 {actual or '未设置'}", excerpt)
+                        break
+            if sizes and 'size' not in found and props.get('sz') not in sizes:
+                found.add('size')
+                expected = ' / '.join(_pt(s) for s in sorted(sizes))
+                actual = _pt(props['sz']) if props.get('sz') else '未设置'
+                add(location, 'size', f"字号应为 {expected}，实际 {actual}", excerpt)
+            if bold and 'bold' not in found and not props.get('b'):
+                found.add('bold')
+                add(location, 'bold', "标题应加粗", excerpt)
+
+    # ---- 表格 ----
+    def _table_styles(self, tbl):
+        tblPr = tbl.find(W_TBLPR)
+        tblStyle = tblPr.find(W + 'tblStyle') if tblPr is not None else None
+        return tblPr, self.styles.table(tblStyle.get(W_VAL) if tblStyle is not None else None)
+
+    def _header_row(self, tr):
+        """表头行：每个单元格都有下边线，或表格样式的 firstRow 条件格式带下边线 (且表格启用了标题行格式)"""
+        tbl = tr.getparent()
+        tblPr, (_borders_, first_row) = self._table_styles(tbl)
+        look = tblPr.find(W + 'tblLook') if tblPr is not None else None
+        if _first_row_enabled(look) and first_row.get('bottom'):
+            return
+        for tc in tr.iterchildren(W_TC):
+            cell = _borders(tc.find(f'{W_TCPR}/{W}tcBorders'), {})
+            if not cell.get('bottom'):
+                self._tables[-1].header_ruled = False
+                return
+
+    def _table(self, tbl, state):
+        self.report.tables += 1
+        tblPr, (style_borders, _first_row) = self._table_styles(tbl)
+        borders = dict(style_borders)
+        if tblPr is not None:
+            _borders(tblPr.find(W + 'tblBorders'), borders)
+        location = f"表格 {state.number}"
+        problems = [f"缺少{name}" for edge, name in (('top', '顶线'), ('bottom', '底线')) if not borders.get(edge)]
+        problems += [f"不应有{name}" for edge, name in (('left', '左边线'), ('right', '右边线'),
+                                                        ('insideH', '内部横线'), ('insideV', '内部竖线'))
+                     if borders.get(edge)]
+        if state.row >= 0 and not state.header_ruled:
+            problems.append("表头下缺少细线")
+        if problems:
+            self.report.add(location, 'table', '，'.join(problems))
+
+
+def validate_docx(path, max_per_rule=MAX_PER_RULE):
+    """检查一个 docx，返回 ValidationReport"""
+    return DocxValidator(path, max_per_rule).run()
+
+
+def iter_docx(paths, recursive=False):
+    """展开文件与文件夹中的 docx (跳过 Word 的 ~$ 锁文件)"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.')) if recursive else []
+            for name in sorted(files):
+                if name.lower().endswith('.docx') and not name.startswith('~$'):
+                    yield os.path.join(root, name)
+
+
+def validate_many(paths, jobs=1, max_per_rule=MAX_PER_RULE):
+    """按输入顺序逐个产出各文件的 ValidationReport；jobs > 1 时在进程池中并行检查"""
+    paths = list(paths)
+    if jobs <= 1 or len(paths) < 2:
+        for path in paths:
+            yield validate_docx(path, max_per_rule)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+        yield from pool.map(validate_docx, paths, [max_per_rule] * len(paths), chunksize=4)
@@ -0,0 +1,127 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+from .paths import cache_dir
+
+# ==========================================
+# 监控索引：记录每个文件上次转换时的状态，重启监控后只补转换离线期间新增或修改的文件
+# ==========================================
+# 每个被监控的文件夹一个 SQLite 数据库 (缓存目录下的 watch/)，保存 相对路径 -> 大小、修改时间、
+# 内容哈希与输出文件。启动时整表读入内存，用一次 os.scandir 遍历的 stat 信息比较：
+# 大小与修改时间都未变化时不读文件；只有 stat 变化的文件才计算哈希 (内容相同则只更新 stat)。
+# 本模块只依赖标准库 (watch 子命令启动时导入)。
+
+INDEX_REVISION = 1
+
+
+def content_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class WatchIndex:
+    """
+    一个监控文件夹的持久索引。
+
+    changed(paths) 筛选出需要转换的文件；record(path, output) 在转换完成后记录该文件的状态。
+    读写来自监控线程与转换线程，内部加锁。
+    """
+
+    def __init__(self, folder, db_path=None):
+        self.folder = os.path.abspath(folder)
+        if db_path is None:
+            key = hashlib.sha256(os.path.normcase(self.folder).encode('utf-8')).hexdigest()[:16]
+            db_path = os.path.join(cache_dir('watch'), f"{key}.sqlite")
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != INDEX_REVISION:
+            self._db.execute("DROP TABLE IF EXISTS files")
+            self._db.execute("PRAGMA user_version=%d" % INDEX_REVISION)
+        self._db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, "
+                         "mtime_ns INTEGER, hash TEXT, output TEXT, converted_at REAL)")
+        # 相对路径 -> [size, mtime_ns, hash, output]
+        self._files = {row[0]: list(row[1:]) for row in
+                       self._db.execute("SELECT path, size, mtime_ns, hash, output FROM files")}
+
+    def _rel(self, path):
+        return os.path.relpath(os.path.abspath(path), self.folder).replace(os.sep, '/')
+
+    def __len__(self):
+        with self._lock:
+            return len(self._files)
+
+    # ---- 查询 ----
+    def is_changed(self, path, stat=None):
+        """该文件自上次转换后是否有变化 (新文件、内容变化或上次的输出已不存在)"""
+        rel = self._rel(path)
+        try:
+            st = stat or os.stat(path)
+        except OSError:
+            return False
+        with self._lock:
+            entry = self._files.get(rel)
+        if entry is None:
+            return True
+        size, mtime_ns, digest, output = entry
+        if output and not os.path.exists(output):
+            return True
+        if (size, mtime_ns) == (st.st_size, st.st_mtime_ns):
+            return False
+        try:
+            new_digest = content_hash(path)
+        except OSError:
+            return False
+        if new_digest != digest:
+            return True
+        # 只是修改时间变化 (例如编辑器原样重新保存)：更新 stat，下次不再读文件
+        self._store(rel, st.st_size, st.st_mtime_ns, digest, output)
+        return False
+
+    def changed(self, entries):
+        """
+        从 os.DirEntry (或路径) 中筛选需要转换的文件。
+
+        DirEntry 的 stat 信息来自目录遍历本身 (Windows 上不需要额外的系统调用)。
+        """
+        for entry in entries:
+            if isinstance(entry, os.DirEntry):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if self.is_changed(entry.path, stat):
+                    yield entry.path
+            elif self.is_changed(entry):
+                yield entry
+
+    # ---- 记录 ----
+    def record(self, path, output=None):
+        """转换成功后记录文件当前的状态 (不在该文件夹中的文件忽略)"""
+        if self._rel(path).startswith('../'):
+            return
+        try:
+            st = os.stat(path)
+            digest = content_hash(path)
+        except OSError:
+            return
+        self._store(self._rel(path), st.st_size, st.st_mtime_ns, digest,
+                    os.path.abspath(output) if output else None)
+
+    def _store(self, rel, size, mtime_ns, digest, output):
+        with self._lock:
+            self._files[rel] = [size, mtime_ns, digest, output]
+            self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                             (rel, size, mtime_ns, digest, output, time.time()))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
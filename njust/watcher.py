@@ -0,0 +1,382 @@
+import os
+import time
+import fnmatch
+import threading
+import importlib.util
+
+# 仅探测 watchdog 是否可用，真正的导入推迟到开始监控时
+HAS_WATCHDOG = importlib.util.find_spec("watchdog") is not None
+
+# 默认只处理 Markdown；编辑器的临时文件、Office 锁文件与隐藏目录 (.git 等) 中的文件一律忽略
+DEFAULT_INCLUDE = ('*.md',)
+DEFAULT_EXCLUDE = ('.*', '~$*', '*~', '*.swp', '*.tmp')
+# 同一文件最后一次事件之后静默多久才视为写入完成 (秒)
+QUIET_PERIOD = 0.5
+
+# 轮询间隔 (秒)：有变化时回到 POLL_MIN，空闲时逐次加倍到 POLL_MAX；
+# 最近 HOT_SECONDS 秒内变化过的文件即使在空闲退避期间也按 POLL_MIN 检查
+POLL_MIN = 0.5
+POLL_MAX = 8.0
+HOT_SECONDS = 30
+# 每隔多少次完整扫描无条件重新列出全部目录 (防止目录修改时间精度不足时漏掉新文件)
+RELIST_EVERY = 10
+
+
+def _stat_key(path):
+    """(大小, 修改时间)；文件不存在或不是普通文件时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class PathFilter:
+    """
+    按 include / exclude 通配符筛选路径 (不区分大小写)。
+
+    模式同时与文件名和相对 root 的路径 ('/' 分隔) 比较；exclude 也作用于各级目录名，
+    例如 '.*' 会排除 .git 目录下的全部文件。
+    """
+
+    def __init__(self, root, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE):
+        self.root = os.path.abspath(root)
+        self.include = [p.lower() for p in include]
+        self.exclude = [p.lower() for p in exclude]
+
+    def _matches(self, patterns, name, rel):
+        return any(fnmatch.fnmatchcase(name, p) or fnmatch.fnmatchcase(rel, p) for p in patterns)
+
+    def __call__(self, path):
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return False
+        parts = rel.replace(os.sep, '/').lower().split('/')
+        rel = '/'.join(parts)
+        if any(self._matches(self.exclude, part, part) for part in parts[:-1]):
+            return False
+        if self._matches(self.exclude, parts[-1], rel):
+            return False
+        return self._matches(self.include, parts[-1], rel)
+
+    def excludes_dir(self, path):
+        """目录本身被排除时返回 True (遍历时据此剪枝)"""
+        return self._matches(self.exclude, os.path.basename(path).lower(), os.path.basename(path).lower())
+
+
+class SettleQueue:
+    """
+    合并同一路径的连续事件，文件“安静”下来之后再交给 callback(path)。
+
+    touch(path) 只登记时间并唤醒后台线程，从不阻塞调用方 (watchdog 的事件线程)；
+    后台线程在最后一次事件 quiet_period 秒后检查大小与修改时间，
+    与上一次检查相同才视为写入完成，否则再等一个静默期。只保存尚未完成的路径。
+    """
+
+    def __init__(self, callback, quiet_period=QUIET_PERIOD):
+        self.callback = callback
+        self.quiet_period = quiet_period
+        self._pending = {}  # path -> [最后一次事件的时间, 上一次检查到的 (大小, 修改时间)]
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='njust-watch-settle', daemon=True)
+        self._thread.start()
+
+    def touch(self, path):
+        with self._cond:
+            entry = self._pending.get(path)
+            if entry is None:
+                self._pending[path] = [time.monotonic(), None]
+            else:
+                entry[0] = time.monotonic()
+            self._cond.notify()
+
+    def discard(self, path):
+        with self._cond:
+            self._pending.pop(path, None)
+
+    @property
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.monotonic()
+                    due = [path for path, (last, _stat) in self._pending.items()
+                           if now - last >= self.quiet_period]
+                    if due:
+                        break
+                    deadline = min((last for last, _stat in self._pending.values()), default=None)
+                    self._cond.wait(None if deadline is None else deadline + self.quiet_period - now)
+                if self._stopped:
+                    return
+            # stat 与回调都在锁外进行，事件线程随时可以继续登记
+            for path in due:
+                self._check(path)
+
+    def _check(self, path):
+        stat = _stat_key(path)
+        with self._cond:
+            entry = self._pending.get(path)
+            if entry is None or time.monotonic() - entry[0] < self.quiet_period:
+                return  # 检查期间又有新事件 (或已被丢弃)
+            if stat is None:
+                del self._pending[path]  # 已删除 / 已移走
+                return
+            if stat != entry[1]:
+                entry[0] = time.monotonic()
+                entry[1] = stat
+                return
+            del self._pending[path]
+        try:
+            self.callback(path)
+        except Exception as e:
+            print(f"Watcher callback failed for {path}: {e}")
+
+
+class PollingScanner:
+    """
+    轮询方式的变化检测 (没有 watchdog，或网络共享等收不到文件系统通知的场合)。
+
+    保存每个目录的修改时间、其中符合筛选条件的文件与子目录，以及每个文件的 (大小, 修改时间)。
+    scan() 时目录修改时间未变 (没有新增、删除或改名) 就沿用上次的列表，只 stat 已知的文件，
+    不再列出目录、也不碰其中的图片与 docx 等无关文件；check(paths) 只检查给定的文件。
+    """
+
+    def __init__(self, root, accepts, recursive=True):
+        self.root = root
+        self.accepts = accepts
+        self.recursive = recursive
+        self._dirs = {}   # 目录 -> (修改时间, 文件列表, 子目录列表)
+        self._files = {}  # 文件 -> (大小, 修改时间)
+        self._sweeps = 0
+
+    def scan(self):
+        """遍历整棵树，返回新增或修改的文件"""
+        changed = []
+        seen = {}  # 本次遍历到的目录 -> 是否重新列出
+        relist = self._sweeps % RELIST_EVERY == 0
+        self._sweeps += 1
+        self._scan_dir(self.root, changed, seen, relist)
+        removed = [d for d in self._dirs if d not in seen]
+        for folder in removed:
+            del self._dirs[folder]
+        if removed or any(seen.values()):
+            # 有目录被删除或重新列出：丢弃已不存在的文件记录
+            alive = {path for d in self._dirs.values() for path in d[1]}
+            for path in [p for p in self._files if p not in alive]:
+                del self._files[path]
+        return changed
+
+    def check(self, paths):
+        """只检查给定的文件，返回其中修改过的"""
+        changed = []
+        for path in paths:
+            if self._update(path, _stat_key(path)):
+                changed.append(path)
+        return changed
+
+    def _scan_dir(self, folder, changed, seen, relist):
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return
+        cached = self._dirs.get(folder)
+        seen[folder] = cached is None or cached[0] != mtime or relist
+        if seen[folder]:
+            files, subdirs = [], []
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.recursive and not self.accepts.excludes_dir(entry.path):
+                                    subdirs.append(entry.path)
+                            elif entry.is_file() and self.accepts(entry.path):
+                                files.append(entry.path)
+                                st = entry.stat()
+                                if self._update(entry.path, (st.st_size, st.st_mtime_ns)):
+                                    changed.append(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                return
+            self._dirs[folder] = (mtime, files, subdirs)
+        else:
+            _mtime, files, subdirs = cached
+            changed.extend(self.check(files))
+        for sub in subdirs:
+            self._scan_dir(sub, changed, seen, relist)
+
+    def _update(self, path, stat):
+        if stat is None or self._files.get(path) == stat:
+            return False
+        self._files[path] = stat
+        return True
+
+
+# ==========================================
+# 文件夹监控 (与 GUI 无关，CLI 与 GUI 共用)
+# ==========================================
+class FolderWatcher:
+    """
+    监控文件夹中新建、修改与移入的文件，写入完成后调用 callback(path)。
+
+    recursive=True 时包含子文件夹；include / exclude 见 PathFilter；
+    同一文件的一串事件合并为一次回调 (见 SettleQueue)。
+    给出 index (WatchIndex) 时，启动后先补转换离线期间新增或修改的文件，
+    并跳过内容与上次转换时相同的文件；转换完成后由调用方 index.record()。
+    优先使用 watchdog，缺失时降级为轮询。
+    """
+
+    def __init__(self, folder_path, recursive=True, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE,
+                 quiet_period=QUIET_PERIOD, index=None):
+        self.folder_path = folder_path
+        self.recursive = recursive
+        self.quiet_period = quiet_period
+        self.index = index
+        self.accepts = PathFilter(folder_path, include, exclude)
+        self.observer = None
+        self._stop_event = threading.Event()
+
+    def run(self, callback):
+        """阻塞运行，直到调用 stop()"""
+        index = self.index
+
+        def forward(path):
+            if index is None or index.is_changed(path):
+                callback(path)
+
+        settle = SettleQueue(forward, self.quiet_period)
+        try:
+            if not HAS_WATCHDOG:
+                print("Watchdog not found, falling back to polling.")
+                self._run_polling(settle)
+            else:
+                self._run_watchdog(settle)
+        finally:
+            settle.stop()
+
+    def _run_watchdog(self, settle):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        watcher = self
+
+        # 事件处理器只做筛选与登记，不在 watchdog 的事件线程中等待或转换
+        class ChangeHandler(FileSystemEventHandler):
+            def on_created(self, event):
+                if event.is_directory:
+                    self._touch_tree(event.src_path)
+                else:
+                    self._touch(event)
+
+            def on_modified(self, event):
+                self._touch(event)
+
+            def on_closed(self, event):
+                self._touch(event)
+
+            def on_moved(self, event):
+                settle.discard(event.src_path)
+                if event.is_directory:
+                    self._touch_tree(event.dest_path)
+                elif watcher.accepts(event.dest_path):
+                    settle.touch(event.dest_path)
+
+            def on_deleted(self, event):
+                settle.discard(event.src_path)
+
+            @staticmethod
+            def _touch(event):
+                if not event.is_directory and watcher.accepts(event.src_path):
+                    settle.touch(event.src_path)
+
+            @staticmethod
+            def _touch_tree(folder):
+                # 整个目录移入 (或复制进来) 时其中的文件不会逐个产生事件；在独立线程中扫描，不占用事件线程
+                if watcher.recursive and not watcher.accepts.excludes_dir(folder):
+                    threading.Thread(target=lambda: [settle.touch(e.path) for e in watcher._scan(folder)],
+                                     name='njust-watch-scan', daemon=True).start()
+
+        self.observer = Observer()
+        self.observer.schedule(ChangeHandler(), self.folder_path, recursive=self.recursive)
+        self.observer.start()
+        # 先开始监控再补扫，补扫期间的修改不会遗漏
+        self._catch_up(settle)
+
+        # 保持线程运行
+        try:
+            while self.observer.is_alive() and not self._stop_event.is_set():
+                self.observer.join(1)
+        except:
+            pass
+        self.observer.stop()
+        self.observer.join()
+
+    def _scan(self, folder):
+        """folder 中符合筛选条件的文件 (os.DirEntry；recursive 时包含子文件夹，跳过被排除的目录)"""
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.recursive and not self.accepts.excludes_dir(entry.path):
+                        yield from self._scan(entry.path)
+                elif entry.is_file() and self.accepts(entry.path):
+                    yield entry
+            except OSError:
+                continue
+
+    def _run_polling(self, settle):
+        """
+        Watchdog 缺失时的备用方案：自适应间隔轮询 (见 PollingScanner)。
+
+        有变化时按 POLL_MIN 扫描，空闲时间隔逐次加倍到 POLL_MAX；
+        最近变化过的文件 (通常是正在编辑的那一篇) 始终按 POLL_MIN 单独检查。
+        """
+        scanner = PollingScanner(self.folder_path, self.accepts, self.recursive)
+        scanner.scan()  # 基线：启动时已有的文件由 _catch_up 处理
+        self._catch_up(settle)
+
+        hot = {}  # 文件 -> 最近一次变化的时间
+        interval = POLL_MIN
+        next_sweep = time.monotonic() + interval
+        while not self._stop_event.wait(POLL_MIN if hot else max(0.0, next_sweep - time.monotonic())):
+            now = time.monotonic()
+            if now >= next_sweep:
+                changed = scanner.scan()
+                interval = POLL_MIN if changed else min(interval * 2, POLL_MAX)
+                next_sweep = now + interval
+            else:
+                changed = scanner.check(list(hot))
+            for path in changed:
+                hot[path] = now
+                settle.touch(path)
+            for path in [p for p, t in hot.items() if now - t > HOT_SECONDS]:
+                del hot[path]
+
+    def _catch_up(self, settle):
+        """一次遍历与索引比较，把离线期间新增或修改的文件交给 settle"""
+        if self.index is None:
+            return
+        for path in self.index.changed(self._scan(self.folder_path)):
+            settle.touch(path)
+
+    def stop(self):
+        self._stop_event.set()
+        if self.observer:
+            self.observer.stop()
@@ -0,0 +1,73 @@
+import os
+import sys
+import zlib
+import shutil
+import struct
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from njust.metrics import ConversionMetrics  # noqa: E402
+
+# ==========================================
+# 测试公共部分：独立的缓存目录、Pandoc 检测与 docx 读取
+# ==========================================
+# 每个测试会话使用一个临时缓存目录 (NJUST_CACHE_DIR)，不读写用户的缓存；
+# 需要 Pandoc 的测试在未安装 Pandoc 时跳过。
+
+requires_pandoc = pytest.mark.skipif(shutil.which('pandoc') is None, reason='未安装 Pandoc')
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_dir(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as mp:
+        folder = tmp_path_factory.mktemp('cache')
+        mp.setenv('NJUST_CACHE_DIR', str(folder))
+        mp.delenv('NJUST_METRICS_LOG', raising=False)
+        mp.delenv('NJUST_PROFILE_DIR', raising=False)
+        mp.delenv('NJUST_PANDOC_TIMEOUT', raising=False)
+        yield folder
+
+
+@pytest.fixture
+def write_md(tmp_path):
+    """在临时目录写入 Markdown 文件，返回其路径"""
+    def write(text, name='thesis.md'):
+        path = tmp_path / name
+        path.write_text(text, encoding='utf-8')
+        return str(path)
+    return write
+
+
+def write_png(path, width=8, height=6, rgb=(200, 30, 30)):
+    """只用标准库写出单色 PNG"""
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+    row = b'\x00' + bytes(rgb) * width
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(row * height)))
+        f.write(chunk(b'IEND', b''))
+
+
+def convert(path, **options):
+    """convert_file 并返回 (输出路径, ConversionMetrics)"""
+    from njust.formatter import convert_file
+    metrics = ConversionMetrics(path)
+    return convert_file(path, metrics=metrics, **options), metrics
+
+
+def document_xml(path):
+    with zipfile.ZipFile(path) as zf:
+        return zf.read('word/document.xml').decode('utf-8')
+
+
+def paragraph_texts(path):
+    """正文中非空段落的文字 (含表格外的全部段落)"""
+    from docx import Document
+    return [p.text for p in Document(path).paragraphs if p.text.strip()]
@@ -0,0 +1,63 @@
+import os
+
+from conftest import requires_pandoc, convert, document_xml, write_png
+
+MARKDOWN = "# 标题\n\n正文段落。\n\n![示意图](figure.png)\n"
+
+
+def _setup(write_md, tmp_path):
+    write_png(tmp_path / 'figure.png')
+    return write_md(MARKDOWN)
+
+
+def test_unchanged_input_hits_cache(write_md, tmp_path):
+    path = _setup(write_md, tmp_path)
+    first, metrics = convert(path, engine='internal')
+    assert metrics.cache == 'miss'
+    xml = document_xml(first)
+    os.remove(first)
+
+    second, metrics = convert(path, engine='internal')
+    assert metrics.cache == 'hit'
+    assert second == first
+    assert document_xml(second) == xml
+
+
+def test_markdown_change_invalidates(write_md, tmp_path):
+    path = _setup(write_md, tmp_path)
+    convert(path, engine='internal')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("\n新增段落。\n")
+    output, metrics = convert(path, engine='internal')
+    assert metrics.cache == 'miss'
+    assert '新增段落' in document_xml(output)
+
+
+def test_image_change_invalidates(write_md, tmp_path):
+    path = _setup(write_md, tmp_path)
+    convert(path, engine='internal')
+    write_png(tmp_path / 'figure.png', width=12, rgb=(30, 30, 200))
+    _output, metrics = convert(path, engine='internal')
+    assert metrics.cache == 'miss'
+
+
+def test_options_are_part_of_the_key(write_md, tmp_path):
+    path = _setup(write_md, tmp_path)
+    convert(path, engine='internal', format_mode='direct')
+    _output, metrics = convert(path, engine='internal', format_mode='style')
+    assert metrics.cache == 'miss'
+    _output, metrics = convert(path, engine='internal', use_cache=False)
+    assert metrics.cache is None
+
+
+@requires_pandoc
+def test_pandoc_fallback_is_not_cached(write_md, tmp_path, monkeypatch):
+    path = _setup(write_md, tmp_path)
+    monkeypatch.setenv('NJUST_PANDOC_TIMEOUT', '0.001')
+    _output, metrics = convert(path, engine='auto')
+    assert metrics.engine == 'internal'
+    monkeypatch.delenv('NJUST_PANDOC_TIMEOUT')
+
+    _output, metrics = convert(path, engine='auto')
+    assert metrics.cache == 'miss'
+    assert metrics.engine == 'pandoc'
@@ -0,0 +1,92 @@
+import re
+
+from conftest import requires_pandoc, convert, document_xml, paragraph_texts
+from njust.chapters import chapter_sources, _split_definitions
+
+# 三章：第一章定义的宏在第二章使用，各章都有「小结」，链接定义写在文末
+THESIS = r"""# 第一章 绪论
+
+\newcommand{\vect}[1]{\mathbf{#1}}
+
+向量 $\vect{x}$ 的定义见[第二章小结](#小结-1)。
+
+## 小结
+
+第一章小结。
+
+# 第二章 方法
+
+使用 $\vect{y} + \vect{z}$ 与[参考链接][site]，并加脚注[^n]。
+
+## 小结
+
+第二章小结，回到[第一章](#小结)。
+
+# 第三章 结论
+
+## 小结
+
+全文总结。
+
+[site]: https://example.com
+[^n]: 脚注内容。
+"""
+
+
+def _bookmarks(xml):
+    return re.findall(r'<w:bookmarkStart [^>]*w:name="([^"]*)"', xml)
+
+
+def _anchors(xml):
+    return re.findall(r'w:anchor="([^"]*)"', xml)
+
+
+@requires_pandoc
+def test_split_chapters_match_whole_file(write_md, tmp_path):
+    path = write_md(THESIS)
+    whole, whole_metrics = convert(path, engine='pandoc', use_cache=False)
+    whole_xml, whole_texts = document_xml(whole), paragraph_texts(whole)
+
+    split, metrics = convert(path, engine='pandoc', use_cache=True)
+    assert 'splice' in [s['stage'] for s in metrics.stages]
+    assert metrics.fallbacks == []
+    split_xml = document_xml(split)
+
+    assert paragraph_texts(split) == whole_texts
+    assert _bookmarks(split_xml) == _bookmarks(whole_xml)
+    assert _anchors(split_xml) == _anchors(whole_xml) == ['小结-1', '小结']
+    # 第二章的宏由第一章定义：两种方式都应生成公式而不是保留 TeX 原文
+    assert split_xml.count('<m:oMath>') == whole_xml.count('<m:oMath>') == 2
+    assert '\\vect' not in split_xml
+    assert '<w:hyperlink' in split_xml and '<w:footnoteReference' in split_xml
+
+
+@requires_pandoc
+def test_chapter_warning_falls_back_to_whole_file(write_md):
+    path = write_md("# 甲\n\n正文。\n\n# 乙\n\n$\\undefinedmacro{x}$\n")
+    output, metrics = convert(path, engine='pandoc', use_cache=True)
+    assert [f['engine'] for f in metrics.fallbacks] == ['chapters']
+    assert 'splice' not in [s['stage'] for s in metrics.stages]
+    assert paragraph_texts(output)[:2] == ['甲', '正文。']
+
+
+def test_chapter_sources_carry_macros_and_definitions():
+    sources = chapter_sources(THESIS)
+    assert len(sources) == 3
+    assert sources[1].startswith('\\newcommand{\\vect}')
+    assert '[site]: https://example.com' in sources[1]
+    assert '[^n]: 脚注内容。' in sources[1]
+    assert '[site]:' not in sources[0]
+
+
+def test_front_matter_is_not_split():
+    assert len(chapter_sources("---\ntitle: 论文\n---\n\n# 甲\n\n正文\n\n# 乙\n\n正文\n")) == 1
+
+
+def test_link_definition_ends_at_blank_line():
+    md = ("[id]: https://example.com\n  \"标题\"\n\n    缩进代码\n\n"
+          "[^n]: 脚注\n\n    脚注第二段\n\n正文\n")
+    body, definitions = _split_definitions(md)
+    assert '    缩进代码\n' in body
+    assert definitions['id'] == '[id]: https://example.com\n  "标题"\n'
+    assert '脚注第二段' in definitions['^n'] and '脚注第二段' not in body
@@ -0,0 +1,83 @@
+import re
+
+from conftest import requires_pandoc, convert, document_xml, paragraph_texts
+from njust.validate import validate_docx
+
+THESIS = r"""# 绪论
+
+本文研究**三线表**与公式 $E = mc^2$ 的排版。
+
+## 研究方法
+
+1. 第一步
+2. 第二步
+
+- 无序项
+
+```python
+def f(x):
+    return x + 1
+```
+
+$$
+\int_0^1 x\,dx = \frac{1}{2}
+$$
+
+| 名称 | 数值 |
+|------|------|
+| 甲   | 1    |
+| 乙   | 2    |
+
+: 实验结果
+
+# 参考文献
+
+[1] 张三. 论文格式规范[J]. 学报, 2020.
+
+[2] 李四. 排版方法[M]. 出版社, 2021.
+"""
+
+# AST 引擎与内置引擎一样把列表序号与题注前缀写成文字，Pandoc 引擎使用 Word 编号与原题注
+_LABELS = re.compile(r'^(\d+\. |● |表 |图 )')
+
+
+def _normalized(path):
+    return [_LABELS.sub('', text) for text in paragraph_texts(path)]
+
+
+def _cells(path):
+    from docx import Document
+    return [[cell.text for cell in row.cells] for table in Document(path).tables for row in table.rows]
+
+
+@requires_pandoc
+def test_ast_engine_matches_pandoc_engine(write_md):
+    path = write_md(THESIS)
+    pandoc, _metrics = convert(path, engine='pandoc', use_cache=False)
+    pandoc_texts, pandoc_cells = _normalized(pandoc), _cells(pandoc)
+    pandoc_xml = document_xml(pandoc)
+
+    ast, metrics = convert(path, engine='ast', use_cache=False)
+    assert metrics.engine == 'ast'
+    assert _normalized(ast) == pandoc_texts
+    assert _cells(ast) == pandoc_cells
+    assert document_xml(ast).count('<m:oMath>') == pandoc_xml.count('<m:oMath>') == 2
+
+
+@requires_pandoc
+def test_ast_engine_output_is_valid(write_md):
+    path = write_md(THESIS)
+    for mode in ('direct', 'style'):
+        output, _metrics = convert(path, engine='ast', format_mode=mode, use_cache=False)
+        report = validate_docx(output)
+        assert report.ok, report.format()
+
+
+@requires_pandoc
+def test_ast_engine_falls_back_for_links_and_footnotes(write_md):
+    path = write_md("# 标题\n\n见[官网](https://example.com)与脚注[^1]。\n\n[^1]: 注释内容。\n")
+    output, metrics = convert(path, engine='ast', use_cache=False)
+    assert metrics.engine == 'pandoc'
+    assert [f['engine'] for f in metrics.fallbacks] == ['ast']
+    xml = document_xml(output)
+    assert '<w:hyperlink' in xml and '<w:footnoteReference' in xml
@@ -0,0 +1,74 @@
+import pytest
+from docx import Document
+from docx.shared import Pt, Mm
+
+from conftest import requires_pandoc, convert
+from njust.validate import validate_docx, validate_many
+
+THESIS = """# 绪论
+
+正文段落，包含 `inline` 代码。
+
+## 研究背景
+
+| 名称 | 数值 |
+|------|------|
+| 甲   | 1    |
+
+```python
+print("hello")
+```
+
+# 参考文献
+
+[1] 张三. 论文格式规范[J]. 学报, 2020.
+"""
+
+
+@pytest.fixture
+def good_docx(write_md):
+    output, _metrics = convert(write_md(THESIS), engine='internal', use_cache=False)
+    return output
+
+
+def test_known_good_document_passes(good_docx):
+    report = validate_docx(good_docx)
+    assert report.ok, report.format()
+    assert report.paragraphs > 0 and report.tables == 1
+
+
+@requires_pandoc
+@pytest.mark.parametrize('mode', ['direct', 'style'])
+def test_pandoc_output_passes(write_md, mode):
+    output, _metrics = convert(write_md(THESIS), engine='pandoc', format_mode=mode, use_cache=False)
+    report = validate_docx(output)
+    assert report.ok, report.format()
+
+
+def test_known_bad_document_is_reported(good_docx, tmp_path):
+    doc = Document(good_docx)
+    doc.sections[0].page_width = Mm(216)
+    body = next(p for p in doc.paragraphs if p.text.startswith('正文段落'))
+    body.runs[0].font.size = Pt(14)
+    heading = next(p for p in doc.paragraphs if p.text == '研究背景')
+    for run in heading.runs:
+        run.font.bold = False
+    bad = str(tmp_path / 'bad.docx')
+    doc.save(bad)
+
+    report = validate_docx(bad)
+    assert not report.ok
+    assert {'page', 'size'} <= set(report.counts)
+    assert any(v['rule'] == 'size' and v['text'].startswith('正文段落') for v in report.violations)
+
+
+def test_unreadable_file_is_an_error(tmp_path):
+    missing = validate_docx(str(tmp_path / 'missing.docx'))
+    assert not missing.ok and missing.error
+
+
+def test_validate_many_keeps_order(good_docx, tmp_path):
+    missing = str(tmp_path / 'missing.docx')
+    reports = list(validate_many([good_docx, missing, good_docx], jobs=2))
+    assert [r.path for r in reports] == [good_docx, missing, good_docx]
+    assert [r.ok for r in reports] == [True, False, True]